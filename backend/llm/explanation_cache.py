@@ -0,0 +1,150 @@
+"""
+LLM Client: Explanation Cache
+Shares one LLM explanation between requests in the same condition bucket
+"""
+
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import math
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Field-specific figures, written as placeholders in a shared explanation
+PLACEHOLDERS = {
+    "soil_moisture": "[SOIL_MOISTURE]",
+    "rainfall": "[RAINFALL]",
+    "field_size": "[FIELD_SIZE]",
+    "water_amount": "[WATER_AMOUNT]",
+    "water_per_hectare": "[WATER_PER_HECTARE]"
+}
+
+
+class ExplanationCache:
+    """
+    Least-recently-used cache of explanation templates per condition bucket
+    
+    A bucket is (corpus version, retrieval mode, crop, stage, rule
+    decision, soil moisture band, rainfall band). The moisture band counts moisture_step points
+    from the crop's irrigation threshold, so readings of 61.2% and 61.4%
+    share a bucket but readings on either side of the threshold never do.
+    The rainfall band counts rain_step mm. Coarser steps mean fewer LLM
+    calls and less specific explanations.
+    
+    Templates refer to field figures through PLACEHOLDERS; fill() puts in
+    the requesting field's exact numbers. Entries expire after
+    ttl_seconds, and a new corpus version drops the older entries.
+    """
+    
+    def __init__(self, moisture_step: float = 5.0, rain_step: float = 2.5,
+                 maxsize: int = 512, ttl_seconds: float = 86400):
+        """
+        Args:
+            moisture_step: Width of a soil moisture band (percentage points)
+            rain_step: Width of a rainfall band (mm)
+            maxsize: Maximum number of cached buckets
+            ttl_seconds: Seconds before a bucket's explanation is regenerated
+        """
+        if moisture_step <= 0 or rain_step <= 0:
+            raise ValueError("Bucket steps must be positive")
+        self.moisture_step = moisture_step
+        self.rain_step = rain_step
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[tuple, Tuple[str, float]]" = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+    
+    def bucket(self, corpus_version: str, retrieval_mode: str, crop_type: str, crop_stage: str,
+               calculation: Dict) -> tuple:
+        """Bucket of a rule-based calculation (from IrrigationService)"""
+        moisture_gap = calculation["soil_moisture"] - calculation["moisture_threshold"]
+        return (
+            corpus_version,
+            retrieval_mode,
+            crop_type.lower(),
+            crop_stage.lower(),
+            calculation["decision"],
+            math.floor(moisture_gap / self.moisture_step),
+            math.floor(calculation["rainfall"] / self.rain_step)
+        )
+    
+    def representative(self, bucket: tuple, moisture_threshold: float) -> Tuple[float, float]:
+        """(soil moisture, rainfall) at the middle of a bucket's bands"""
+        moisture_band, rain_band = bucket[-2], bucket[-1]
+        soil_moisture = moisture_threshold + (moisture_band + 0.5) * self.moisture_step
+        rainfall = max(0.0, (rain_band + 0.5) * self.rain_step)
+        return round(soil_moisture, 1), round(rainfall, 2)
+    
+    def describe(self, bucket: tuple, moisture_threshold: float) -> str:
+        """Conditions a bucket covers, for the prompt"""
+        moisture_band, rain_band = bucket[-2], bucket[-1]
+        low = moisture_threshold + moisture_band * self.moisture_step
+        return (
+            f"Soil moisture {low:g}-{low + self.moisture_step:g}% (threshold {moisture_threshold}%), "
+            f"rainfall {rain_band * self.rain_step:g}-{(rain_band + 1) * self.rain_step:g} mm, "
+            f"rule-based decision: {bucket[-3]}"
+        )
+    
+    def get(self, bucket: tuple) -> Optional[str]:
+        """Cached template for a bucket, or None"""
+        with self._lock:
+            entry = self._entries.get(bucket)
+            if entry is not None and time.monotonic() - entry[1] > self.ttl_seconds:
+                del self._entries[bucket]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(bucket)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, bucket: tuple, template: str):
+        """Store a bucket's template, evicting the least recently used when full"""
+        with self._lock:
+            version = bucket[0]
+            if version != self._version:
+                if self._entries:
+                    logger.info(f"Corpus version changed ({self._version} -> {version}); clearing explanation cache")
+                self._entries.clear()
+                self._version = version
+            
+            self._entries[bucket] = (template, time.monotonic())
+            self._entries.move_to_end(bucket)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    @staticmethod
+    def fill(template: str, figures: Dict) -> str:
+        """Template with each placeholder replaced by the field's figure"""
+        for name, placeholder in PLACEHOLDERS.items():
+            if name in figures:
+                template = template.replace(placeholder, str(figures[name]))
+        return template
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters, occupancy and bucket granularity"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "moisture_step": self.moisture_step,
+                "rain_step": self.rain_step,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
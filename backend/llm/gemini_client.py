@@ -3,23 +3,71 @@ LLM Client: Gemini API Wrapper
 Handles all interactions with Google's Gemini API
 """
 
-import google.generativeai as genai
+import asyncio
 import os
-from typing import Optional, Dict
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Optional, Dict
 import logging
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+from backend.llm.response_cache import ResponseCache
+from backend.services.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 
+def _genai():
+    """Import the Gemini SDK on first use (it is slow to import)"""
+    import google.generativeai as genai
+    return genai
+
+
+def load_env():
+    """Load environment variables from .env"""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+
 class GeminiClient:
-    """Wrapper for Gemini API interactions"""
+    """
+    Wrapper for Gemini API interactions
+    
+    generate() blocks on the network call. Async endpoints use
+    generate_async(), which runs it on the client's own thread pool so the
+    event loop keeps serving other requests. At most max_concurrency calls
+    run at once (later ones wait for a slot), and each call is given up on
+    after `timeout` seconds, counting the wait for a slot.
+    
+    With a ResponseCache, a prompt already answered with the same model
+    and generation settings is served from the cache without a call. The
+    async methods look the cache up on the default executor, and responses
+    are stored from the worker thread that generated them.
+    Identical calls made while one is in flight share that call's response
+    (see SingleFlight) instead of each calling Gemini.
+    
+    generate_stream_async() yields the response as Gemini generates it,
+    under the same slots and timeout; streams are not coalesced.
+    """
+    
+    DEFAULT_MODEL = "gemini-pro"
     
-    def __init__(self, api_key: Optional[str] = None):
-        """Initialize Gemini client with API key"""
+    def __init__(self, api_key: Optional[str] = None, discover_model: bool = True,
+                 max_concurrency: Optional[int] = None, timeout: Optional[float] = None,
+                 cache: Optional[ResponseCache] = None):
+        """
+        Initialize Gemini client with API key
+        
+        Args:
+            api_key: Gemini API key (defaults to GEMINI_API_KEY)
+            discover_model: List available models now; when False the default
+                model is used until discover_model() runs (e.g. in a background warm-up)
+            max_concurrency: Concurrent generate_async() calls (defaults to
+                GEMINI_MAX_CONCURRENCY, or 4)
+            timeout: Seconds before generate_async() gives up (defaults to
+                GEMINI_TIMEOUT_SECONDS, or 30)
+            cache: Store of earlier responses to reuse
+        """
         
         # Get API key from parameter or environment
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
@@ -31,13 +79,47 @@ class GeminiClient:
             )
         
         # Configure Gemini
+        genai = _genai()
         genai.configure(api_key=self.api_key)
         
+        self.model = genai.GenerativeModel(self.DEFAULT_MODEL)
+        self.model_discovered = False
+        self.connection_ok = None  # Cached result of check_connection()
+        
+        self.max_concurrency = max(1, max_concurrency or int(os.getenv("GEMINI_MAX_CONCURRENCY", "4")))
+        self.timeout = timeout if timeout is not None else float(os.getenv("GEMINI_TIMEOUT_SECONDS", "30"))
+        self._executor = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="gemini")
+        self._slots = None  # (event loop, asyncio.Semaphore), created on first async call
+        self._stats_lock = threading.Lock()
+        self.async_stats = {"calls": 0, "in_flight": 0, "waiting": 0, "timeouts": 0}
+        self.cache = cache
+        self.flights = SingleFlight("gemini")
+        
+        if discover_model:
+            self.discover_model()
+        
+        logger.info("Gemini client initialized successfully")
+    
+    def discover_model(self) -> str:
+        """
+        Pick a model from the ones available to this API key
+        
+        The result is cached; later calls return without listing models again.
+        
+        Returns:
+            str: Model name in use
+        """
+        if self.model_discovered:
+            return self.model.model_name
+        
+        genai = _genai()
+        
         # Initialize model - try to detect available model
         # Default to gemini-pro for better compatibility
         try:
             models = genai.list_models()
             available_models = [m.name for m in models]
+            logger.info(f"Available Gemini models: {available_models}")
             
             # Prefer gemini-pro for v1beta compatibility
             if "models/gemini-pro" in available_models:
@@ -54,14 +136,15 @@ class GeminiClient:
                     logger.info(f"Using {model_name} model")
                 else:
                     # Fallback to gemini-pro
-                    self.model = genai.GenerativeModel("gemini-pro")
+                    self.model = genai.GenerativeModel(self.DEFAULT_MODEL)
                     logger.warning("No models listed, defaulting to gemini-pro")
         except Exception as e:
             # Fallback to gemini-pro if listing fails
             logger.warning(f"Could not list models: {e}, using gemini-pro")
-            self.model = genai.GenerativeModel("gemini-pro")
+            self.model = genai.GenerativeModel(self.DEFAULT_MODEL)
         
-        logger.info("Gemini client initialized successfully")
+        self.model_discovered = True
+        return self.model.model_name
     
     def generate(
         self,
@@ -78,17 +161,31 @@ class GeminiClient:
             max_tokens: Maximum tokens to generate
             
         Returns:
-            Dict with 'text' and 'success' keys
+            Dict with 'text' and 'success' keys ('cached' is True when
+            served from the response cache)
         """
+        cached = self._cached_response(prompt, temperature, max_tokens)
+        if cached is not None:
+            return cached
+        return self.flights.do(self._cache_key(prompt, temperature, max_tokens),
+                               self._generate, prompt, temperature, max_tokens)
+    
+    def _generate(self, prompt: str, temperature: float, max_tokens: int) -> Dict:
+        """Call Gemini (blocking), caching a successful response"""
+        started = time.perf_counter()
         try:
             response = self.model.generate_content(
                 prompt,
-                generation_config=genai.GenerationConfig(
+                generation_config=_genai().GenerationConfig(
                     temperature=temperature,
                     max_output_tokens=max_tokens,
                 )
             )
             
+            if self.cache is not None:
+                self._store_response(prompt, temperature, max_tokens, response.text,
+                                     time.perf_counter() - started)
+            
             return {
                 "success": True,
                 "text": response.text,
@@ -104,6 +201,240 @@ class GeminiClient:
                 "model": "gemini-1.5-pro"
             }
     
+    async def generate_async(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        timeout: Optional[float] = None
+    ) -> Dict:
+        """
+        Generate response from Gemini without blocking the event loop
+        
+        Args:
+            prompt: The input prompt
+            temperature: Sampling temperature (0.0-1.0)
+            max_tokens: Maximum tokens to generate
+            timeout: Seconds to wait, including for a free slot (defaults to self.timeout);
+                a call joining an identical one in flight shares that call's timeout
+        
+        Returns:
+            Dict with 'text' and 'success' keys, as generate()
+        """
+        cached = await self._cached_response_async(prompt, temperature, max_tokens)
+        if cached is not None:
+            return cached
+        
+        return await self.flights.do_async(
+            self._cache_key(prompt, temperature, max_tokens),
+            lambda: self._generate_pooled(prompt, temperature, max_tokens, timeout)
+        )
+    
+    async def _generate_pooled(self, prompt: str, temperature: float, max_tokens: int,
+                               timeout: Optional[float]) -> Dict:
+        """_generate() on the thread pool, once a slot is free"""
+        loop = asyncio.get_running_loop()
+        timeout = self.timeout if timeout is None else timeout
+        deadline = loop.time() + timeout
+        slots = self._semaphore(loop)
+        
+        self._count("calls", "waiting")
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            return self._timed_out(timeout, "waiting for a free slot")
+        finally:
+            self._count("waiting", step=-1)
+        
+        self._count("in_flight")
+        call = loop.run_in_executor(self._executor, self._generate, prompt, temperature, max_tokens)
+        
+        def finished(_):
+            # The worker thread cannot be interrupted, so a timed-out call
+            # keeps its slot until the request really returns
+            self._count("in_flight", step=-1)
+            slots.release()
+        
+        call.add_done_callback(finished)
+        try:
+            return await asyncio.wait_for(asyncio.shield(call), max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            return self._timed_out(timeout, "waiting for a response")
+    
+    async def generate_stream_async(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """
+        Generate response from Gemini, yielding text as it is generated
+        
+        A cached response is yielded in one piece. A completed stream is
+        cached like a generate() response.
+        
+        Args:
+            prompt: The input prompt
+            temperature: Sampling temperature (0.0-1.0)
+            max_tokens: Maximum tokens to generate
+            timeout: Seconds until the whole response has arrived, including
+                the wait for a free slot (defaults to self.timeout)
+        
+        Raises:
+            asyncio.TimeoutError: If the response does not arrive in time
+            Exception: Whatever the Gemini SDK raised
+        """
+        cached = await self._cached_response_async(prompt, temperature, max_tokens)
+        if cached is not None:
+            yield cached["text"]
+            return
+        
+        loop = asyncio.get_running_loop()
+        timeout = self.timeout if timeout is None else timeout
+        deadline = loop.time() + timeout
+        slots = self._semaphore(loop)
+        
+        self._count("calls", "waiting")
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self._timed_out(timeout, "waiting for a free slot")
+            raise
+        finally:
+            self._count("waiting", step=-1)
+        
+        chunks = asyncio.Queue()
+        stop = threading.Event()
+        self._count("in_flight")
+        call = loop.run_in_executor(self._executor, self._stream, prompt, temperature, max_tokens,
+                                    loop, chunks, stop)
+        
+        def finished(_):
+            self._count("in_flight", step=-1)
+            slots.release()
+        
+        call.add_done_callback(finished)
+        try:
+            while True:
+                text = await asyncio.wait_for(chunks.get(), max(0.0, deadline - loop.time()))
+                if text is None:
+                    break
+                yield text
+            await call  # Raises the SDK's error, if the stream ended on one
+        except asyncio.TimeoutError:
+            self._timed_out(timeout, "waiting for a response")
+            raise
+        finally:
+            # Tells the worker to stop reading a stream nobody is consuming
+            stop.set()
+    
+    def _stream(self, prompt: str, temperature: float, max_tokens: int,
+                loop: asyncio.AbstractEventLoop, chunks: asyncio.Queue, stop: threading.Event):
+        """Call Gemini with streaming (blocking), passing each piece to the event loop; None ends the stream"""
+        started = time.perf_counter()
+        parts = []
+        try:
+            response = self.model.generate_content(
+                prompt,
+                generation_config=_genai().GenerationConfig(
+                    temperature=temperature,
+                    max_output_tokens=max_tokens,
+                ),
+                stream=True
+            )
+            for chunk in response:
+                if stop.is_set():
+                    return
+                parts.append(chunk.text)
+                loop.call_soon_threadsafe(chunks.put_nowait, chunk.text)
+            
+            if self.cache is not None:
+                self._store_response(prompt, temperature, max_tokens, "".join(parts),
+                                     time.perf_counter() - started)
+        except Exception as e:
+            logger.error(f"Error streaming from Gemini: {e}")
+            raise
+        finally:
+            loop.call_soon_threadsafe(chunks.put_nowait, None)
+    
+    async def generate_with_fallback_async(
+        self,
+        prompt: str,
+        fallback_text: str = "Unable to generate AI response. Using rule-based recommendation.",
+        temperature: float = 0.7,
+        max_tokens: int = 1000
+    ) -> str:
+        """generate_with_fallback() without blocking the event loop"""
+        result = await self.generate_async(prompt, temperature, max_tokens)
+        
+        if result["success"]:
+            return result["text"]
+        else:
+            logger.warning(f"Using fallback response: {result.get('error')}")
+            return fallback_text
+    
+    def _cache_key(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        return ResponseCache.key(self.model.model_name, prompt, temperature, max_tokens)
+    
+    def _cached_response(self, prompt: str, temperature: float, max_tokens: int) -> Optional[Dict]:
+        """Response from the cache, or None on a miss (or without a cache)"""
+        if self.cache is None:
+            return None
+        try:
+            text = self.cache.get(self._cache_key(prompt, temperature, max_tokens))
+        except Exception as e:
+            logger.warning(f"LLM response cache lookup failed: {e}")
+            return None
+        if text is None:
+            return None
+        return {
+            "success": True,
+            "text": text,
+            "model": "gemini-1.5-pro",
+            "cached": True
+        }
+    
+    async def _cached_response_async(self, prompt: str, temperature: float, max_tokens: int) -> Optional[Dict]:
+        """_cached_response() on the default executor, keeping SQLite I/O off the event loop"""
+        if self.cache is None:
+            return None
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._cached_response, prompt, temperature, max_tokens
+        )
+    
+    def _store_response(self, prompt: str, temperature: float, max_tokens: int,
+                        text: str, seconds: float):
+        try:
+            self.cache.put(self._cache_key(prompt, temperature, max_tokens), text, seconds)
+        except Exception as e:
+            logger.warning(f"Could not cache LLM response: {e}")
+    
+    def _semaphore(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        """The concurrency semaphore of the running event loop"""
+        if self._slots is None or self._slots[0] is not loop:
+            self._slots = (loop, asyncio.Semaphore(self.max_concurrency))
+        return self._slots[1]
+    
+    def _count(self, *names: str, step: int = 1):
+        with self._stats_lock:
+            for name in names:
+                self.async_stats[name] += step
+    
+    def _timed_out(self, timeout: float, stage: str) -> Dict:
+        self._count("timeouts")
+        logger.error(f"Gemini call timed out after {timeout}s {stage}")
+        return {
+            "success": False,
+            "text": "",
+            "error": f"Timed out after {timeout}s {stage}",
+            "model": "gemini-1.5-pro"
+        }
+    
+    def close(self):
+        """Stop the thread pool (calls still running are not waited for)"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+    
     def generate_with_fallback(
         self,
         prompt: str,
@@ -131,30 +462,18 @@ class GeminiClient:
             logger.warning(f"Using fallback response: {result.get('error')}")
             return fallback_text
     
-    def check_connection(self) -> bool:
-        """Test if Gemini API is accessible"""
+    def check_connection(self, refresh: bool = False) -> bool:
+        """
+        Test if Gemini API is accessible
+        
+        The probe result is cached; pass refresh=True to run it again.
+        """
+        if self.connection_ok is not None and not refresh:
+            return self.connection_ok
+        
+        genai = _genai()
         try:
-            # Try to list available models first
-            try:
-                models = genai.list_models()
-                available_models = [m.name for m in models]
-                logger.info(f"Available Gemini models: {available_models}")
-                
-                # Use gemini-pro if available, otherwise try gemini-1.5-pro
-                if "models/gemini-pro" in available_models:
-                    self.model = genai.GenerativeModel("gemini-pro")
-                    logger.info("Using gemini-pro model")
-                elif "models/gemini-1.5-pro" in available_models:
-                    self.model = genai.GenerativeModel("gemini-1.5-pro")
-                    logger.info("Using gemini-1.5-pro model")
-                else:
-                    # Use first available model
-                    if available_models:
-                        model_name = available_models[0].replace("models/", "")
-                        self.model = genai.GenerativeModel(model_name)
-                        logger.info(f"Using {model_name} model")
-            except Exception as list_error:
-                logger.warning(f"Could not list models: {list_error}, trying default")
+            self.discover_model()
             
             test_response = self.model.generate_content(
                 "Say 'hello' to test the connection.",
@@ -164,28 +483,37 @@ class GeminiClient:
                 )
             )
             
-            return test_response.text is not None
+            self.connection_ok = test_response.text is not None
             
         except Exception as e:
             logger.error(f"Gemini connection test failed: {e}")
             # Try to use gemini-pro as fallback
             try:
-                self.model = genai.GenerativeModel("gemini-pro")
+                self.model = genai.GenerativeModel(self.DEFAULT_MODEL)
                 logger.info("Switched to gemini-pro model")
-                return True
+                self.connection_ok = True
             except:
-                return False
+                self.connection_ok = False
+        
+        return self.connection_ok
+    
+    def warm_up(self) -> bool:
+        """Discover the model and probe connectivity (blocking; run off the event loop)"""
+        self.discover_model()
+        return self.check_connection()
 
 
 # Singleton instance
 _gemini_client = None
 
 
-def get_gemini_client(api_key: Optional[str] = None) -> GeminiClient:
+def get_gemini_client(api_key: Optional[str] = None, discover_model: bool = True,
+                      cache: Optional[ResponseCache] = None) -> GeminiClient:
     """Get or create singleton Gemini client"""
     global _gemini_client
     
     if _gemini_client is None:
-        _gemini_client = GeminiClient(api_key)
+        load_env()
+        _gemini_client = GeminiClient(api_key, discover_model=discover_model, cache=cache)
     
     return _gemini_client
@@ -0,0 +1,145 @@
+"""
+LLM Client: Response Cache
+Persistent cache of Gemini responses keyed by prompt and generation settings
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    generation_seconds REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used);
+"""
+
+
+class ResponseCache:
+    """
+    Gemini responses in a SQLite table, so they survive restarts
+    
+    Entries expire ttl_seconds after they were generated. Past max_entries
+    the least recently used are evicted. Each entry records how long its
+    generation took, which a hit counts as latency saved.
+    """
+    
+    def __init__(self, db_path: Path, ttl_seconds: float = 86400, max_entries: int = 1000):
+        """
+        Args:
+            db_path: SQLite database file (created if missing)
+            ttl_seconds: Seconds a response stays valid
+            max_entries: Responses kept before least recently used are evicted
+        """
+        self.db_path = Path(db_path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evictions = 0
+        self._seconds_saved = 0.0
+        
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl_seconds,))
+            self._size = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            self._evict()
+        logger.info(f"Opened LLM response cache: {self.db_path.name} ({self._size} responses)")
+    
+    @staticmethod
+    def key(model: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        """Hash of everything that determines a response"""
+        payload = json.dumps([model, float(temperature), int(max_tokens), prompt])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        """Cached response text, or None on a miss"""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT text, created, generation_seconds FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._size -= 1
+                self._expired += 1
+                row = None
+            
+            if row is None:
+                self._misses += 1
+                return None
+            
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._hits += 1
+            self._seconds_saved += row[2]
+            return row[0]
+    
+    def put(self, key: str, text: str, generation_seconds: float):
+        """Store a response, evicting the least recently used past max_entries"""
+        now = time.time()
+        with self._lock, self._conn:
+            exists = self._conn.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, text, created, last_used, generation_seconds) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, text, now, now, generation_seconds)
+            )
+            if exists is None:
+                self._size += 1
+            self._evict()
+    
+    def _evict(self):
+        excess = self._size - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            self._size -= excess
+            self._evictions += excess
+    
+    def clear(self):
+        """Drop every cached response"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+            self._size = 0
+    
+    def stats(self) -> Dict:
+        """Size, hit rate and generation time saved since start-up"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": self._size,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "expired": self._expired,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "seconds_saved": round(self._seconds_saved, 3)
+            }
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
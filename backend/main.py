@@ -5,24 +5,36 @@ RAG-Enhanced Smart Irrigation System with Gemini AI
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, List
 from datetime import datetime
+import asyncio
+import json
 import logging
+import os
+import time
 
 # Import RAG components
 from backend.rag.loader import DocumentLoader
-from backend.rag.retriever import GuidelineRetriever
+from backend.rag.retriever import GuidelineRetriever, RETRIEVAL_MODES
+from backend.rag.context_cache import ContextCache
+from backend.rag.facts import FACT_KINDS, cross_check as check_rules_against_facts
 from backend.rag.memory import IrrigationMemory
+from backend.rag.decision_store import DecisionStore
 from backend.rag.prompt_builder import PromptBuilder
 
-# Import LLM client
-from backend.llm.gemini_client import get_gemini_client
+# Import LLM client (the Gemini SDK itself is imported lazily)
+from backend.llm.gemini_client import get_gemini_client, load_env
+from backend.llm.explanation_cache import ExplanationCache, PLACEHOLDERS
+from backend.llm.response_cache import ResponseCache
 
 # Import services
 from backend.services.weather import WeatherService
 from backend.services.irrigation import IrrigationService
+from backend.services.sensor_ingest import SensorIngestService
+from backend.services.rollups import RollupEngine, RESOLUTIONS, DEFAULT_FIELD
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -48,6 +60,14 @@ app.add_middleware(
 BASE_DIR = Path(__file__).parent.parent
 DATA_DIR = BASE_DIR / "data"
 MEMORY_FILE = BASE_DIR / "irrigation_memory.json"
+MEMORY_DB = BASE_DIR / "irrigation_memory.db"
+LLM_CACHE_DB = BASE_DIR / "llm_cache.db"
+
+# Upper bound on readings accepted in one /sensor-readings call
+MAX_READINGS_PER_BATCH = 50_000
+
+# Guideline context blocks kept by the retriever's LRU cache
+CONTEXT_CACHE_SIZE = 256
 
 # Initialize components
 loader = None
@@ -55,8 +75,21 @@ retriever = None
 memory = None
 prompt_builder = None
 gemini_client = None
+llm_cache = None
+explanation_cache = None
 weather_service = None
 irrigation_service = None
+sensor_ingest = None
+rollups = None
+
+# Background warm-up of the Gemini client (model discovery + connectivity probe)
+warmup_state = {
+    "status": "pending",  # pending -> warming -> ready
+    "fast_start": False,
+    "duration_seconds": None,
+    "gemini_connected": False
+}
+warmup_task = None
 
 
 # Data models
@@ -66,6 +99,9 @@ class IrrigationRequest(BaseModel):
     field_size: float
     rainfall_mm: Optional[float] = None  # Optional, will use weather service if not provided
     location: Optional[str] = None
+    farm_id: Optional[str] = None  # Decision history is kept per farm and field
+    field_id: Optional[str] = None  # Uses this field's latest sensor reading when known
+    retrieval_mode: str = "keyword"  # "keyword" (whole documents), "bm25" or "tfidf" (top section chunks)
 
 
 class IrrigationResponse(BaseModel):
@@ -87,40 +123,98 @@ class RainAlertRequest(BaseModel):
     days_ahead: int = 3  # Check next N days for rain
 
 
+class SensorReading(BaseModel):
+    field_id: str
+    sensor_id: str
+    soil_moisture: float
+    temperature: Optional[float] = None
+    pressure: Optional[float] = None
+    altitude: Optional[float] = None
+    class_label: Optional[str] = None
+    timestamp: Optional[datetime] = None  # Defaults to time of ingest
+
+
+class SensorBatch(BaseModel):
+    readings: List[SensorReading]
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize all components on startup"""
-    global loader, retriever, memory, prompt_builder, gemini_client, weather_service, irrigation_service
+    global loader, retriever, memory, prompt_builder, gemini_client, llm_cache, explanation_cache, weather_service, irrigation_service, sensor_ingest, rollups, warmup_task
     
     logger.info("🌱 Starting Smart Irrigation RAG System...")
     
+    load_env()
+    # FAST_START=1 accepts traffic before Gemini is ready ("/" reports "warming")
+    fast_start = os.getenv("FAST_START", "0") == "1"
+    # How often to check soil_moisture.csv for appended rows (0 disables)
+    soil_csv_poll_seconds = float(os.getenv("SOIL_CSV_POLL_SECONDS", "5"))
+    # How often to check data/guidelines/ for added, edited or removed files (0 disables)
+    guidelines_poll_seconds = float(os.getenv("GUIDELINES_POLL_SECONDS", "5"))
+    # "sqlite" keeps the full decision history; "jsonl" keeps the last 30 decisions
+    memory_backend = os.getenv("MEMORY_BACKEND", "sqlite")
+    # Reuse identical Gemini completions for this long (0 disables the response cache)
+    llm_cache_ttl_seconds = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+    llm_cache_size = int(os.getenv("LLM_CACHE_SIZE", "1000"))
+    # EXPLANATION_REUSE=1 shares one explanation per condition bucket; wider steps mean fewer LLM calls
+    explanation_reuse = os.getenv("EXPLANATION_REUSE", "0") == "1"
+    explanation_moisture_step = float(os.getenv("EXPLANATION_MOISTURE_STEP", "5"))
+    explanation_rain_step = float(os.getenv("EXPLANATION_RAIN_STEP", "2.5"))
+    
     # Initialize data loader
     logger.info(f"📊 Loading data from: {DATA_DIR}")
     loader = DocumentLoader(DATA_DIR)
-    loader.load_soil_moisture_data()
-    documents = loader.load_agricultural_guidelines()
+    if loader.load_sensor_store() is None:
+        loader.load_soil_moisture_data()
+    else:
+        rollups = RollupEngine()
+        rollups.attach(loader.sensor_store)
+        sensor_ingest = SensorIngestService(loader.sensor_store)
+        sensor_ingest.seed_from_store()
+        await sensor_ingest.start()
+    
+    if soil_csv_poll_seconds > 0:
+        loader.follow_soil_moisture(interval=soil_csv_poll_seconds)
+    
+    # Initialize retriever, indexing guideline batches as they are loaded
+    retriever = GuidelineRetriever.from_batches(
+        loader.iter_guideline_batches(),
+        cache=ContextCache(maxsize=CONTEXT_CACHE_SIZE)
+    )
+    logger.info(f"📚 Loaded {len(loader.documents)} agricultural guideline documents")
     
-    # Initialize retriever
-    retriever = GuidelineRetriever(documents)
-    logger.info(f"📚 Loaded {len(documents)} agricultural guideline documents")
+    if guidelines_poll_seconds > 0:
+        loader.watch_guidelines(reload_guidelines, interval=guidelines_poll_seconds)
     
     # Initialize memory
-    memory = IrrigationMemory(MEMORY_FILE)
-    logger.info(f"💾 Memory system initialized")
+    memory = IrrigationMemory(
+        MEMORY_FILE,
+        store=DecisionStore(MEMORY_DB) if memory_backend == "sqlite" else None
+    )
+    logger.info(f"💾 Memory system initialized ({memory_backend})")
     
     # Initialize prompt builder
     prompt_builder = PromptBuilder()
     
-    # Initialize Gemini client
-    try:
-        gemini_client = get_gemini_client()
-        if gemini_client.check_connection():
-            logger.info("🤖 Gemini AI connected successfully")
-        else:
-            logger.warning("⚠️ Gemini connection test failed - will use fallback")
-    except Exception as e:
-        logger.error(f"❌ Gemini initialization failed: {e}")
-        gemini_client = None
+    # Initialize the Gemini response cache
+    if llm_cache_ttl_seconds > 0:
+        llm_cache = ResponseCache(LLM_CACHE_DB, ttl_seconds=llm_cache_ttl_seconds, max_entries=llm_cache_size)
+    if explanation_reuse:
+        explanation_cache = ExplanationCache(
+            moisture_step=explanation_moisture_step,
+            rain_step=explanation_rain_step
+        )
+        logger.info(f"♻️ Sharing explanations per condition bucket "
+                    f"({explanation_moisture_step}% moisture, {explanation_rain_step} mm rain)")
+    
+    # Initialize Gemini client (in the background in fast-start mode)
+    warmup_state["fast_start"] = fast_start
+    if fast_start:
+        warmup_task = asyncio.create_task(warm_up_gemini())
+    else:
+        init_gemini_client()
+        warmup_state["status"] = "ready"
     
     # Initialize services
     # Weather service will use fallback data if API key not configured
@@ -136,17 +230,83 @@ async def startup_event():
     logger.info("✅ System ready!")
 
 
+def reload_guidelines(upserts: List[Dict], removed: List[str]):
+    """Re-index changed guideline files and swap the new retriever in (watcher thread)"""
+    global retriever
+    
+    # Requests already holding the old retriever finish against it
+    retriever = retriever.apply_changes(upserts, removed)
+    logger.info(f"📚 Guidelines reloaded: {len(upserts)} added/edited, {len(removed)} removed "
+                f"(corpus {retriever.corpus_version})")
+
+
+def init_gemini_client():
+    """Create the Gemini client, discover its model and probe connectivity (blocking)"""
+    global gemini_client
+    
+    started = time.perf_counter()
+    try:
+        client = get_gemini_client(discover_model=False, cache=llm_cache)
+        if client.warm_up():
+            logger.info("🤖 Gemini AI connected successfully")
+        else:
+            logger.warning("⚠️ Gemini connection test failed - will use fallback")
+        gemini_client = client
+    except Exception as e:
+        logger.error(f"❌ Gemini initialization failed: {e}")
+        gemini_client = None
+    
+    warmup_state["gemini_connected"] = bool(gemini_client and gemini_client.connection_ok)
+    warmup_state["duration_seconds"] = round(time.perf_counter() - started, 3)
+
+
+async def warm_up_gemini():
+    """Run Gemini initialization off the event loop; requests use rule-based fallback meanwhile"""
+    warmup_state["status"] = "warming"
+    await asyncio.get_running_loop().run_in_executor(None, init_gemini_client)
+    warmup_state["status"] = "ready"
+    logger.info(f"🔥 Warm-up finished in {warmup_state['duration_seconds']}s")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush queued sensor readings and the memory log, and stop background followers before exit"""
+    if loader:
+        loader.stop_following()
+        loader.stop_watching()
+    if sensor_ingest:
+        await sensor_ingest.stop()
+    if memory:
+        memory.close()
+    if gemini_client:
+        gemini_client.close()
+    if llm_cache:
+        llm_cache.close()
+
+
+def get_field_soil_moisture(field_id: Optional[str]) -> Dict:
+    """Latest soil reading for a field, falling back to the global latest reading"""
+    if field_id and sensor_ingest:
+        reading = sensor_ingest.get_latest(field_id)
+        if reading is not None:
+            return reading
+        logger.warning(f"No sensor readings for field {field_id}, using latest global reading")
+    
+    return loader.get_latest_soil_moisture()
+
+
 @app.get("/")
 def read_root():
     """Health check and system info"""
     return {
-        "status": "running",
+        "status": "running" if warmup_state["status"] == "ready" else "warming",
         "system": "Smart Irrigation RAG System",
         "version": "2.0.0",
         "ai_model": "Gemini 1.5 Pro",
         "rag_enabled": True,
         "documents_loaded": len(loader.documents) if loader else 0,
-        "gemini_connected": gemini_client is not None
+        "gemini_connected": gemini_client is not None,
+        "warm_up": warmup_state
     }
 
 
@@ -166,119 +326,45 @@ async def create_irrigation_plan(request: IrrigationRequest):
     8. Store decision in memory
     9. Return comprehensive recommendation
     """
+    check_retrieval_mode(request)
     
     try:
-        # Step 1: Get soil moisture
-        soil_data = loader.get_latest_soil_moisture()
-        soil_moisture = soil_data["value"]
-        
-        # Step 2: Get weather data
-        if request.rainfall_mm is None:
-            try:
-                rainfall = weather_service.get_rainfall_prediction(request.location)
-            except ValueError as e:
-                logger.error(f"Weather API configuration error: {e}")
-                raise HTTPException(
-                    status_code=503, 
-                    detail=f"Weather API unavailable: {str(e)}. Please check your API key in .env file."
-                )
-            except Exception as e:
-                logger.error(f"Weather API error: {e}")
-                raise HTTPException(
-                    status_code=503, 
-                    detail=f"Weather API error: {str(e)}"
-                )
-        else:
-            rainfall = request.rainfall_mm
-        
-        # Step 3: Calculate rule-based recommendation
-        calculation = irrigation_service.calculate_irrigation_need(
-            crop_type=request.crop_type,
-            crop_stage=request.crop_stage,
-            field_size=request.field_size,
-            soil_moisture=soil_moisture,
-            rainfall_mm=rainfall
-        )
-        
-        # Step 4: Retrieve agricultural guidelines (RAG)
-        guideline_context = retriever.get_context_for_llm(
-            crop_type=request.crop_type,
-            crop_stage=request.crop_stage,
-            soil_moisture=soil_moisture,
-            rainfall=rainfall
-        )
+        # Steps 1-3: Soil moisture, weather and rule-based recommendation
+        plan = await rule_based_plan(request)
+        calculation = plan["calculation"]
         
-        # Step 5: Get memory context (RAG)
-        memory_context = memory.get_context_for_llm()
-        
-        # Step 6: Build RAG-enhanced prompt
-        prompt = prompt_builder.build_irrigation_prompt(
-            crop_type=request.crop_type,
-            crop_stage=request.crop_stage,
-            field_size=request.field_size,
-            soil_moisture=soil_moisture,
-            rainfall=rainfall,
-            guideline_context=guideline_context,
-            memory_context=memory_context,
-            calculated_recommendation=calculation
-        )
-        
-        # Step 7: Get Gemini AI reasoning
+        # Steps 4-7: Get Gemini AI reasoning
         llm_explanation = "Rule-based recommendation (AI offline)"
         sources_cited = []
         
         if gemini_client:
             try:
-                llm_response = gemini_client.generate(prompt, temperature=0.7, max_tokens=1500)
+                if explanation_cache is not None:
+                    llm_response = await generate_shared_explanation(request, calculation)
+                else:
+                    # Guidelines and memory (RAG) in the prompt
+                    prompt = build_plan_prompt(request, plan)
+                    llm_response = await gemini_client.generate_async(prompt, temperature=0.7, max_tokens=1500)
                 if llm_response["success"]:
                     llm_explanation = llm_response["text"]
-                    
-                    # Extract sources from response
-                    if "SOURCES CONSULTED:" in llm_explanation:
-                        sources_section = llm_explanation.split("SOURCES CONSULTED:")[1]
-                        sources_section = sources_section.split("DISCLAIMER:")[0] if "DISCLAIMER:" in sources_section else sources_section
-                        sources_cited = [line.strip() for line in sources_section.split('\n') if line.strip() and line.strip() != ""]
+                    sources_cited = parse_sources(llm_explanation)
             except Exception as e:
                 logger.error(f"Gemini generation failed: {e}")
                 llm_explanation = f"Rule-based recommendation: {calculation['reasoning']}"
         
         # Step 8: Store in memory
-        memory.add_irrigation_decision({
-            "crop_type": request.crop_type,
-            "crop_stage": request.crop_stage,
-            "field_size": request.field_size,
-            "soil_moisture": soil_moisture,
-            "rainfall": rainfall,
-            "water_applied": calculation["water_amount"],
-            "decision": calculation["decision"],
-            "reasoning": llm_explanation[:200]  # Store abbreviated version
-        })
+        record_plan_decision(request, plan, llm_explanation)
         
         # Step 9: Check for proactive rain alerts (next 3 days)
-        rain_alert = None
-        try:
-            future_forecast = weather_service.get_forecast(request.location, days=3)
-            for day_forecast in future_forecast.get("forecasts", [])[1:]:  # Skip today, check next 2 days
-                future_rain = day_forecast.get("rainfall_mm", 0)
-                if future_rain > 5:
-                    rain_alert = {
-                        "has_upcoming_rain": True,
-                        "next_rain_date": day_forecast.get("date"),
-                        "predicted_rainfall": future_rain,
-                        "alert_level": "high" if future_rain > 10 else "medium",
-                        "message": f"Rain ({future_rain:.1f}mm) predicted for {day_forecast.get('date')}. Plan irrigation accordingly."
-                    }
-                    break
-        except Exception as e:
-            logger.warning(f"Could not check future rain alerts: {e}")
+        rain_alert = await upcoming_rain_alert(request.location)
         
         # Step 10: Return response
         return IrrigationResponse(
             decision=calculation["decision"],
             water_amount=calculation["water_amount"],
             water_per_hectare=calculation["water_per_hectare"],
-            soil_moisture=soil_moisture,
-            rainfall=rainfall,
+            soil_moisture=plan["soil_moisture"],
+            rainfall=plan["rainfall"],
             reasoning=calculation["reasoning"],
             llm_explanation=llm_explanation,
             sources_cited=sources_cited,
@@ -292,14 +378,358 @@ async def create_irrigation_plan(request: IrrigationRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/irrigation-plan/stream")
+async def stream_irrigation_plan(request: IrrigationRequest):
+    """
+    Irrigation plan as Server-Sent Events, each part sent as soon as it is ready
+    
+    Events:
+    - decision: the rule-based recommendation, sent once it is calculated
+      (before guidelines are retrieved or Gemini is called)
+    - token: {"text": ...} pieces of Gemini's explanation as they are generated
+      (a shared explanation, with EXPLANATION_REUSE, arrives in one piece)
+    - done: llm_explanation, sources_cited (parsed SOURCES CONSULTED),
+      rain_alert, rag_context_used and timestamp
+    - error: {"detail": ...} if the plan fails after the stream started
+    
+    Errors before the decision is known are returned as HTTP errors.
+    """
+    check_retrieval_mode(request)
+    
+    try:
+        plan = await rule_based_plan(request)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in irrigation planning: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return StreamingResponse(
+        plan_events(request, plan),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def plan_events(request: IrrigationRequest, plan: Dict):
+    """Server-Sent Events of a streamed irrigation plan (see stream_irrigation_plan)"""
+    calculation = plan["calculation"]
+    yield sse_event("decision", {
+        "decision": calculation["decision"],
+        "water_amount": calculation["water_amount"],
+        "water_per_hectare": calculation["water_per_hectare"],
+        "soil_moisture": plan["soil_moisture"],
+        "rainfall": plan["rainfall"],
+        "reasoning": calculation["reasoning"],
+        "timestamp": datetime.now().isoformat()
+    })
+    
+    # The forecast is fetched while Gemini writes
+    rain_alert = asyncio.create_task(upcoming_rain_alert(request.location))
+    try:
+        llm_explanation = "Rule-based recommendation (AI offline)"
+        sources_cited = []
+        
+        if gemini_client:
+            try:
+                if explanation_cache is not None:
+                    llm_response = await generate_shared_explanation(request, calculation)
+                    if llm_response["success"]:
+                        llm_explanation = llm_response["text"]
+                        yield sse_event("token", {"text": llm_explanation})
+                else:
+                    prompt = build_plan_prompt(request, plan)
+                    parts = []
+                    async for text in gemini_client.generate_stream_async(prompt, temperature=0.7, max_tokens=1500):
+                        parts.append(text)
+                        yield sse_event("token", {"text": text})
+                    llm_explanation = "".join(parts)
+                sources_cited = parse_sources(llm_explanation)
+            except Exception as e:
+                logger.error(f"Gemini generation failed: {e}")
+                llm_explanation = f"Rule-based recommendation: {calculation['reasoning']}"
+        
+        record_plan_decision(request, plan, llm_explanation)
+        
+        yield sse_event("done", {
+            "llm_explanation": llm_explanation,
+            "sources_cited": sources_cited,
+            "rain_alert": await rain_alert,
+            "rag_context_used": True,
+            "timestamp": datetime.now().isoformat()
+        })
+    except Exception as e:
+        logger.error(f"Error in streamed irrigation planning: {e}")
+        yield sse_event("error", {"detail": str(e)})
+    finally:
+        rain_alert.cancel()
+
+
+def sse_event(event: str, data: Dict) -> str:
+    """One Server-Sent Events message with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def check_retrieval_mode(request: IrrigationRequest):
+    if request.retrieval_mode not in RETRIEVAL_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"retrieval_mode must be one of: {', '.join(RETRIEVAL_MODES)}"
+        )
+
+
+async def rule_based_plan(request: IrrigationRequest) -> Dict:
+    """
+    Soil moisture, rainfall and the rule-based recommendation for a request
+    
+    Returns:
+        Dict with 'soil_moisture', 'rainfall' and 'calculation' (from IrrigationService)
+    """
+    # Step 1: Get soil moisture
+    soil_data = get_field_soil_moisture(request.field_id)
+    soil_moisture = soil_data["value"]
+    
+    # Step 2: Get weather data
+    if request.rainfall_mm is None:
+        try:
+            rainfall = await weather_service.get_rainfall_prediction_async(request.location)
+        except ValueError as e:
+            logger.error(f"Weather API configuration error: {e}")
+            raise HTTPException(
+                status_code=503, 
+                detail=f"Weather API unavailable: {str(e)}. Please check your API key in .env file."
+            )
+        except Exception as e:
+            logger.error(f"Weather API error: {e}")
+            raise HTTPException(
+                status_code=503, 
+                detail=f"Weather API error: {str(e)}"
+            )
+    else:
+        rainfall = request.rainfall_mm
+    
+    # Step 3: Calculate rule-based recommendation
+    calculation = irrigation_service.calculate_irrigation_need(
+        crop_type=request.crop_type,
+        crop_stage=request.crop_stage,
+        field_size=request.field_size,
+        soil_moisture=soil_moisture,
+        rainfall_mm=rainfall
+    )
+    
+    return {"soil_moisture": soil_moisture, "rainfall": rainfall, "calculation": calculation}
+
+
+def build_plan_prompt(request: IrrigationRequest, plan: Dict) -> str:
+    """RAG-enhanced prompt for a rule-based plan (from rule_based_plan)"""
+    # Step 4: Retrieve agricultural guidelines (RAG)
+    guideline_context = retriever.get_context_for_llm(
+        crop_type=request.crop_type,
+        crop_stage=request.crop_stage,
+        soil_moisture=plan["soil_moisture"],
+        rainfall=plan["rainfall"],
+        mode=request.retrieval_mode,
+        moisture_threshold=plan["calculation"]["moisture_threshold"]
+    )
+    
+    # Step 5: Get memory context (RAG)
+    memory_context = memory.get_context_for_llm(farm_id=request.farm_id, field_id=request.field_id)
+    
+    # Step 6: Build RAG-enhanced prompt
+    return prompt_builder.build_irrigation_prompt(
+        crop_type=request.crop_type,
+        crop_stage=request.crop_stage,
+        field_size=request.field_size,
+        soil_moisture=plan["soil_moisture"],
+        rainfall=plan["rainfall"],
+        guideline_context=guideline_context,
+        memory_context=memory_context,
+        calculated_recommendation=plan["calculation"]
+    )
+
+
+def parse_sources(llm_explanation: str) -> list:
+    """Lines of the explanation's SOURCES CONSULTED section"""
+    if "SOURCES CONSULTED:" not in llm_explanation:
+        return []
+    sources_section = llm_explanation.split("SOURCES CONSULTED:")[1]
+    sources_section = sources_section.split("DISCLAIMER:")[0] if "DISCLAIMER:" in sources_section else sources_section
+    return [line.strip() for line in sources_section.split('\n') if line.strip() and line.strip() != ""]
+
+
+def record_plan_decision(request: IrrigationRequest, plan: Dict, llm_explanation: str):
+    calculation = plan["calculation"]
+    memory.add_irrigation_decision({
+        "farm_id": request.farm_id,
+        "field_id": request.field_id,
+        "crop_type": request.crop_type,
+        "crop_stage": request.crop_stage,
+        "field_size": request.field_size,
+        "soil_moisture": plan["soil_moisture"],
+        "rainfall": plan["rainfall"],
+        "water_applied": calculation["water_amount"],
+        "decision": calculation["decision"],
+        "reasoning": llm_explanation[:200]  # Store abbreviated version
+    })
+
+
+async def upcoming_rain_alert(location: Optional[str]) -> Optional[Dict]:
+    """Alert for significant rain in the next 2 days, or None"""
+    try:
+        future_forecast = await weather_service.get_forecast_async(location, days=3)
+        for day_forecast in future_forecast.get("forecasts", [])[1:]:  # Skip today, check next 2 days
+            future_rain = day_forecast.get("rainfall_mm", 0)
+            if future_rain > 5:
+                return {
+                    "has_upcoming_rain": True,
+                    "next_rain_date": day_forecast.get("date"),
+                    "predicted_rainfall": future_rain,
+                    "alert_level": "high" if future_rain > 10 else "medium",
+                    "message": f"Rain ({future_rain:.1f}mm) predicted for {day_forecast.get('date')}. Plan irrigation accordingly."
+                }
+    except Exception as e:
+        logger.warning(f"Could not check future rain alerts: {e}")
+    return None
+
+
+async def generate_shared_explanation(request: IrrigationRequest, calculation: Dict) -> Dict:
+    """
+    Explanation shared by all requests in the same condition bucket, with this field's figures
+    
+    A bucket's template is generated on its first request, from guidelines
+    retrieved for the middle of its bands and without any field's history,
+    then reused until it expires.
+    """
+    current = retriever
+    bucket = explanation_cache.bucket(
+        current.corpus_version, request.retrieval_mode, request.crop_type, request.crop_stage, calculation
+    )
+    template = explanation_cache.get(bucket)
+    
+    if template is None:
+        threshold = calculation["moisture_threshold"]
+        soil_moisture, rainfall = explanation_cache.representative(bucket, threshold)
+        prompt = prompt_builder.build_irrigation_template_prompt(
+            crop_type=request.crop_type,
+            crop_stage=request.crop_stage,
+            conditions=explanation_cache.describe(bucket, threshold),
+            guideline_context=current.get_context_for_llm(
+                crop_type=request.crop_type,
+                crop_stage=request.crop_stage,
+                soil_moisture=soil_moisture,
+                rainfall=rainfall,
+                mode=request.retrieval_mode,
+                moisture_threshold=threshold
+            ),
+            decision=calculation["decision"],
+            placeholders=PLACEHOLDERS
+        )
+        response = await gemini_client.generate_async(prompt, temperature=0.7, max_tokens=1500)
+        if not response["success"]:
+            return response
+        template = response["text"]
+        explanation_cache.put(bucket, template)
+    
+    return {
+        "success": True,
+        "text": explanation_cache.fill(template, {
+            "soil_moisture": calculation["soil_moisture"],
+            "rainfall": calculation["rainfall"],
+            "field_size": request.field_size,
+            "water_amount": calculation["water_amount"],
+            "water_per_hectare": calculation["water_per_hectare"]
+        }),
+        "model": "gemini-1.5-pro"
+    }
+
+
+@app.post("/sensor-readings")
+async def ingest_sensor_readings(batch: SensorBatch):
+    """
+    Bulk ingest of field sensor readings from gateways
+    
+    Readings are group-committed to the sensor store; the call returns once
+    they are durable and the per-field latest readings are updated.
+    """
+    if sensor_ingest is None:
+        raise HTTPException(status_code=503, detail="Sensor store unavailable")
+    
+    if len(batch.readings) > MAX_READINGS_PER_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many readings in one batch (max {MAX_READINGS_PER_BATCH})"
+        )
+    
+    try:
+        readings = []
+        for reading in batch.readings:
+            data = reading.dict()
+            if reading.timestamp is not None:
+                data["timestamp"] = reading.timestamp.timestamp()
+            readings.append(data)
+        
+        result = await sensor_ingest.ingest(readings)
+        return {
+            **result,
+            "ingested_at": datetime.now().isoformat()
+        }
+    except Exception as e:
+        logger.error(f"Error ingesting sensor readings: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/soil-moisture/history")
+async def get_soil_moisture_history(
+    field_id: Optional[str] = None,
+    resolution: str = "1h",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 500
+):
+    """
+    Pre-aggregated soil moisture history for a field
+    
+    Args:
+        field_id: Field to query (omit for the untagged CSV sensor log)
+        resolution: '1m', '1h' or '1d'
+        start: Earliest window start to include
+        end: Exclude windows starting at or after this time
+        limit: Maximum number of most recent points
+    """
+    if rollups is None:
+        raise HTTPException(status_code=503, detail="Sensor store unavailable")
+    
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown resolution '{resolution}'. Use one of: {', '.join(RESOLUTIONS)}"
+        )
+    
+    field = field_id or DEFAULT_FIELD
+    points = rollups.query(
+        field,
+        resolution,
+        start_ts=int(start.timestamp()) if start else None,
+        end_ts=int(end.timestamp()) if end else None,
+        limit=max(1, min(limit, 5000))
+    )
+    
+    return {
+        "field_id": field,
+        "resolution": resolution,
+        "points": points,
+        "total_points": len(points)
+    }
+
+
 @app.get("/weekly-report")
-async def get_weekly_report():
-    """Generate weekly irrigation report with water savings"""
+async def get_weekly_report(farm_id: Optional[str] = None, field_id: Optional[str] = None):
+    """Generate weekly irrigation report with water savings for a farm field"""
     
     try:
         # Get weekly summary from memory
-        summary = memory.get_weekly_summary()
-        savings = memory.calculate_water_savings()
+        summary = memory.get_weekly_summary(farm_id=farm_id, field_id=field_id)
+        savings = memory.calculate_water_savings(farm_id=farm_id, field_id=field_id)
         
         # Generate AI report if Gemini available
         report_text = ""
@@ -310,7 +740,7 @@ async def get_weekly_report():
                 crop_type="mixed"  # Could be enhanced to track crop types
             )
             
-            response = gemini_client.generate_with_fallback(
+            response = await gemini_client.generate_with_fallback_async(
                 prompt,
                 fallback_text="Weekly report: Check statistics below",
                 temperature=0.8,
@@ -336,7 +766,7 @@ async def get_weather_forecast(location: Optional[str] = None, days: int = 7):
     """Get weather forecast"""
     
     try:
-        forecast = weather_service.get_forecast(location, days)
+        forecast = await weather_service.get_forecast_async(location, days)
         return forecast
     except Exception as e:
         logger.error(f"Weather forecast error: {e}")
@@ -351,21 +781,72 @@ async def get_system_info():
     return {
         "rag_components": {
             "documents_loaded": loader.get_document_summary() if loader else {},
-            "memory_entries": len(memory.memory) if memory else 0,
-            "retriever_active": retriever is not None
+            "memory_entries": memory.count() if memory else 0,
+            "retriever_active": retriever is not None,
+            "guideline_load": loader.guideline_load_stats if loader else None,
+            "context_cache": retriever.cache.stats() if retriever and retriever.cache is not None else None
         },
         "llm": {
             "model": "gemini-1.5-pro",
             "connected": gemini_client is not None,
-            "provider": "Google Gemini API"
+            "provider": "Google Gemini API",
+            "async_calls": gemini_client.async_stats if gemini_client else None,
+            "coalescing": gemini_client.flights.stats() if gemini_client else None,
+            "response_cache": llm_cache.stats() if llm_cache else None,
+            "explanation_cache": explanation_cache.stats() if explanation_cache else None
         },
         "services": {
             "weather": "real",  # Always uses real API (no mock data)
+            "weather_coalescing": weather_service.flights.stats() if weather_service else None,
             "irrigation": "rule-based"
         }
     }
 
 
+@app.get("/guideline-facts")
+async def get_guideline_facts(
+    kind: Optional[str] = None,
+    crop: Optional[str] = None,
+    stage: Optional[str] = None,
+    source: Optional[str] = None,
+    cross_check: bool = True
+):
+    """
+    Structured facts extracted from the guideline documents at load time
+    
+    Args:
+        kind: 'water_requirement' or 'moisture_threshold'
+        crop: Filter by crop (rice, wheat, maize)
+        stage: Filter by growth stage (early, vegetative, flowering)
+        source: Filter by document (FAO, ICAR, CIMMYT)
+        cross_check: Compare IrrigationService rule values against the facts
+    """
+    if retriever is None:
+        raise HTTPException(status_code=503, detail="Retriever not initialized")
+    
+    if kind is not None and kind not in FACT_KINDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown kind '{kind}'. Use one of: {', '.join(FACT_KINDS)}"
+        )
+    
+    facts = retriever.facts.query(kind=kind, crop=crop, stage=stage, source=source)
+    result = {
+        "facts": facts,
+        "total_facts": len(facts),
+        "corpus_version": retriever.corpus_version
+    }
+    
+    if cross_check:
+        result["cross_check"] = check_rules_against_facts(
+            retriever.facts,
+            IrrigationService.WATER_REQUIREMENTS,
+            IrrigationService.MOISTURE_THRESHOLDS
+        )
+    
+    return result
+
+
 @app.post("/weekly-schedule")
 async def generate_weekly_schedule(request: IrrigationRequest):
     """
@@ -374,12 +855,12 @@ async def generate_weekly_schedule(request: IrrigationRequest):
     Returns a week's worth of daily irrigation plans
     """
     try:
-        # Get current soil moisture (will be updated daily in real scenario)
-        soil_data = loader.get_latest_soil_moisture()
+        # Get current soil moisture for this field
+        soil_data = get_field_soil_moisture(request.field_id)
         base_soil_moisture = soil_data["value"]
         
         # Get 7-day weather forecast
-        forecast = weather_service.get_forecast(request.location, days=7)
+        forecast = await weather_service.get_forecast_async(request.location, days=7)
         
         weekly_plans = []
         
@@ -412,11 +893,17 @@ async def generate_weekly_schedule(request: IrrigationRequest):
                 "reasoning": calculation["reasoning"]
             })
         
+        # Recent daily moisture trend from pre-aggregated rollups
+        moisture_history = []
+        if rollups:
+            moisture_history = rollups.query(request.field_id or DEFAULT_FIELD, "1d", limit=7)
+        
         return {
             "crop_type": request.crop_type,
             "crop_stage": request.crop_stage,
             "field_size": request.field_size,
             "schedule": weekly_plans,
+            "moisture_history": moisture_history,
             "total_water_week": sum(plan["water_amount"] for plan in weekly_plans),
             "irrigation_days": sum(1 for plan in weekly_plans if plan["decision"] == "irrigate"),
             "skip_days": sum(1 for plan in weekly_plans if plan["decision"] == "skip"),
@@ -430,16 +917,19 @@ async def generate_weekly_schedule(request: IrrigationRequest):
 
 
 @app.get("/export/weekly-report")
-async def export_weekly_report(format: str = "json"):
+async def export_weekly_report(format: str = "json", farm_id: Optional[str] = None,
+                               field_id: Optional[str] = None):
     """
     Export weekly report in JSON or CSV format
     
     Args:
         format: 'json' or 'csv'
+        farm_id: Farm to report on (omit for decisions without one)
+        field_id: Field to report on (omit for decisions without one)
     """
     try:
-        summary = memory.get_weekly_summary()
-        savings = memory.calculate_water_savings()
+        summary = memory.get_weekly_summary(farm_id=farm_id, field_id=field_id)
+        savings = memory.calculate_water_savings(farm_id=farm_id, field_id=field_id)
         
         if format.lower() == "csv":
             from fastapi.responses import Response
@@ -500,7 +990,7 @@ async def check_rain_alert(location: Optional[str] = None, days_ahead: int = 3):
     Returns alerts if significant rain is predicted that would affect irrigation
     """
     try:
-        forecast = weather_service.get_forecast(location, days=days_ahead)
+        forecast = await weather_service.get_forecast_async(location, days=days_ahead)
         
         alerts = []
         
@@ -540,12 +1030,22 @@ async def check_rain_alert(location: Optional[str] = None, days_ahead: int = 3):
 
 
 @app.get("/export/irrigation-history")
-async def export_irrigation_history(format: str = "json"):
+async def export_irrigation_history(format: str = "json", farm_id: Optional[str] = None,
+                                    field_id: Optional[str] = None,
+                                    start: Optional[datetime] = None,
+                                    end: Optional[datetime] = None):
     """
-    Export full irrigation history in JSON or CSV format
+    Export full irrigation history of a farm field in JSON or CSV format
+    
+    Args:
+        start: Earliest decision time to include (default: last 30 days)
+        end: Exclude decisions at or after this time
     """
     try:
-        history = memory.get_recent_history(days=30)
+        if start is None and end is None:
+            history = memory.get_recent_history(days=30, farm_id=farm_id, field_id=field_id)
+        else:
+            history = memory.get_history_between(start, end, farm_id=farm_id, field_id=field_id)
         
         if format.lower() == "csv":
             from fastapi.responses import Response
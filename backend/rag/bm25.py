@@ -0,0 +1,172 @@
+"""
+RAG Component: BM25 Index
+Okapi BM25 ranking over guideline chunks
+"""
+
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+import heapq
+import math
+import logging
+
+from backend.rag.index import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a set of passages
+    
+    Term frequencies are stored per term (postings), so a query only touches
+    the passages that contain at least one of its terms. IDF and the average
+    passage length are derived from running counts.
+    
+    Postings live in immutable segments: added passages form a new segment
+    and removed passages are skipped at query time, so updates cost time
+    proportional to the passages changed. A segment is merged into its
+    predecessor once it reaches half its size, which drops removed passages
+    and keeps the segment count logarithmic.
+    """
+    
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            k1: Term-frequency saturation
+            b: Length normalization strength (0 = none, 1 = full)
+        """
+        self.k1 = k1
+        self.b = b
+        # Per segment: term -> {passage_id: term frequency}
+        self._segments: List[Dict[str, Dict[int, int]]] = []
+        self._segment_sizes: List[int] = []
+        # term -> number of live passages containing it
+        self.df: Dict[str, int] = {}
+        self.lengths: List[int] = []
+        self._terms: List[Optional[tuple]] = []  # distinct terms per live passage
+        self._alive = 0
+        self._total_length = 0
+    
+    @property
+    def avg_length(self) -> float:
+        return self._total_length / self._alive if self._alive else 0.0
+    
+    def clone(self) -> "BM25Index":
+        """Copy for incremental updates; segments are immutable and shared"""
+        other = BM25Index.__new__(BM25Index)
+        other.__dict__.update(self.__dict__)
+        other._segments = list(self._segments)
+        other._segment_sizes = list(self._segment_sizes)
+        other.df = dict(self.df)
+        other.lengths = list(self.lengths)
+        other._terms = list(self._terms)
+        return other
+    
+    def add_all(self, texts: List[str]):
+        """Index passages as a new segment, numbering them after the existing ones"""
+        self.add_counts([Counter(tokenize(text)) for text in texts])
+    
+    def add_counts(self, passages: List[Dict[str, int]]):
+        """Like add_all, from term counts already computed per passage"""
+        if not passages:
+            return
+        
+        segment: Dict[str, Dict[int, int]] = {}
+        for counts in passages:
+            passage_id = len(self.lengths)
+            length = sum(counts.values())
+            self.lengths.append(length)
+            self._terms.append(tuple(counts))
+            self._alive += 1
+            self._total_length += length
+            for term, tf in counts.items():
+                segment.setdefault(term, {})[passage_id] = tf
+                self.df[term] = self.df.get(term, 0) + 1
+        
+        self._segments.append(segment)
+        self._segment_sizes.append(len(passages))
+        
+        while len(self._segments) > 1 and self._segment_sizes[-1] * 2 >= self._segment_sizes[-2]:
+            self._merge_last_two()
+    
+    def _merge_last_two(self):
+        """Merge the newest segment into its predecessor, dropping removed passages"""
+        newer, older = self._segments.pop(), self._segments.pop()
+        size = sum(self._segment_sizes[-2:])
+        self._segment_sizes[-2:] = []
+        
+        if sum(self._segment_sizes) + size == self._alive:
+            # Nothing removed: share posting dicts, copying only terms in both
+            merged = dict(older)
+            for term, postings in newer.items():
+                existing = merged.get(term)
+                merged[term] = {**existing, **postings} if existing else postings
+            self._segments.append(merged)
+            self._segment_sizes.append(size)
+            return
+        
+        merged: Dict[str, Dict[int, int]] = {}
+        passages = set()
+        for segment in (older, newer):
+            for term, postings in segment.items():
+                for passage_id, tf in postings.items():
+                    if self._terms[passage_id] is not None:
+                        merged.setdefault(term, {})[passage_id] = tf
+                        passages.add(passage_id)
+        
+        self._segments.append(merged)
+        self._segment_sizes.append(len(passages))
+    
+    def remove(self, passage_id: int):
+        """Drop a passage; its id is not reused"""
+        terms = self._terms[passage_id]
+        if terms is None:
+            return
+        
+        for term in terms:
+            if self.df[term] == 1:
+                del self.df[term]
+            else:
+                self.df[term] -= 1
+        
+        self._alive -= 1
+        self._total_length -= self.lengths[passage_id]
+        self.lengths[passage_id] = 0
+        self._terms[passage_id] = None
+    
+    def __len__(self) -> int:
+        return self._alive
+    
+    def idf(self, term: str) -> float:
+        df = self.df.get(term, 0)
+        return math.log(1 + (self._alive - df + 0.5) / (df + 0.5))
+    
+    def search(self, query_terms: List[str], top_k: int = 5,
+               tiebreak: Optional[Callable[[int], tuple]] = None) -> List[Tuple[int, float]]:
+        """
+        Rank passages for a bag of query terms
+        
+        Args:
+            query_terms: Tokens to match (repeats weight a term more)
+            top_k: Number of passages to return
+            tiebreak: Sort key among equal scores (defaults to passage id)
+        
+        Returns:
+            (passage_id, score) pairs, best first; passages scoring 0 are omitted
+        """
+        scores: Dict[int, float] = {}
+        k1, b, avg_length = self.k1, self.b, self.avg_length or 1.0
+        
+        for term, weight in Counter(query_terms).items():
+            if term not in self.df:
+                continue
+            idf = self.idf(term) * weight
+            for segment in self._segments:
+                for passage_id, tf in segment.get(term, {}).items():
+                    if self._terms[passage_id] is None:
+                        continue
+                    norm = k1 * (1 - b + b * self.lengths[passage_id] / avg_length)
+                    scores[passage_id] = scores.get(passage_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        
+        tiebreak = tiebreak or (lambda passage_id: passage_id)
+        return heapq.nsmallest(top_k, scores.items(), key=lambda item: (-item[1], tiebreak(item[0])))
@@ -0,0 +1,75 @@
+"""
+RAG Component: Guideline Chunker
+Splits guideline documents into headed sections for passage retrieval
+"""
+
+from typing import Dict, List
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Section titles in the guideline files are framed by lines of '='
+BANNER_PATTERN = re.compile(r"^\s*={3,}\s*$")
+
+
+def chunk_document(content: str, max_lines: int = 12) -> List[Dict]:
+    """
+    Split a guideline document into paragraph chunks under their section title
+    
+    Paragraphs are blank-line separated blocks. A paragraph that is only a
+    lead-in line ("Growth Stages:") is merged into the block that follows it,
+    and paragraphs longer than max_lines are split.
+    
+    Args:
+        content: Document text
+        max_lines: Maximum lines per chunk
+    
+    Returns:
+        List of dicts with 'section', 'text' and 'line' (0-based first line)
+    """
+    lines = content.split('\n')
+    chunks = []
+    section = ""
+    paragraph = []  # (line number, text)
+    
+    def flush():
+        body = [(i, line) for i, line in paragraph if line.strip()]
+        paragraph.clear()
+        for start in range(0, len(body), max_lines):
+            part = body[start:start + max_lines]
+            chunks.append({
+                "section": section,
+                "text": '\n'.join(line.rstrip() for _, line in part),
+                "line": part[0][0]
+            })
+    
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        
+        if BANNER_PATTERN.match(line):
+            # "=====\nTITLE\n=====" starts a new section; a lone banner just ends a paragraph
+            flush()
+            if i + 2 < len(lines) and lines[i + 1].strip() and BANNER_PATTERN.match(lines[i + 2]):
+                section = lines[i + 1].strip()
+                i += 3
+                continue
+        elif not line.strip():
+            # Keep a lone lead-in line attached to the paragraph after it
+            is_lead_in = len(paragraph) == 1 and paragraph[0][1].rstrip().endswith(':')
+            if not is_lead_in:
+                flush()
+        else:
+            paragraph.append((i, line))
+        
+        i += 1
+    
+    flush()
+    return chunks
+
+
+def passage_text(chunk: Dict) -> str:
+    """Text indexed for a chunk: its section title and body"""
+    return f"{chunk['section']}\n{chunk['text']}"
@@ -0,0 +1,104 @@
+"""
+RAG Component: Context Cache
+Bounded LRU cache for guideline context blocks built by the retriever
+"""
+
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+import hashlib
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def corpus_version(documents) -> str:
+    """
+    Short hash identifying a loaded guideline corpus
+    
+    Uses each document's precomputed content hash when the loader set one,
+    so restamping after a reload does not re-hash unchanged documents.
+    Removed documents (None) are skipped.
+    """
+    digest = hashlib.sha1()
+    for doc in documents:
+        if doc is None:
+            continue
+        digest.update(doc["source"].encode('utf-8'))
+        digest.update(b'\0')
+        digest.update((doc.get("hash") or doc["content"]).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:12]
+
+
+class ContextCache:
+    """
+    Least-recently-used cache of retrieved guideline text
+    
+    Keys start with the corpus version they were built from. When a
+    retriever over a new corpus version stores its first entry, entries
+    for older versions are dropped, so reloading guidelines never serves
+    stale context.
+    """
+    
+    def __init__(self, maxsize: int = 256):
+        """
+        Args:
+            maxsize: Maximum number of cached entries
+        """
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: tuple) -> Optional[str]:
+        """Cached value for key (first element is the corpus version), or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key: tuple, value: str):
+        """Store value, evicting the least recently used entry when full"""
+        with self._lock:
+            version = key[0]
+            if version != self._version:
+                if self._entries:
+                    logger.info(f"Corpus version changed ({self._version} -> {version}); clearing context cache")
+                self._entries.clear()
+                self._version = version
+            
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def stats(self) -> Dict:
+        """Hit/miss counters and occupancy"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "corpus_version": self._version,
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
@@ -0,0 +1,294 @@
+"""
+RAG Component: Parallel Corpus Loader
+Loads large guideline corpora with pipelined file reads, chunking and indexing
+"""
+
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+import logging
+
+from backend.rag.chunker import chunk_document, passage_text
+from backend.rag.facts import extract_facts
+from backend.rag.index import tokenize
+from backend.rag.vector_index import N_FEATURES, NGRAMS, hash_features, passage_vector
+
+logger = logging.getLogger(__name__)
+
+
+def read_guideline_file(path: Path) -> Tuple[str, Tuple[int, int], float]:
+    """
+    Read one guideline file (runs on the I/O thread pool)
+    
+    Returns:
+        (content, (mtime_ns, size), seconds spent)
+    """
+    start = time.perf_counter()
+    stat = os.stat(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return content, (stat.st_mtime_ns, stat.st_size), time.perf_counter() - start
+
+
+def prepare_guideline_document(path: str, content: str) -> Dict:
+    """
+    Guideline document with its content hash, chunks, facts and index features
+    
+    Module-level so it can run in a worker process. 'index_features' holds
+    each chunk's BM25 term counts and hashed TF-IDF vector, so the index
+    builder only merges them; the retriever drops it once indexed.
+    """
+    source = Path(path).stem.upper()  # FAO, ICAR, CIMMYT
+    chunks = chunk_document(content)
+    passages = [passage_text(chunk) for chunk in chunks]
+    return {
+        "source": source,
+        "content": content,
+        "path": path,
+        "type": "guideline",
+        "hash": hashlib.sha1(content.encode('utf-8')).hexdigest(),
+        "chunks": chunks,
+        "facts": extract_facts(content, source),
+        "index_features": {
+            "hash_space": (N_FEATURES, NGRAMS),
+            "terms": [Counter(tokenize(text)) for text in passages],
+            "vectors": [passage_vector(hash_features(text)) for text in passages]
+        }
+    }
+
+
+def _timed_prepare(path: str, content: str) -> Tuple[Dict, float]:
+    start = time.perf_counter()
+    doc = prepare_guideline_document(path, content)
+    return doc, time.perf_counter() - start
+
+
+class ParallelCorpusLoader:
+    """
+    Three-stage pipeline: read -> prepare -> index
+    
+    Files are read on a thread pool (I/O bound, releases the GIL), then
+    hashed, chunked, fact-extracted and tokenized on a process pool (CPU
+    bound). Prepared documents are handed to the consumer in batches, in
+    file order, as they become ready, so indexing overlaps with loading.
+    At most `max_pending` files are in flight between the stages, which
+    bounds memory independently of corpus size.
+    
+    Stage throughput is per busy worker-second (time summed over the
+    stage's workers); comparing it with the wall-clock rate of the whole
+    pipeline shows which stage bounds the load.
+    """
+    
+    def __init__(self, io_workers: int = 8, cpu_workers: Optional[int] = None,
+                 batch_size: int = 64, max_pending: int = 256,
+                 progress_interval: float = 2.0):
+        """
+        Args:
+            io_workers: Threads reading files
+            cpu_workers: Processes preparing documents (None = CPU count;
+                0 prepares on the I/O threads, for small corpora)
+            batch_size: Documents per batch handed to the consumer
+            max_pending: Files read or being prepared but not yet consumed
+            progress_interval: Seconds between progress log lines
+        """
+        self.io_workers = max(1, io_workers)
+        self.cpu_workers = (os.cpu_count() or 1) if cpu_workers is None else cpu_workers
+        self.batch_size = max(1, batch_size)
+        self.max_pending = max(self.batch_size, max_pending)
+        self.progress_interval = progress_interval
+        self._lock = threading.Lock()
+        self._reset_stats(0)
+    
+    def _reset_stats(self, total: int):
+        self._total = total
+        self._started = time.perf_counter()
+        self._finished = None
+        self._counts = {"read": 0, "bytes": 0, "prepared": 0, "chunks": 0, "indexed": 0, "failed": 0}
+        self._busy = {"read": 0.0, "prepare": 0.0, "index": 0.0}
+    
+    def iter_batches(self, paths: Iterable[Path],
+                     on_document: Optional[Callable[[Dict, Tuple[int, int]], None]] = None
+                     ) -> Iterator[List[Dict]]:
+        """
+        Load guideline files, yielding prepared documents in batches
+        
+        Time the consumer spends between batches is counted as index time.
+        Files that fail to read or prepare are logged and skipped.
+        
+        Args:
+            paths: Guideline files, in the order documents should be yielded
+            on_document: Called as on_document(doc, (mtime_ns, size)) for each
+                document, in order, before its batch is yielded
+        """
+        paths = list(paths)
+        self._reset_stats(len(paths))
+        logger.info(f"Loading {len(paths)} guideline files "
+                    f"({self.io_workers} I/O threads, {self.cpu_workers} worker processes)")
+        
+        io_pool = ThreadPoolExecutor(self.io_workers, thread_name_prefix="guideline-read")
+        # spawn, not fork: the server may already be running background threads
+        cpu_pool = ProcessPoolExecutor(
+            self.cpu_workers, mp_context=multiprocessing.get_context("spawn")
+        ) if self.cpu_workers > 0 else None
+        pending: deque = deque()
+        next_path = iter(paths)
+        last_report = time.perf_counter()
+        batch = []
+        
+        try:
+            while True:
+                while len(pending) < self.max_pending:
+                    path = next(next_path, None)
+                    if path is None:
+                        break
+                    pending.append((path, self._submit(path, io_pool, cpu_pool)))
+                
+                if not pending:
+                    break
+                
+                path, future = pending.popleft()
+                try:
+                    doc, signature = future.result()
+                except Exception as e:
+                    logger.error(f"Error loading {path}: {e}")
+                    with self._lock:
+                        self._counts["failed"] += 1
+                    continue
+                
+                if on_document is not None:
+                    on_document(doc, signature)
+                batch.append(doc)
+                
+                if len(batch) >= self.batch_size:
+                    yield from self._hand_off(batch)
+                    batch = []
+                
+                if time.perf_counter() - last_report >= self.progress_interval:
+                    self._log_progress()
+                    last_report = time.perf_counter()
+            
+            if batch:
+                yield from self._hand_off(batch)
+        finally:
+            # On early exit, queued work is dropped rather than finished
+            for _, future in pending:
+                future.cancel()
+            io_pool.shutdown(wait=True, cancel_futures=True)
+            if cpu_pool is not None:
+                cpu_pool.shutdown(wait=True, cancel_futures=True)
+        
+        self._finished = time.perf_counter()
+        stats = self.stats()
+        logger.info(f"Loaded {stats['indexed']}/{stats['total']} guideline files in "
+                    f"{stats['wall_seconds']}s ({stats['docs_per_s']} docs/s; "
+                    f"read {stats['stages']['read']['mb_per_s']} MB/s, "
+                    f"prepare {stats['stages']['prepare']['docs_per_s']} docs/s, "
+                    f"index {stats['stages']['index']['docs_per_s']} docs/s)")
+    
+    def _hand_off(self, batch: List[Dict]) -> Iterator[List[Dict]]:
+        start = time.perf_counter()
+        yield batch
+        with self._lock:
+            self._busy["index"] += time.perf_counter() - start
+            self._counts["indexed"] += len(batch)
+    
+    def _submit(self, path: Path, io_pool: ThreadPoolExecutor,
+                cpu_pool: Optional[ProcessPoolExecutor]) -> Future:
+        """Future of (document, signature): read on io_pool, then prepare on cpu_pool"""
+        result: Future = Future()
+        
+        def settle(value=None, error: Optional[BaseException] = None):
+            if not result.set_running_or_notify_cancel():
+                return  # cancelled by an early exit
+            if error is not None:
+                result.set_exception(error)
+            else:
+                result.set_result(value)
+        
+        def prepared(doc: Dict, seconds: float, signature: Tuple[int, int]):
+            with self._lock:
+                self._busy["prepare"] += seconds
+                self._counts["prepared"] += 1
+                self._counts["chunks"] += len(doc["chunks"])
+            settle((doc, signature))
+        
+        def on_prepared(future: Future, signature: Tuple[int, int]):
+            try:
+                doc, seconds = future.result()
+            except BaseException as e:
+                settle(error=e)
+                return
+            prepared(doc, seconds, signature)
+        
+        def on_read(future: Future):
+            try:
+                content, signature, seconds = future.result()
+            except BaseException as e:
+                settle(error=e)
+                return
+            with self._lock:
+                self._busy["read"] += seconds
+                self._counts["read"] += 1
+                self._counts["bytes"] += signature[1]
+            
+            try:
+                if cpu_pool is None:
+                    # Small corpus: preparing inline beats process start-up
+                    prepared(*_timed_prepare(str(path), content), signature)
+                else:
+                    cpu_pool.submit(_timed_prepare, str(path), content).add_done_callback(
+                        lambda future: on_prepared(future, signature)
+                    )
+            except Exception as e:  # includes the pool shutting down after an early exit
+                settle(error=e)
+        
+        io_pool.submit(read_guideline_file, path).add_done_callback(on_read)
+        return result
+    
+    def _log_progress(self):
+        stats = self.stats()
+        percent = 100 * stats["indexed"] / stats["total"] if stats["total"] else 100.0
+        logger.info(f"Guidelines: {stats['indexed']}/{stats['total']} indexed ({percent:.0f}%), "
+                    f"{stats['read']} read, {stats['prepared']} prepared, "
+                    f"{stats['docs_per_s']} docs/s")
+    
+    def stats(self) -> Dict:
+        """Progress counters and per-stage throughput of the current or last load"""
+        with self._lock:
+            counts = dict(self._counts)
+            busy = dict(self._busy)
+        wall = (self._finished or time.perf_counter()) - self._started
+        
+        def rate(amount: float, seconds: float) -> float:
+            return round(amount / seconds, 1) if seconds > 0 else 0.0
+        
+        return {
+            "total": self._total,
+            **counts,
+            "wall_seconds": round(wall, 3),
+            "docs_per_s": rate(counts["indexed"], wall),
+            "stages": {
+                "read": {
+                    "busy_seconds": round(busy["read"], 3),
+                    "workers": self.io_workers,
+                    "mb_per_s": rate(counts["bytes"] / 1e6, busy["read"])
+                },
+                "prepare": {
+                    "busy_seconds": round(busy["prepare"], 3),
+                    "workers": self.cpu_workers or self.io_workers,
+                    "docs_per_s": rate(counts["prepared"], busy["prepare"]),
+                    "chunks": counts["chunks"]
+                },
+                "index": {
+                    "busy_seconds": round(busy["index"], 3),
+                    "workers": 1,
+                    "docs_per_s": rate(counts["indexed"], busy["index"])
+                }
+            }
+        }
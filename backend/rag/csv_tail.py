@@ -0,0 +1,140 @@
+"""
+RAG Component: CSV Tail Reader
+Incrementally parses rows appended to a growing CSV log
+"""
+
+import csv
+import io
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def complete_prefix_size(path: Path, block_size: int = 65_536) -> int:
+    """Size in bytes of the file up to and including its last newline"""
+    with open(path, 'rb') as f:
+        f.seek(0, io.SEEK_END)
+        end = f.tell()
+        pos = end
+        
+        while pos > 0:
+            start = max(0, pos - block_size)
+            f.seek(start)
+            block = f.read(pos - start)
+            newline = block.rfind(b'\n')
+            if newline != -1:
+                return start + newline + 1
+            pos = start
+    
+    return 0
+
+
+class BoundedReader(io.RawIOBase):
+    """Binary reader that stops after a fixed number of bytes"""
+    
+    def __init__(self, f, limit: int):
+        self._f = f
+        self._remaining = limit
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        data = self._f.read(size)
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+
+def open_prefix(path: Path, limit: int) -> io.BufferedReader:
+    """Open the first `limit` bytes of a file as a buffered binary stream"""
+    return io.BufferedReader(BoundedReader(open(path, 'rb'), limit))
+
+
+class CsvTailReader:
+    """
+    Follows a CSV file that only grows at the end
+    
+    Remembers the byte offset of the last complete line it parsed, so each
+    poll reads and parses only the rows appended since. A trailing partial
+    line is left for the next poll. If the file shrinks (rotated or
+    truncated) it is re-read from the start.
+    """
+    
+    def __init__(self, path: Path, offset: Optional[int] = None):
+        """
+        Args:
+            path: CSV file to follow
+            offset: Byte offset already consumed (defaults to just past the header)
+        """
+        self.path = Path(path)
+        self.header = self._read_header()
+        self.offset = offset if offset is not None else self._header_size
+    
+    def _read_header(self) -> List[str]:
+        with open(self.path, 'rb') as f:
+            line = f.readline()
+        self._header_size = len(line)
+        return next(csv.reader([line.decode('utf-8')]), [])
+    
+    def poll(self, max_bytes: int = 8 * 1024 * 1024) -> List[Dict[str, str]]:
+        """
+        Parse rows appended since the last poll
+        
+        Args:
+            max_bytes: Read at most this much per call; call again while rows
+                are returned to catch up on a large backlog. A single line
+                longer than this is skipped with a warning.
+        """
+        size = self.path.stat().st_size
+        
+        if size < self.offset:
+            logger.warning(f"{self.path.name} shrank ({size} < {self.offset} bytes); re-reading from start")
+            self.header = self._read_header()
+            self.offset = self._header_size
+        
+        while True:
+            if size <= self.offset:
+                return []
+            
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read(min(size - self.offset, max_bytes))
+            
+            complete = data.rfind(b'\n') + 1
+            if complete > 0:
+                break
+            if len(data) < max_bytes:
+                # A partial line still being written
+                return []
+            
+            # A line longer than the read window would stall the tail: skip it
+            end = self._line_end(self.offset + len(data))
+            if end is None:
+                return []
+            logger.warning(f"Skipping a {end - self.offset}-byte line in {self.path.name} "
+                           f"(longer than max_bytes={max_bytes})")
+            self.offset = end
+        
+        self.offset += complete
+        lines = data[:complete].decode('utf-8').splitlines()
+        return [dict(zip(self.header, row)) for row in csv.reader(lines) if row]
+    
+    def _line_end(self, start: int, block_size: int = 65_536) -> Optional[int]:
+        """Offset just past the first newline at or after start, None if there is none yet"""
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            pos = start
+            while True:
+                block = f.read(block_size)
+                if not block:
+                    return None
+                newline = block.find(b'\n')
+                if newline != -1:
+                    return pos + newline + 1
+                pos += len(block)
@@ -0,0 +1,157 @@
+"""
+RAG Component: Decision Store
+SQLite storage for irrigation decision history with indexed queries
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Entry fields, in column order (timestamp is ISO 8601 local time, as
+# IrrigationMemory writes it, so text order is time order)
+FIELDS = (
+    "timestamp", "farm_id", "field_id", "crop_type", "crop_stage", "field_size",
+    "soil_moisture", "rainfall", "water_applied", "decision", "reasoning"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS decisions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    farm_id TEXT,
+    field_id TEXT,
+    crop_type TEXT,
+    crop_stage TEXT,
+    field_size REAL,
+    soil_moisture REAL,
+    rainfall REAL,
+    water_applied REAL,
+    decision TEXT,
+    reasoning TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_decisions_timestamp ON decisions (timestamp);
+CREATE INDEX IF NOT EXISTS idx_decisions_partition ON decisions (farm_id, field_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_decisions_crop ON decisions (crop_type COLLATE NOCASE, timestamp);
+CREATE INDEX IF NOT EXISTS idx_decisions_decision ON decisions (decision, timestamp);
+"""
+
+
+class DecisionStore:
+    """
+    Irrigation decisions in a SQLite table
+    
+    Filtering and aggregation run in SQL on indexed columns, so queries
+    over a time window or a crop read only the matching rows however many
+    years of history are kept. The database runs in WAL mode: each insert
+    is one small commit, and readers do not block the writer.
+    """
+    
+    def __init__(self, db_path: Path):
+        """
+        Args:
+            db_path: SQLite database file (created if missing)
+        """
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        logger.info(f"Opened decision store: {self.db_path.name} ({self.count()} decisions)")
+    
+    def add(self, entry: Dict) -> int:
+        """Insert one decision; returns its row id"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f"INSERT INTO decisions ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+                [entry.get(name) for name in FIELDS]
+            )
+            return cursor.lastrowid
+    
+    def add_many(self, entries: Iterable[Dict]) -> int:
+        """Insert decisions in one transaction; returns how many"""
+        rows = [[entry.get(name) for name in FIELDS] for entry in entries]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT INTO decisions ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+                rows
+            )
+        return len(rows)
+    
+    def count(self) -> int:
+        """Total decisions stored"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM decisions").fetchone()[0]
+    
+    def recent(self, since: str, limit: Optional[int] = None,
+               partition: Optional[Tuple] = None, until: Optional[str] = None) -> List[Dict]:
+        """
+        Decisions at or after `since`, oldest first
+        
+        Args:
+            since: ISO timestamp (inclusive)
+            limit: Return only the newest `limit` decisions
+            partition: Only this (farm_id, field_id)'s decisions (None
+                matches decisions without that ID)
+            until: ISO timestamp to stop before (exclusive)
+        """
+        where, params = self._window(since, partition)
+        if until is not None:
+            where += " AND timestamp < ?"
+            params.append(until)
+        query = f"SELECT {', '.join(FIELDS)} FROM decisions WHERE {where} ORDER BY id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(row) for row in reversed(rows)]
+    
+    def totals(self, since: str, partition: Optional[Tuple] = None) -> Dict:
+        """Count, water applied, rain skips and soil moisture sum of decisions at or after `since`"""
+        where, params = self._window(since, partition)
+        with self._lock:
+            row = self._conn.execute(
+                f"""
+                SELECT COUNT(*) AS count,
+                       COALESCE(SUM(water_applied), 0) AS water,
+                       COALESCE(SUM(decision = 'skip'), 0) AS skips,
+                       COALESCE(SUM(soil_moisture), 0) AS moisture
+                FROM decisions WHERE {where}
+                """,
+                params
+            ).fetchone()
+        return dict(row)
+    
+    def crop_totals(self, crop_type: str, partition: Optional[Tuple] = None) -> Dict:
+        """Count and water applied over all decisions for a crop (case-insensitive)"""
+        where, params = "crop_type = ? COLLATE NOCASE", [crop_type]
+        if partition is not None:
+            where += " AND farm_id IS ? AND field_id IS ?"
+            params.extend(partition)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT COUNT(*) AS count, COALESCE(SUM(water_applied), 0) AS water FROM decisions WHERE {where}",
+                params
+            ).fetchone()
+        return dict(row)
+    
+    @staticmethod
+    def _window(since: str, partition: Optional[Tuple]) -> tuple:
+        where, params = "timestamp >= ?", [since]
+        if partition is not None:
+            # IS, not =, so a NULL farm or field ID matches NULL
+            where += " AND farm_id IS ? AND field_id IS ?"
+            params.extend(partition)
+        return where, params
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
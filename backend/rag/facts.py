@@ -0,0 +1,319 @@
+"""
+RAG Component: Guideline Facts
+Structured water-requirement and soil-moisture facts extracted once at load time
+"""
+
+from typing import Dict, List, Optional, Tuple
+import re
+import logging
+
+from backend.rag.chunker import BANNER_PATTERN
+
+logger = logging.getLogger(__name__)
+
+
+# Water requirement figures (mm/day, liters/ha, etc.)
+WATER_PATTERN = re.compile(
+    r'(\d+(?:\.\d+)?)\s*(mm|l|liters?|m3)(?:/|\s*per\s*)(day|hectare|ha)',
+    re.IGNORECASE
+)
+
+# Soil moisture levels: "Soil moisture threshold: 70%", "Irrigate if below 55%",
+# "maintained at 75-85%"
+MOISTURE_PATTERN = re.compile(
+    r'(?:moisture|irrigate if below)[^\n%]*?(\d+(?:\.\d+)?)(?:\s*-\s*(\d+(?:\.\d+)?))?\s*%',
+    re.IGNORECASE
+)
+
+# Lower bound of a range ending right before a match ("70-" in "70-90 liters")
+RANGE_START_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*-\s*$')
+
+FACT_KINDS = ("water_requirement", "moisture_threshold")
+
+CROP_TERMS = {
+    "rice": ["rice", "paddy", "oryza"],
+    "wheat": ["wheat", "triticum"],
+    "maize": ["maize", "corn", "zea mays"],
+}
+
+STAGE_TERMS = {
+    "early": ["early", "establishment", "initial", "germination", "seedling",
+              "crown root", "transplanting"],
+    "vegetative": ["vegetative", "tillering", "jointing", "booting"],
+    "flowering": ["flowering", "reproductive", "heading", "anthesis", "grain fill",
+                  "milk stage", "silk"],
+}
+
+NUMBERED_HEADING = re.compile(r'^\s*\d+\.\s')
+
+
+def _find_term(line: str, terms: Dict[str, List[str]]) -> Optional[str]:
+    """First key whose terms occur in the line (earliest occurrence wins)"""
+    line_lower = line.lower()
+    best, best_pos = None, len(line_lower)
+    for key, words in terms.items():
+        for word in words:
+            pos = line_lower.find(word)
+            if pos != -1 and pos < best_pos:
+                best, best_pos = key, pos
+    return best
+
+
+def _line_contexts(lines: List[str]) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    (section, crop, stage) in effect on each line
+    
+    Crop comes from the section title or the nearest heading line that names
+    one; stage from the nearest numbered or lead-in heading ("2. VEGETATIVE
+    GROWTH", "Rice:"). A new section resets both.
+    """
+    contexts = []
+    section, crop, stage = "", None, None
+    
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        
+        if BANNER_PATTERN.match(lines[i]):
+            if i + 2 < len(lines) and lines[i + 1].strip() and BANNER_PATTERN.match(lines[i + 2]):
+                section = lines[i + 1].strip()
+                crop, stage = _find_term(section, CROP_TERMS), None
+                contexts.extend([(section, crop, stage)] * 3)
+                i += 3
+                continue
+        elif line and (NUMBERED_HEADING.match(line) or line.endswith(':') or line.isupper()):
+            heading_crop = _find_term(line, CROP_TERMS)
+            if heading_crop and heading_crop != crop:
+                crop, stage = heading_crop, None
+            if NUMBERED_HEADING.match(line) or line.endswith(':'):
+                stage = _find_term(line, STAGE_TERMS)
+        
+        contexts.append((section, crop, stage))
+        i += 1
+    
+    return contexts
+
+
+def extract_facts(content: str, source: str) -> List[Dict]:
+    """
+    Extract water requirements and soil moisture levels from a guideline document
+    
+    Args:
+        content: Document text
+        source: Document source name (FAO, ICAR, CIMMYT)
+    
+    Returns:
+        List of facts with 'kind', 'value', 'value_min', 'unit', 'crop',
+        'stage', 'source', 'section', 'line' (1-based) and 'text'; water
+        requirements are in document order, as re.findall returns them
+    """
+    lines = content.split('\n')
+    contexts = _line_contexts(lines)
+    
+    # Character offset of each line start, to map matches to line numbers
+    line_starts = [0]
+    for line in lines[:-1]:
+        line_starts.append(line_starts[-1] + len(line) + 1)
+    
+    def locate(offset: int) -> int:
+        lo, hi = 0, len(line_starts) - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if line_starts[mid] <= offset:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+    
+    def make_fact(kind, value, value_min, unit, offset):
+        index = locate(offset)
+        section, crop, stage = contexts[index]
+        text = lines[index].strip()
+        # A stage named on the fact's own line ("- Vegetative (V6-V12): 50-70 ...") wins
+        stage = _find_term(text, STAGE_TERMS) or stage
+        return {
+            "kind": kind,
+            "value": value,
+            "value_min": value_min,
+            "unit": unit,
+            "crop": crop,
+            "stage": stage,
+            "source": source,
+            "section": section,
+            "line": index + 1,
+            "text": text
+        }
+    
+    facts = []
+    
+    for m in WATER_PATTERN.finditer(content):
+        line_start = line_starts[locate(m.start())]
+        range_start = RANGE_START_PATTERN.search(content, line_start, m.start())
+        facts.append(make_fact(
+            "water_requirement",
+            float(m.group(1)),
+            float(range_start.group(1)) if range_start else None,
+            f"{m.group(2)}/{m.group(3)}",
+            m.start(1)
+        ))
+    
+    for m in MOISTURE_PATTERN.finditer(content):
+        low, high = float(m.group(1)), m.group(2)
+        facts.append(make_fact(
+            "moisture_threshold",
+            float(high) if high else low,
+            low if high else None,
+            "%",
+            m.start(1)
+        ))
+    
+    return facts
+
+
+class FactsTable:
+    """
+    Guideline facts with lookup indexes
+    
+    Facts are indexed by (kind, document) for per-document retrieval and by
+    (kind, crop, stage) for structured queries.
+    """
+    
+    def __init__(self, documents: List[Dict]):
+        """
+        Args:
+            documents: Loaded guideline documents ('facts' is used when the
+                loader already extracted them)
+        """
+        self._by_doc: Dict[Tuple[str, int], List[Dict]] = {}
+        # (kind, crop, stage) -> {doc_id: facts}
+        self._by_crop_stage: Dict[Tuple[str, Optional[str], Optional[str]], Dict[int, List[Dict]]] = {}
+        self._owned = set()  # crop/stage entries this instance may mutate
+        
+        for doc_id, doc in enumerate(documents):
+            self.add_document(doc_id, doc)
+    
+    def clone(self) -> "FactsTable":
+        """Copy-on-write copy for incremental updates"""
+        other = FactsTable([])
+        other._by_doc = dict(self._by_doc)
+        other._by_crop_stage = dict(self._by_crop_stage)
+        self._owned = set()
+        return other
+    
+    def _writable(self, key: Tuple) -> Dict[int, List[Dict]]:
+        by_doc = self._by_crop_stage.get(key)
+        if by_doc is None:
+            by_doc = self._by_crop_stage[key] = {}
+            self._owned.add(key)
+        elif key not in self._owned:
+            by_doc = self._by_crop_stage[key] = dict(by_doc)
+            self._owned.add(key)
+        return by_doc
+    
+    def add_document(self, doc_id: int, doc: Dict):
+        """Index a document's facts (extracting them if the loader did not)"""
+        facts = doc.get("facts")
+        if facts is None:
+            facts = extract_facts(doc["content"], doc["source"])
+        for fact in facts:
+            self._by_doc.setdefault((fact["kind"], doc_id), []).append(fact)
+            self._writable((fact["kind"], fact["crop"], fact["stage"])).setdefault(doc_id, []).append(fact)
+    
+    def remove_document(self, doc_id: int):
+        """Drop a document's facts"""
+        for kind in FACT_KINDS:
+            facts = self._by_doc.pop((kind, doc_id), [])
+            for key in {(kind, fact["crop"], fact["stage"]) for fact in facts}:
+                by_doc = self._writable(key)
+                del by_doc[doc_id]
+                if not by_doc:
+                    del self._by_crop_stage[key]
+    
+    @property
+    def facts(self) -> List[Dict]:
+        """All facts, by source and line"""
+        return self.query()
+    
+    def __len__(self) -> int:
+        return sum(len(facts) for facts in self._by_doc.values())
+    
+    def for_document(self, doc_id: int, kind: str) -> List[Dict]:
+        """Facts of one kind from a document, in document order"""
+        return self._by_doc.get((kind, doc_id), [])
+    
+    def query(self, kind: Optional[str] = None, crop: Optional[str] = None,
+              stage: Optional[str] = None, source: Optional[str] = None) -> List[Dict]:
+        """
+        Facts matching all given filters (None matches anything)
+        
+        Args:
+            kind: One of FACT_KINDS
+            crop: Crop name (rice, wheat, maize)
+            stage: Growth stage (early, vegetative, flowering)
+            source: Document source (case-insensitive)
+        """
+        crop = crop.lower() if crop else None
+        stage = stage.lower() if stage else None
+        
+        if kind is not None and crop is not None and stage is not None:
+            groups = [self._by_crop_stage.get((kind, crop, stage), {})]
+        else:
+            groups = [
+                by_doc
+                for (fact_kind, fact_crop, fact_stage), by_doc in self._by_crop_stage.items()
+                if (kind is None or fact_kind == kind)
+                and (crop is None or fact_crop == crop)
+                and (stage is None or fact_stage == stage)
+            ]
+        
+        candidates = [fact for by_doc in groups for facts in by_doc.values() for fact in facts]
+        candidates.sort(key=lambda fact: (fact["source"], fact["line"]))
+        
+        if source is not None:
+            candidates = [fact for fact in candidates if fact["source"].lower() == source.lower()]
+        
+        return candidates
+
+
+def cross_check(table: FactsTable, water_requirements: Dict, moisture_thresholds: Dict) -> List[Dict]:
+    """
+    Compare rule-engine parameters against guideline facts
+    
+    A rule value agrees with a fact when it equals the fact's value or lies
+    within the fact's range.
+    
+    Args:
+        table: Guideline facts
+        water_requirements: crop -> stage -> liters/hectare/day (IrrigationService)
+        moisture_thresholds: crop -> stage -> % (IrrigationService)
+    """
+    def agrees(value: float, fact: Dict) -> bool:
+        low = fact["value_min"] if fact["value_min"] is not None else fact["value"]
+        return low <= value <= fact["value"]
+    
+    rows = []
+    for kind, rules in (("water_requirement", water_requirements),
+                        ("moisture_threshold", moisture_thresholds)):
+        for crop, stages in rules.items():
+            for stage, value in stages.items():
+                facts = table.query(kind, crop, stage)
+                if kind == "water_requirement":
+                    # Daily per-area rates only (not per-season totals)
+                    facts = [fact for fact in facts if "/day" in fact["text"].lower()]
+                rows.append({
+                    "kind": kind,
+                    "crop": crop,
+                    "stage": stage,
+                    "rule_value": value,
+                    "guideline_values": [
+                        {
+                            "value": fact["value"],
+                            "value_min": fact["value_min"],
+                            "source": fact["source"],
+                            "line": fact["line"]
+                        }
+                        for fact in facts
+                    ],
+                    "agrees": any(agrees(value, fact) for fact in facts) if facts else None
+                })
+    return rows
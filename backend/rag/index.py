@@ -0,0 +1,154 @@
+"""
+RAG Component: Inverted Index
+Token/phrase index with term frequencies for guideline keyword scoring
+"""
+
+from collections import Counter
+from typing import Dict, Iterable, List
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class InvertedIndex:
+    """
+    Inverted index answering `content.lower().count(keyword)` per document
+    
+    Keyword scoring in the retriever counts substring occurrences, so
+    "rain" also matches inside "grain" and "rainfall". To keep those exact
+    counts:
+    
+    - Single-token keywords are expanded once to every vocabulary token that
+      contains them; a document's count is the sum of each token's term
+      frequency times the number of occurrences inside the token. Tokens are
+      split on non-alphanumerics, which an alphanumeric keyword can never
+      span, so this equals str.count on the full text.
+    - Multi-word and punctuated keywords ("zea mays", "skip irrigation") are
+      counted directly against each document's lowercased text.
+    
+    Either way the result is memoized per keyword, so repeat queries are
+    plain posting-list lookups.
+    """
+    
+    def __init__(self):
+        # token -> {doc_id: term frequency}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self._content_lower: Dict[int, str] = {}
+        # keyword -> {doc_id: occurrence count}
+        self._keyword_counts: Dict[str, Dict[int, int]] = {}
+        # Inner dicts this instance may mutate; the rest are shared with a clone
+        self._owned_postings = set()
+        self._owned_keywords = set()
+    
+    def clone(self) -> "InvertedIndex":
+        """
+        Copy-on-write copy for incremental updates
+        
+        Only the outer tables are copied; a posting list is copied the first
+        time either copy modifies it, so an update costs time proportional
+        to the documents it touches.
+        """
+        other = InvertedIndex.__new__(InvertedIndex)
+        other.postings = dict(self.postings)
+        other._content_lower = dict(self._content_lower)
+        other._keyword_counts = dict(self._keyword_counts)
+        other._owned_postings = set()
+        other._owned_keywords = set()
+        self._owned_postings = set()
+        self._owned_keywords = set()
+        return other
+    
+    @staticmethod
+    def _writable(table: Dict, owned: set, key) -> Dict:
+        inner = table.get(key)
+        if inner is None:
+            inner = table[key] = {}
+            owned.add(key)
+        elif key not in owned:
+            inner = table[key] = dict(inner)
+            owned.add(key)
+        return inner
+    
+    def add(self, doc_id: int, content: str):
+        """Index one document"""
+        content_lower = content.lower()
+        self._content_lower[doc_id] = content_lower
+        
+        for token, tf in Counter(TOKEN_PATTERN.findall(content_lower)).items():
+            self._writable(self.postings, self._owned_postings, token)[doc_id] = tf
+        
+        # Memoized keywords stay exact for the new document
+        for keyword in list(self._keyword_counts):
+            count = content_lower.count(keyword)
+            if count:
+                self._writable(self._keyword_counts, self._owned_keywords, keyword)[doc_id] = count
+    
+    def remove(self, doc_id: int):
+        """Drop a document from the index"""
+        content_lower = self._content_lower.pop(doc_id, None)
+        if content_lower is None:
+            return
+        
+        for token in set(TOKEN_PATTERN.findall(content_lower)):
+            postings = self._writable(self.postings, self._owned_postings, token)
+            postings.pop(doc_id, None)
+            if not postings:
+                del self.postings[token]
+        
+        for keyword, counts in list(self._keyword_counts.items()):
+            if doc_id in counts:
+                del self._writable(self._keyword_counts, self._owned_keywords, keyword)[doc_id]
+    
+    def add_all(self, documents: Iterable[Dict]):
+        """Index documents in order, using their position as doc id"""
+        for doc_id, doc in enumerate(documents):
+            self.add(doc_id, doc["content"])
+    
+    def __len__(self) -> int:
+        return len(self._content_lower)
+    
+    def keyword_counts(self, keyword: str) -> Dict[int, int]:
+        """Occurrences of keyword in each document's lowercased text (zero counts omitted)"""
+        counts = self._keyword_counts.get(keyword)
+        if counts is not None:
+            return counts
+        
+        if TOKEN_PATTERN.fullmatch(keyword):
+            counts = {}
+            for token, postings in self.postings.items():
+                if keyword in token:
+                    per_token = token.count(keyword)
+                    for doc_id, tf in postings.items():
+                        counts[doc_id] = counts.get(doc_id, 0) + tf * per_token
+        else:
+            counts = {}
+            for doc_id, content_lower in self._content_lower.items():
+                count = content_lower.count(keyword)
+                if count:
+                    counts[doc_id] = count
+        
+        self._keyword_counts[keyword] = counts
+        self._owned_keywords.add(keyword)
+        return counts
+    
+    def score(self, keywords: List[str]) -> Dict[int, int]:
+        """Total keyword occurrences per document"""
+        scores: Dict[int, int] = {}
+        for keyword in keywords:
+            for doc_id, count in self.keyword_counts(keyword).items():
+                scores[doc_id] = scores.get(doc_id, 0) + count
+        return scores
+    
+    def warm(self, keywords: Iterable[str]):
+        """Precompute counts for keywords known ahead of time"""
+        for keyword in keywords:
+            self.keyword_counts(keyword)
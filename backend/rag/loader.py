@@ -3,14 +3,27 @@ RAG Component: Document & Data Loader
 Loads CSV data and agricultural guideline documents for retrieval
 """
 
-import pandas as pd
 from pathlib import Path
-from typing import List, Dict, Optional
+from datetime import datetime, timezone
+from typing import Callable, Iterator, List, Dict, Optional, TYPE_CHECKING
+import hashlib
 import logging
+import threading
+
+from backend.rag.corpus_loader import ParallelCorpusLoader, prepare_guideline_document
+from backend.rag.csv_tail import CsvTailReader, complete_prefix_size, open_prefix
+
+# pandas/numpy are imported on first use to keep server start-up fast
+if TYPE_CHECKING:
+    import pandas as pd
+    from backend.rag.sensor_store import SensorStore
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Corpora at least this large are chunked in worker processes
+PARALLEL_LOAD_MIN_FILES = 64
+
 
 class DocumentLoader:
     """Loads and processes documents and data for RAG pipeline"""
@@ -19,22 +32,301 @@ class DocumentLoader:
         self.data_dir = Path(data_dir)
         self.documents = []
         self.soil_data = None
+        self.sensor_store = None
+        self._soil_csv_offset = None
+        self._soil_tail = None
+        self._follow_thread = None
+        self._follow_stop = threading.Event()
+        # NumPy columns parsed once from soil_data for range queries
+        self._soil_series = None
+        # Guideline path -> {"signature": (mtime_ns, size), "hash": sha1}
+        self._guideline_files = {}
+        self._watch_thread = None
+        self._watch_stop = threading.Event()
+        # Progress and throughput of the last guideline load
+        self.guideline_load_stats = None
         
-    def load_soil_moisture_data(self, csv_path: Optional[Path] = None) -> pd.DataFrame:
+    def load_soil_moisture_data(self, csv_path: Optional[Path] = None) -> "pd.DataFrame":
         """Load soil moisture CSV data"""
+        import pandas as pd
+        
         if csv_path is None:
             csv_path = self.data_dir / "soil_moisture.csv"
         
         try:
-            self.soil_data = pd.read_csv(csv_path)
+            # Remember where parsing stopped so tail-follow resumes from there
+            self._soil_csv_offset = complete_prefix_size(csv_path)
+            with open_prefix(csv_path, self._soil_csv_offset) as source:
+                self.soil_data = pd.read_csv(source)
+            self._soil_series = None
+            self._index_soil_frame(self.soil_data)
             logger.info(f"Loaded soil moisture data: {len(self.soil_data)} rows")
             return self.soil_data
         except Exception as e:
             logger.error(f"Error loading soil moisture data: {e}")
             return pd.DataFrame()
     
+    def load_sensor_store(self, store_dir: Optional[Path] = None,
+                          csv_path: Optional[Path] = None) -> Optional["SensorStore"]:
+        """Open the columnar sensor store, converting the CSV on first use"""
+        from backend.rag.sensor_store import SensorStore, convert_csv_to_store
+        
+        if store_dir is None:
+            store_dir = self.data_dir / "soil_store"
+        if csv_path is None:
+            csv_path = self.data_dir / "soil_moisture.csv"
+        
+        try:
+            if SensorStore.exists(store_dir):
+                self.sensor_store = SensorStore(store_dir)
+            elif Path(csv_path).exists():
+                logger.info(f"Converting {csv_path} into columnar sensor store")
+                self.sensor_store = convert_csv_to_store(csv_path, store_dir)
+            else:
+                self.sensor_store = SensorStore.create(store_dir)
+            
+            logger.info(f"Opened sensor store: {len(self.sensor_store)} rows")
+            return self.sensor_store
+        except Exception as e:
+            logger.error(f"Error opening sensor store: {e}")
+            self.sensor_store = None
+            return None
+    
+    def follow_soil_moisture(self, csv_path: Optional[Path] = None, interval: float = 5.0):
+        """
+        Tail-follow the soil moisture CSV in a background thread
+        
+        Growth is detected by polling the file size every `interval` seconds;
+        only rows appended since the last poll are parsed and appended to the
+        sensor store (or the in-memory DataFrame when no store is loaded).
+        """
+        if csv_path is None:
+            csv_path = self.data_dir / "soil_moisture.csv"
+        csv_path = Path(csv_path)
+        
+        if not csv_path.exists():
+            logger.warning(f"Cannot follow missing file: {csv_path}")
+            return
+        
+        self._soil_tail = CsvTailReader(csv_path, self._resume_offset(csv_path))
+        self._follow_stop.clear()
+        self._follow_thread = threading.Thread(
+            target=self._follow_loop,
+            args=(interval,),
+            name="soil-csv-follow",
+            daemon=True
+        )
+        self._follow_thread.start()
+        logger.info(f"Following {csv_path.name} from byte {self._soil_tail.offset}")
+    
+    def stop_following(self):
+        """Stop the tail-follow thread"""
+        self._follow_stop.set()
+        if self._follow_thread is not None:
+            self._follow_thread.join(timeout=5)
+            self._follow_thread = None
+    
+    def _resume_offset(self, csv_path: Path) -> Optional[int]:
+        """Byte offset already reflected in the loaded soil data"""
+        if self.sensor_store is not None:
+            source = self.sensor_store.meta.get("source") or {}
+            if source.get("path") == str(csv_path) and "offset" in source:
+                return source["offset"]
+            # Store was not built from this file: only follow new rows
+            return complete_prefix_size(csv_path)
+        
+        return self._soil_csv_offset
+    
+    def _follow_loop(self, interval: float):
+        while not self._follow_stop.wait(interval):
+            try:
+                added = self.poll_soil_moisture()
+                if added:
+                    logger.info(f"Appended {added} new soil moisture rows")
+            except Exception as e:
+                logger.error(f"Error following soil moisture data: {e}")
+    
+    def poll_soil_moisture(self) -> int:
+        """Parse and append rows added to the CSV since the last poll"""
+        if self._soil_tail is None:
+            return 0
+        
+        import pandas as pd
+        from backend.rag.sensor_store import append_csv_rows
+        
+        added = 0
+        while True:
+            rows = self._soil_tail.poll()
+            if not rows:
+                return added
+            
+            frame = pd.DataFrame(rows)
+            if self.sensor_store is not None:
+                append_csv_rows(self.sensor_store, frame, {
+                    "source": {"path": str(self._soil_tail.path), "offset": self._soil_tail.offset}
+                })
+            else:
+                self._append_soil_frame(frame)
+            added += len(rows)
+    
+    def _append_soil_frame(self, frame: "pd.DataFrame"):
+        """Append parsed rows to the in-memory DataFrame with matching dtypes"""
+        import pandas as pd
+        
+        if self.soil_data is not None and not self.soil_data.empty:
+            for column, dtype in self.soil_data.dtypes.items():
+                if column in frame and pd.api.types.is_numeric_dtype(dtype):
+                    frame[column] = pd.to_numeric(frame[column], errors="coerce")
+            self._index_soil_frame(frame)
+            self.soil_data = pd.concat([self.soil_data, frame], ignore_index=True)
+        else:
+            self._soil_series = None
+            self._index_soil_frame(frame)
+            self.soil_data = frame
+    
+    def _index_soil_frame(self, frame: "pd.DataFrame"):
+        """
+        Parse date/time into an int64 epoch column and extend the NumPy series
+        
+        Only the given rows are parsed, so tail-followed rows are indexed
+        without touching the rows already loaded.
+        """
+        import numpy as np
+        import pandas as pd
+        
+        if "date" not in frame or "time" not in frame:
+            return
+        
+        stamps = pd.to_datetime(
+            frame["date"].astype(str) + " " + frame["time"].astype(str),
+            format="%d-%m-%Y %H:%M:%S",
+            errors="coerce",
+            utc=True
+        )
+        valid = stamps.notna().to_numpy()
+        epoch = stamps.to_numpy(dtype="datetime64[s]").astype(np.int64)
+        frame["epoch"] = np.where(valid, epoch, -1)
+        
+        series = self._soil_series or {
+            "timestamp": np.empty(0, dtype=np.int64),
+            "soilmiosture": np.empty(0, dtype=np.float64),
+            "class_code": np.empty(0, dtype=np.int16),
+            "class_labels": [],
+            "sorted": True
+        }
+        
+        labels = series["class_labels"]
+        label_idx, uniques = pd.factorize(frame["class"] if "class" in frame else pd.Series([None] * len(frame)))
+        lookup = []
+        for label in uniques:
+            if label not in labels:
+                labels.append(label)
+            lookup.append(labels.index(label))
+        codes = np.array(lookup + [-1], dtype=np.int16)[label_idx]
+        
+        timestamps = epoch[valid]
+        moisture = pd.to_numeric(frame["soilmiosture"], errors="coerce").to_numpy(dtype=np.float64)[valid]
+        
+        prev = series["timestamp"]
+        in_order = bool(np.all(timestamps[1:] >= timestamps[:-1]))
+        if len(prev) and len(timestamps):
+            in_order = in_order and timestamps[0] >= prev[-1]
+        
+        self._soil_series = {
+            "timestamp": np.concatenate((prev, timestamps)),
+            "soilmiosture": np.concatenate((series["soilmiosture"], moisture)),
+            "class_code": np.concatenate((series["class_code"], codes[valid])),
+            "class_labels": labels,
+            "sorted": series["sorted"] and in_order
+        }
+    
+    def query_soil_range(self, start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> Dict:
+        """
+        Vectorized statistics for readings with start_ts <= timestamp < end_ts
+        
+        The window is located with a binary search on the epoch column
+        (searchsorted), then moisture statistics and per-class counts are
+        computed over that slice only.
+        
+        Args:
+            start_ts: Inclusive start, epoch seconds (None = from the first reading)
+            end_ts: Exclusive end, epoch seconds (None = through the last reading)
+        """
+        import numpy as np
+        
+        if self.sensor_store is not None:
+            store = self.sensor_store
+            window = store.read_range(start_ts, end_ts, ["soilmiosture", "class_code"])
+            labels = store.class_labels
+        elif self._soil_series is not None:
+            series = self._soil_series
+            timestamps = series["timestamp"]
+            if series["sorted"]:
+                lo = 0 if start_ts is None else int(np.searchsorted(timestamps, start_ts, side="left"))
+                hi = len(timestamps) if end_ts is None else int(np.searchsorted(timestamps, end_ts, side="left"))
+                selector = slice(lo, max(lo, hi))
+            else:
+                selector = np.ones(len(timestamps), dtype=bool)
+                if start_ts is not None:
+                    selector &= timestamps >= start_ts
+                if end_ts is not None:
+                    selector &= timestamps < end_ts
+            window = {name: series[name][selector] for name in ("soilmiosture", "class_code")}
+            labels = series["class_labels"]
+        else:
+            window = {"soilmiosture": np.empty(0), "class_code": np.empty(0, dtype=np.int16)}
+            labels = []
+        
+        moisture = np.asarray(window["soilmiosture"], dtype=np.float64)
+        moisture = moisture[~np.isnan(moisture)]
+        codes = np.asarray(window["class_code"])
+        class_counts = np.bincount(codes[codes >= 0], minlength=len(labels)) if len(labels) else []
+        
+        return {
+            "start": start_ts,
+            "end": end_ts,
+            "count": int(len(window["class_code"])),
+            "mean_moisture": round(float(moisture.mean()), 2) if len(moisture) else None,
+            "min_moisture": float(moisture.min()) if len(moisture) else None,
+            "max_moisture": float(moisture.max()) if len(moisture) else None,
+            "class_counts": {
+                str(label): int(count) for label, count in zip(labels, class_counts) if count
+            }
+        }
+    
+    def query_soil_window(self, hours: float, end_ts: Optional[int] = None) -> Dict:
+        """
+        Statistics for the last N hours of readings
+        
+        Args:
+            hours: Window length
+            end_ts: Window end in epoch seconds; defaults to just after the
+                newest reading, so replayed logs still have a populated window
+        """
+        if end_ts is None:
+            end_ts = self._newest_soil_timestamp()
+            end_ts = end_ts + 1 if end_ts is not None else int(datetime.now(timezone.utc).timestamp())
+        return self.query_soil_range(end_ts - int(hours * 3600), end_ts)
+    
+    def _newest_soil_timestamp(self) -> Optional[int]:
+        if self.sensor_store is not None and len(self.sensor_store) > 0:
+            return int(self.sensor_store.latest()["timestamp"])
+        if self._soil_series is not None and len(self._soil_series["timestamp"]):
+            return int(self._soil_series["timestamp"].max())
+        return None
+    
     def get_latest_soil_moisture(self) -> Dict:
         """Get the most recent soil moisture reading"""
+        if self.sensor_store is not None and len(self.sensor_store) > 0:
+            latest = self.sensor_store.latest()
+            return {
+                "value": float(latest["soilmiosture"]) if latest["soilmiosture"] is not None else 60.0,
+                "source": "sensor_store",
+                "timestamp": datetime.fromtimestamp(latest["timestamp"], tz=timezone.utc).isoformat(),
+                "temperature": latest["temperature"],
+                "class": latest["class"]
+            }
+        
         if self.soil_data is None or self.soil_data.empty:
             return {
                 "value": 60.0,
@@ -53,31 +345,160 @@ class DocumentLoader:
     
     def load_agricultural_guidelines(self) -> List[Dict]:
         """Load agricultural guideline documents from text files"""
+        return [doc for batch in self.iter_guideline_batches() for doc in batch]
+    
+    def iter_guideline_batches(self, io_workers: int = 8, cpu_workers: Optional[int] = None,
+                               batch_size: int = 64) -> Iterator[List[Dict]]:
+        """
+        Load guideline documents in batches, for streaming into an index
+        
+        Large corpora go through ParallelCorpusLoader (threaded reads,
+        chunking in worker processes); below PARALLEL_LOAD_MIN_FILES files,
+        documents are prepared on the reader threads, since starting worker
+        processes would cost more than it saves. self.documents is set once
+        all batches have been consumed.
+        
+        Args:
+            io_workers: Threads reading files
+            cpu_workers: Worker processes (None = CPU count)
+            batch_size: Documents per batch
+        """
         guidelines_dir = self.data_dir / "guidelines"
         
         if not guidelines_dir.exists():
             logger.warning(f"Guidelines directory not found: {guidelines_dir}")
-            return []
+            self.documents = []
+            return
+        
+        paths = list(guidelines_dir.glob("*.txt"))
+        parallel = len(paths) >= PARALLEL_LOAD_MIN_FILES
+        corpus_loader = ParallelCorpusLoader(
+            io_workers=io_workers,
+            cpu_workers=cpu_workers if parallel else 0,
+            batch_size=batch_size
+        )
         
         documents = []
+        self._guideline_files = {}
+        
+        def on_document(doc: Dict, signature: tuple):
+            documents.append(doc)
+            self._guideline_files[doc["path"]] = {"signature": signature, "hash": doc["hash"]}
+            if not parallel:
+                logger.info(f"Loaded guideline: {Path(doc['path']).stem}")
+        
+        yield from corpus_loader.iter_batches(paths, on_document)
+        
+        self.documents = documents
+        self.guideline_load_stats = corpus_loader.stats()
+    
+    def _make_guideline_document(self, txt_file: Path, content: str) -> Dict:
+        """Guideline document with its chunks, facts and index features"""
+        return prepare_guideline_document(str(txt_file), content)
+    
+    @staticmethod
+    def _file_signature(path: Path) -> tuple:
+        stat = path.stat()
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def scan_guidelines(self) -> Dict:
+        """
+        Detect guideline files added, edited or removed since the last commit
+        
+        Only files whose mtime or size changed are read; a file is reported
+        as changed only if its content hash differs (a touch is ignored).
+        Nothing is recorded here: pass the result to commit_guidelines() once
+        the changes have been applied, so a failed re-index is found again
+        by the next scan.
+        
+        Returns:
+            Dict with 'upserts' (new/edited documents), 'removed' (paths), and
+            the pending 'files' signatures and 'documents' list
+        """
+        guidelines_dir = self.data_dir / "guidelines"
+        known = self._guideline_files
+        files = dict(known)
+        present = {str(path): path for path in guidelines_dir.glob("*.txt")} if guidelines_dir.exists() else {}
         
-        for txt_file in guidelines_dir.glob("*.txt"):
+        upserts = []
+        for path_str, txt_file in present.items():
             try:
+                signature = self._file_signature(txt_file)
+                entry = known.get(path_str)
+                if entry is not None and entry["signature"] == signature:
+                    continue
+                
                 with open(txt_file, 'r', encoding='utf-8') as f:
                     content = f.read()
-                    
-                documents.append({
-                    "source": txt_file.stem.upper(),  # FAO, ICAR, CIMMYT
-                    "content": content,
-                    "path": str(txt_file),
-                    "type": "guideline"
-                })
-                logger.info(f"Loaded guideline: {txt_file.stem}")
+                content_hash = hashlib.sha1(content.encode('utf-8')).hexdigest()
+                files[path_str] = {"signature": signature, "hash": content_hash}
+                
+                if entry is None or entry["hash"] != content_hash:
+                    upserts.append(self._make_guideline_document(txt_file, content))
             except Exception as e:
-                logger.error(f"Error loading {txt_file}: {e}")
+                logger.error(f"Error scanning {txt_file}: {e}")
         
-        self.documents = documents
-        return documents
+        removed = [path_str for path_str in known if path_str not in present]
+        for path_str in removed:
+            del files[path_str]
+        
+        documents = self.documents
+        if upserts or removed:
+            replaced = {doc["path"]: doc for doc in upserts}
+            documents = [
+                replaced.pop(doc["path"], doc) for doc in self.documents
+                if doc["path"] not in removed
+            ]
+            documents += list(replaced.values())
+            logger.info(f"Guidelines changed: {len(upserts)} added/edited, {len(removed)} removed")
+        
+        return {"upserts": upserts, "removed": removed, "files": files, "documents": documents}
+    
+    def commit_guidelines(self, changes: Dict):
+        """
+        Record a scan's file signatures and documents as loaded
+        
+        self.documents is replaced with the scan's list, never mutated.
+        """
+        self._guideline_files = changes["files"]
+        self.documents = changes["documents"]
+    
+    def watch_guidelines(self, on_change: Callable[[List[Dict], List[str]], None],
+                         interval: float = 5.0):
+        """
+        Poll the guidelines directory in a background thread
+        
+        Args:
+            on_change: Called as on_change(upserts, removed_paths) from the
+                watcher thread whenever a scan finds changes
+            interval: Seconds between scans
+        """
+        self._watch_stop.clear()
+        self._watch_thread = threading.Thread(
+            target=self._watch_loop,
+            args=(on_change, interval),
+            name="guidelines-watch",
+            daemon=True
+        )
+        self._watch_thread.start()
+        logger.info(f"Watching {self.data_dir / 'guidelines'} every {interval}s")
+    
+    def stop_watching(self):
+        """Stop the guidelines watcher thread"""
+        self._watch_stop.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join(timeout=5)
+            self._watch_thread = None
+    
+    def _watch_loop(self, on_change: Callable, interval: float):
+        while not self._watch_stop.wait(interval):
+            try:
+                changes = self.scan_guidelines()
+                if changes["upserts"] or changes["removed"]:
+                    on_change(changes["upserts"], changes["removed"])
+                self.commit_guidelines(changes)
+            except Exception as e:
+                logger.error(f"Error reloading guidelines: {e}")
     
     def get_document_by_source(self, source: str) -> Optional[Dict]:
         """Retrieve a specific guideline document by source"""
@@ -117,5 +538,10 @@ class DocumentLoader:
         return {
             "total_documents": len(self.documents),
             "sources": [doc["source"] for doc in self.documents],
-            "soil_data_rows": len(self.soil_data) if self.soil_data is not None else 0
+            "soil_data_rows": self._soil_row_count()
         }
+    
+    def _soil_row_count(self) -> int:
+        if self.sensor_store is not None:
+            return len(self.sensor_store)
+        return len(self.soil_data) if self.soil_data is not None else 0
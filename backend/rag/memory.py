@@ -4,48 +4,473 @@ Stores and retrieves irrigation history for context-aware decisions
 """
 
 import json
+import os
+import threading
+import time
+from bisect import bisect_left
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import logging
 
+from backend.rag.decision_store import DecisionStore
+
 logger = logging.getLogger(__name__)
 
+# Decisions kept in memory (and in snapshots), per farm field
+MAX_ENTRIES = 30
+
+# Periods (days) with incrementally maintained totals
+ROLLING_WINDOW_DAYS = (7, 30)
+
+
+def entry_epoch(entry: Dict) -> Optional[float]:
+    """Epoch seconds of an entry's ISO timestamp (None if missing or invalid)"""
+    try:
+        return datetime.fromisoformat(entry["timestamp"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class Timeline:
+    """
+    Decisions in time order with a parallel sorted array of epoch timestamps
+    
+    Timestamps are parsed once, on append, and range lookups bisect them and
+    return a slice, so a query costs O(log n) plus the size of its result.
+    Positions are absolute (they survive dropping old decisions): dropping
+    only advances an offset, and the lists are compacted once half of them
+    has been dropped.
+    """
+    
+    def __init__(self):
+        self._entries: List[Dict] = []
+        self._times: List[float] = []
+        self._values: List[tuple] = []  # (water, skip, moisture)
+        self._start = 0  # List index of the first live decision
+        self._base = 0   # Absolute position of list index 0
+    
+    def __len__(self) -> int:
+        return len(self._entries) - self._start
+    
+    @property
+    def first(self) -> int:
+        """Position of the oldest live decision"""
+        return self._base + self._start
+    
+    @property
+    def end(self) -> int:
+        """Position after the newest decision"""
+        return self._base + len(self._entries)
+    
+    def append(self, entry: Dict) -> Optional[tuple]:
+        """
+        Add a decision; returns its (water, skip, moisture) values, or None
+        (and skips it) when its timestamp cannot be parsed
+        """
+        epoch = entry_epoch(entry)
+        if epoch is None:
+            logger.warning(f"Skipping irrigation decision without a valid timestamp: {entry.get('timestamp')!r}")
+            return None
+        if self._times and epoch < self._times[-1]:
+            # Clock stepped back: file it with its predecessor to keep the order
+            epoch = self._times[-1]
+        values = (
+            entry.get("water_applied") or 0,
+            1 if entry.get("decision") == "skip" else 0,
+            entry.get("soil_moisture") or 0
+        )
+        self._entries.append(entry)
+        self._times.append(epoch)
+        self._values.append(values)
+        return values
+    
+    def position(self, epoch: float) -> int:
+        """Position of the first live decision at or after epoch"""
+        return self._base + bisect_left(self._times, epoch, self._start)
+    
+    def between(self, start: Optional[float] = None, end: Optional[float] = None) -> List[Dict]:
+        """Live decisions with start <= epoch < end, oldest first (None = unbounded)"""
+        lo = self.position(start) if start is not None else self.first
+        hi = self.position(end) if end is not None else self.end
+        return self.slice(lo, hi)
+    
+    def slice(self, lo: int, hi: int) -> List[Dict]:
+        """Decisions at positions [lo, hi)"""
+        return self._entries[lo - self._base:hi - self._base]
+    
+    def values(self, lo: int, hi: int) -> List[tuple]:
+        """(water, skip, moisture) of the decisions at positions [lo, hi)"""
+        return self._values[lo - self._base:hi - self._base]
+    
+    def drop_before(self, position: int):
+        """Forget decisions before a position"""
+        self._start = max(self._start, min(position, self.end) - self._base)
+        if self._start * 2 >= len(self._entries):
+            del self._entries[:self._start]
+            del self._times[:self._start]
+            del self._values[:self._start]
+            self._base += self._start
+            self._start = 0
+
+
+class RollingWindow:
+    """
+    Running totals over the decisions of the last N days
+    
+    Counts the decisions of a Timeline from `head` on. A new decision
+    updates the totals in O(1); reads first bisect for the window's cutoff
+    and subtract the decisions that have aged out, so each is expired once
+    (amortised O(1)).
+    """
+    
+    def __init__(self, days: int, timeline: Timeline, lock: threading.RLock):
+        self.days = days
+        self.timeline = timeline
+        self.head = timeline.first
+        self._lock = lock
+        self._count = 0
+        self._water = 0.0
+        self._skips = 0
+        self._moisture = 0.0
+    
+    def add(self, values: tuple):
+        """Count a decision just appended to the timeline"""
+        self._apply(values, 1)
+    
+    def advance_to(self, position: int):
+        """Stop counting decisions before a timeline position"""
+        if position > self.head:
+            for values in self.timeline.values(self.head, position):
+                self._apply(values, -1)
+            self.head = position
+    
+    def totals(self) -> Dict:
+        """Count, water applied, rain skips and soil moisture sum"""
+        with self._lock:
+            self._expire()
+            return {
+                "count": self._count,
+                "water": self._water,
+                "skips": self._skips,
+                "moisture": self._moisture
+            }
+    
+    def entries(self, limit: Optional[int] = None) -> List[Dict]:
+        """Decisions in the window, oldest first (only the newest `limit` if given)"""
+        with self._lock:
+            self._expire()
+            end = self.timeline.end
+            start = self.head if limit is None else max(self.head, end - limit)
+            return self.timeline.slice(start, end)
+    
+    def _expire(self):
+        cutoff = datetime.now() - timedelta(days=self.days)
+        self.advance_to(self.timeline.position(cutoff.timestamp()))
+    
+    def _apply(self, values: tuple, sign: int):
+        water, skip, moisture = values
+        self._count += sign
+        self._skips += sign * skip
+        if self._count:
+            self._water += sign * water
+            self._moisture += sign * moisture
+        else:
+            # Empty window: drop accumulated float rounding error
+            self._water = self._moisture = 0.0
+
+
+def local_iso(moment: datetime) -> str:
+    """ISO timestamp in local time, as entries are stamped (moment may be timezone-aware)"""
+    return datetime.fromtimestamp(moment.timestamp()).isoformat()
+
+
+def partition_key(farm_id: Optional[str] = None, field_id: Optional[str] = None) -> Tuple:
+    """(farm_id, field_id) partition of a decision; missing or empty IDs are None"""
+    return (farm_id or None, field_id or None)
+
+
+class MemoryPartition:
+    """
+    Decision history of one farm field
+    
+    A timeline of the decisions held in memory, with rolling windows over
+    it. When bounded it keeps the field's latest MAX_ENTRIES decisions;
+    otherwise (a DecisionStore holds the history) it keeps those within
+    the longest window.
+    """
+    
+    def __init__(self, bounded: bool = True):
+        """
+        Args:
+            bounded: Keep the latest MAX_ENTRIES decisions (False when a
+                DecisionStore holds the history)
+        """
+        self.bounded = bounded
+        self.timeline = Timeline()
+        self._lock = threading.RLock()
+        self.windows = {days: RollingWindow(days, self.timeline, self._lock) for days in ROLLING_WINDOW_DAYS}
+    
+    @property
+    def memory(self) -> List[Dict]:
+        """Decisions held in memory, oldest first"""
+        with self._lock:
+            return self.timeline.between()
+    
+    def add(self, entry: Dict):
+        with self._lock:
+            values = self.timeline.append(entry)
+            if values is None:
+                return
+            for window in self.windows.values():
+                window.add(values)
+            
+            if self.bounded:
+                # Keep only the most recent entries
+                self._drop_before(self.timeline.end - MAX_ENTRIES)
+            else:
+                longest = self.windows[max(ROLLING_WINDOW_DAYS)]
+                longest.totals()  # expires its aged-out decisions
+                self._drop_before(longest.head)
+    
+    def between(self, start: Optional[float] = None, end: Optional[float] = None) -> List[Dict]:
+        """Decisions held in memory with start <= epoch < end, oldest first"""
+        with self._lock:
+            return self.timeline.between(start, end)
+    
+    def _drop_before(self, position: int):
+        # Windows count only what is still held in memory
+        for window in self.windows.values():
+            window.advance_to(position)
+        self.timeline.drop_before(position)
+
 
 class IrrigationMemory:
-    """Manages historical irrigation data for RAG context"""
+    """
+    Manages historical irrigation data for RAG context
     
-    def __init__(self, memory_file: Path):
+    Persistence is a snapshot (memory_file) plus an append-only JSONL log
+    next to it. Each decision appends one {"seq", "entry"} line, so a write
+    costs the same however long the history is. The log is flushed to the
+    OS on every append (a process crash loses nothing) and fsynced in
+    batches: once fsync_batch records are pending, on the first append
+    fsync_interval seconds after the last fsync, and on close. This bounds
+    what a power loss can drop to fsync_batch - 1 records. Every
+    compact_every records the log is compacted: the snapshot is rewritten
+    atomically with the sequence number it covers, then the log is
+    truncated. On load, log records at or below the snapshot's sequence
+    number are skipped (a crash between those two steps replays nothing
+    twice) and a torn final line is cut off.
+    
+    With a DecisionStore attached, the full history is kept in SQLite
+    instead and queries filter and aggregate there; partitions keep only
+    their rolling windows in memory. Decisions in an existing snapshot/log
+    are imported into an empty store once.
+    
+    Totals and decisions for the last 7 and 30 days are read from rolling
+    windows (see RollingWindow), seeded when a partition is loaded and
+    updated as decisions are added, so summaries do not rescan the history.
+    
+    History is partitioned by (farm_id, field_id): each partition has its
+    own MAX_ENTRIES bound and windows, found with one dict lookup, and
+    every query reads a single partition. Decisions without IDs share the
+    (None, None) partition. With a store, a partition is loaded from the
+    database the first time it is used.
+    """
+    
+    def __init__(self, memory_file: Path, fsync_batch: int = 8, fsync_interval: float = 1.0,
+                 compact_every: int = 1000, store: Optional[DecisionStore] = None):
+        """
+        Args:
+            memory_file: Snapshot path (the log is the same path with .jsonl)
+            fsync_batch: fsync the log after this many unsynced records
+            fsync_interval: ... or on the first append this many seconds after the last fsync
+            compact_every: Compact after this many log records
+            store: SQLite decision store holding the full history (replaces
+                the snapshot and log)
+        """
         self.memory_file = Path(memory_file)
-        self.memory = self._load_memory()
+        self.log_file = self.memory_file.with_suffix(".jsonl")
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._log_records = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.stats = {"appends": 0, "fsyncs": 0, "compactions": 0}
+        
+        self.store = store
+        self.partitions: Dict[Tuple, MemoryPartition] = {}
+        self._partitions_lock = threading.Lock()
+        if store is not None:
+            self._log = None
+            self._import_into_store()
+        else:
+            for entry in self._load_memory():
+                self._partition(entry.get("farm_id"), entry.get("field_id"), create=True).add(entry)
+            self._log = open(self.log_file, 'a', encoding='utf-8')
+    
+    def _partition(self, farm_id: Optional[str] = None, field_id: Optional[str] = None,
+                   create: bool = False) -> MemoryPartition:
+        """
+        Partition of a farm field
+        
+        Only partitions holding decisions are kept: for an unknown field an
+        empty partition is returned unregistered unless `create` is set.
+        """
+        key = partition_key(farm_id, field_id)
+        partition = self.partitions.get(key)
+        if partition is not None:
+            return partition
+        
+        with self._partitions_lock:
+            partition = self.partitions.get(key)
+            if partition is not None:
+                return partition
+            partition = MemoryPartition(bounded=self.store is None)
+            if self.store is not None:
+                since = datetime.now() - timedelta(days=max(ROLLING_WINDOW_DAYS))
+                for entry in self.store.recent(since.isoformat(), partition=key):
+                    partition.add(entry)
+                create = create or len(partition.timeline) > 0
+            if create:
+                self.partitions[key] = partition
+        return partition
+    
+    def _import_into_store(self):
+        """Copy snapshot/log decisions into a new, empty store"""
+        if self.store.count() or not (self.memory_file.exists() or self.log_file.exists()):
+            return
+        imported = self.store.add_many(self._load_memory())
+        logger.info(f"Imported {imported} irrigation decisions into {self.store.db_path.name}")
     
     def _load_memory(self) -> List[Dict]:
-        """Load memory from JSON file"""
+        """Load the snapshot, then replay the log records written after it"""
+        entries = []
         if self.memory_file.exists():
             try:
                 with open(self.memory_file, 'r') as f:
-                    return json.load(f)
+                    snapshot = json.load(f)
+                # Snapshots before the log was introduced are a bare list
+                if isinstance(snapshot, list):
+                    entries, self._seq = snapshot, len(snapshot)
+                else:
+                    entries, self._seq = snapshot["entries"], snapshot["seq"]
             except Exception as e:
                 logger.error(f"Error loading memory: {e}")
-                return []
-        return []
+        
+        if self.log_file.exists():
+            replayed = self._replay_log(entries)
+            if replayed:
+                logger.info(f"Replayed {replayed} irrigation decisions from {self.log_file.name}")
+        
+        return entries
     
-    def _save_memory(self):
-        """Save memory to JSON file"""
-        try:
-            # Keep only last 30 days
-            if len(self.memory) > 30:
-                self.memory = self.memory[-30:]
-            
-            with open(self.memory_file, 'w') as f:
-                json.dump(self.memory, f, indent=2)
-        except Exception as e:
-            logger.error(f"Error saving memory: {e}")
+    def _replay_log(self, entries: List[Dict]) -> int:
+        """Append log records newer than the snapshot to entries"""
+        replayed = 0
+        valid_bytes = 0
+        with open(self.log_file, 'rb') as f:
+            for raw in f:
+                try:
+                    if not raw.endswith(b'\n'):
+                        raise ValueError("incomplete record")
+                    record = json.loads(raw)
+                except ValueError:
+                    # Torn write from a crash: drop it so appends start on a fresh line
+                    logger.warning(f"Truncating torn record at byte {valid_bytes} of {self.log_file.name}")
+                    break
+                valid_bytes += len(raw)
+                self._log_records += 1
+                if record["seq"] > self._seq:
+                    entries.append(record["entry"])
+                    self._seq = record["seq"]
+                    replayed += 1
+        
+        if valid_bytes < self.log_file.stat().st_size:
+            os.truncate(self.log_file, valid_bytes)
+        return replayed
+    
+    def _append(self, entry: Dict):
+        """Log one entry (and compact when the log is due); the caller holds self._lock"""
+        self._seq += 1
+        self._log.write(json.dumps({"seq": self._seq, "entry": entry}) + '\n')
+        self._log.flush()
+        self._log_records += 1
+        self._unsynced += 1
+        self.stats["appends"] += 1
+        
+        if (self._unsynced >= self.fsync_batch
+                or time.monotonic() - self._last_sync >= self.fsync_interval):
+            self._sync()
+        
+        if self._log_records >= self.compact_every:
+            self._compact()
+    
+    def _sync(self):
+        if self._unsynced:
+            os.fsync(self._log.fileno())
+            self.stats["fsyncs"] += 1
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+    
+    def _compact(self):
+        """Atomically rewrite the snapshot up to the current seq, then empty the log"""
+        self._sync()
+        tmp_path = self.memory_file.with_name(f"{self.memory_file.name}.tmp")
+        # New fields' partitions are registered under _partitions_lock, not _lock
+        entries = sorted(
+            (entry for partition in list(self.partitions.values()) for entry in partition.memory),
+            key=lambda entry: entry.get("timestamp") or ""
+        )
+        with open(tmp_path, 'w') as f:
+            json.dump({"seq": self._seq, "entries": entries}, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.memory_file)
+        
+        self._log.close()
+        self._log = open(self.log_file, 'w', encoding='utf-8')
+        self._log_records = 0
+        self.stats["compactions"] += 1
+    
+    def compact(self):
+        """Fold the log into the snapshot now"""
+        with self._lock:
+            if self._log is not None:
+                self._compact()
+    
+    def flush(self):
+        """fsync any logged decisions not yet on disk"""
+        with self._lock:
+            if self._log is not None:
+                self._sync()
+    
+    def close(self):
+        """fsync and close the log, or close the store (call on shutdown)"""
+        if self.store is not None:
+            self.store.close()
+            return
+        with self._lock:
+            if not self._log.closed:
+                self._sync()
+                self._log.close()
+    
+    def count(self) -> int:
+        """Number of stored decisions"""
+        if self.store is not None:
+            return self.store.count()
+        return sum(len(partition.timeline) for partition in list(self.partitions.values()))
     
     def add_irrigation_decision(self, decision_data: Dict):
         """Store a new irrigation decision"""
         entry = {
             "timestamp": datetime.now().isoformat(),
+            "farm_id": decision_data.get("farm_id"),
+            "field_id": decision_data.get("field_id"),
             "crop_type": decision_data.get("crop_type"),
             "crop_stage": decision_data.get("crop_stage"),
             "field_size": decision_data.get("field_size"),
@@ -56,30 +481,85 @@ class IrrigationMemory:
             "reasoning": decision_data.get("reasoning", "")
         }
         
-        self.memory.append(entry)
-        self._save_memory()
+        try:
+            # Looked up first: a new partition is loaded from the store without this entry
+            partition = self._partition(entry["farm_id"], entry["field_id"], create=True)
+            if self.store is not None:
+                self.store.add(entry)
+                partition.add(entry)
+            else:
+                # One locked section: a compaction in between would snapshot
+                # the entry below its log seq, replaying it twice on restart
+                with self._lock:
+                    partition.add(entry)
+                    self._append(entry)
+        except Exception as e:
+            logger.error(f"Error saving memory: {e}")
         logger.info(f"Stored irrigation decision: {entry['decision']}")
     
-    def get_recent_history(self, days: int = 7) -> List[Dict]:
-        """Get irrigation history for the last N days"""
+    def get_recent_history(self, days: int = 7, farm_id: Optional[str] = None,
+                           field_id: Optional[str] = None) -> List[Dict]:
+        """Get irrigation history of a farm field for the last N days"""
+        if days in ROLLING_WINDOW_DAYS:
+            # The rolling window holds exactly these decisions; a cutoff
+            # computed here would land just before the timeline's coverage
+            # and send the query to the store
+            return self._partition(farm_id, field_id).windows[days].entries()
+        
         cutoff_date = datetime.now() - timedelta(days=days)
+        return self.get_history_between(cutoff_date, None, farm_id, field_id)
+    
+    def get_history_between(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                            farm_id: Optional[str] = None, field_id: Optional[str] = None) -> List[Dict]:
+        """
+        Irrigation history of a farm field with start <= timestamp < end
         
-        recent = []
-        for entry in reversed(self.memory):
-            try:
-                entry_date = datetime.fromisoformat(entry["timestamp"])
-                if entry_date >= cutoff_date:
-                    recent.append(entry)
-            except:
-                continue
+        Bisects the partition's timeline. With a store, ranges starting
+        before the longest rolling window (which is all the timeline holds)
+        are queried from the database instead.
         
-        return list(reversed(recent))
+        Args:
+            start: Earliest time to include (None = unbounded)
+            end: Exclude decisions at or after this time (None = unbounded)
+        """
+        partition = self._partition(farm_id, field_id)
+        
+        if self.store is not None:
+            covered = datetime.now() - timedelta(days=max(ROLLING_WINDOW_DAYS))
+            if start is None or start.timestamp() < covered.timestamp():
+                return self.store.recent(
+                    local_iso(start) if start else "",
+                    until=local_iso(end) if end else None,
+                    partition=partition_key(farm_id, field_id)
+                )
+        
+        return partition.between(start.timestamp() if start else None, end.timestamp() if end else None)
+    
+    def _window_totals(self, days: int, farm_id: Optional[str] = None,
+                       field_id: Optional[str] = None) -> Dict:
+        """Count, water applied, rain skips and soil moisture sum over the last N days"""
+        partition = self._partition(farm_id, field_id)
+        if days in partition.windows:
+            return partition.windows[days].totals()
+        
+        if self.store is not None:
+            return self.store.totals((datetime.now() - timedelta(days=days)).isoformat(),
+                                     partition=partition_key(farm_id, field_id))
+        
+        entries = self.get_recent_history(days, farm_id, field_id)
+        return {
+            "count": len(entries),
+            "water": sum(entry.get("water_applied", 0) for entry in entries),
+            "skips": sum(1 for entry in entries if entry.get("decision") == "skip"),
+            "moisture": sum(entry.get("soil_moisture", 0) for entry in entries)
+        }
     
-    def get_weekly_summary(self) -> Dict:
-        """Generate a weekly summary for reporting"""
-        week_data = self.get_recent_history(days=7)
+    def get_weekly_summary(self, farm_id: Optional[str] = None,
+                           field_id: Optional[str] = None) -> Dict:
+        """Generate a weekly summary of a farm field for reporting"""
+        totals = self._window_totals(7, farm_id, field_id)
         
-        if not week_data:
+        if not totals["count"]:
             return {
                 "period": "Last 7 days",
                 "total_irrigations": 0,
@@ -89,16 +569,14 @@ class IrrigationMemory:
                 "decisions": []
             }
         
-        total_water = sum(entry.get("water_applied", 0) for entry in week_data)
-        skip_count = sum(1 for entry in week_data if entry.get("decision") == "skip")
-        avg_moisture = sum(entry.get("soil_moisture", 0) for entry in week_data) / len(week_data)
+        week_data = self.get_recent_history(7, farm_id, field_id)
         
         return {
             "period": "Last 7 days",
-            "total_irrigations": len(week_data),
-            "total_water_used": round(total_water, 2),
-            "skipped_due_to_rain": skip_count,
-            "average_soil_moisture": round(avg_moisture, 1),
+            "total_irrigations": totals["count"],
+            "total_water_used": round(totals["water"], 2),
+            "skipped_due_to_rain": totals["skips"],
+            "average_soil_moisture": round(totals["moisture"] / totals["count"], 1),
             "decisions": [
                 {
                     "date": entry["timestamp"][:10],
@@ -109,11 +587,13 @@ class IrrigationMemory:
             ]
         }
     
-    def calculate_water_savings(self, baseline_daily_water: float = 100) -> Dict:
+    def calculate_water_savings(self, baseline_daily_water: float = 100,
+                                farm_id: Optional[str] = None,
+                                field_id: Optional[str] = None) -> Dict:
         """Calculate water saved vs traditional fixed schedule"""
-        week_data = self.get_recent_history(days=7)
+        totals = self._window_totals(7, farm_id, field_id)
         
-        if not week_data:
+        if not totals["count"]:
             return {
                 "smart_system_usage": 0.0,
                 "traditional_schedule": 0.0,
@@ -121,8 +601,8 @@ class IrrigationMemory:
                 "savings_percentage": 0.0
             }
         
-        smart_usage = sum(entry.get("water_applied", 0) for entry in week_data)
-        traditional_usage = len(week_data) * baseline_daily_water
+        smart_usage = totals["water"]
+        traditional_usage = totals["count"] * baseline_daily_water
         
         savings = traditional_usage - smart_usage
         savings_pct = (savings / traditional_usage * 100) if traditional_usage > 0 else 0
@@ -134,9 +614,10 @@ class IrrigationMemory:
             "savings_percentage": round(savings_pct, 1)
         }
     
-    def get_context_for_llm(self) -> str:
-        """Build memory context for LLM prompts"""
-        recent = self.get_recent_history(days=7)
+    def get_context_for_llm(self, farm_id: Optional[str] = None,
+                            field_id: Optional[str] = None) -> str:
+        """Build memory context for LLM prompts from a farm field's history"""
+        recent = self._partition(farm_id, field_id).windows[7].entries(limit=5)
         
         if not recent:
             return "No recent irrigation history available."
@@ -145,7 +626,7 @@ class IrrigationMemory:
             "=== Recent Irrigation History (Last 7 Days) ===\n"
         ]
         
-        for entry in recent[-5:]:  # Last 5 entries
+        for entry in recent:  # Last 5 entries
             date = entry["timestamp"][:10]
             decision = entry.get("decision", "unknown")
             water = entry.get("water_applied", 0)
@@ -156,16 +637,28 @@ class IrrigationMemory:
                 f"Water: {water}L, Soil Moisture: {moisture}%"
             )
         
-        summary = self.get_weekly_summary()
-        context_lines.append(f"\n  Total water used this week: {summary['total_water_used']}L")
-        context_lines.append(f"  Irrigations skipped (rain): {summary['skipped_due_to_rain']}")
+        totals = self._window_totals(7, farm_id, field_id)
+        context_lines.append(f"\n  Total water used this week: {round(totals['water'], 2)}L")
+        context_lines.append(f"  Irrigations skipped (rain): {totals['skips']}")
         
         return '\n'.join(context_lines)
     
-    def get_crop_patterns(self, crop_type: str) -> Dict:
-        """Analyze historical patterns for a specific crop"""
+    def get_crop_patterns(self, crop_type: str, farm_id: Optional[str] = None,
+                          field_id: Optional[str] = None) -> Dict:
+        """Analyze historical patterns for a specific crop on a farm field"""
+        if self.store is not None:
+            totals = self.store.crop_totals(crop_type, partition=partition_key(farm_id, field_id))
+            if not totals["count"]:
+                return {"crop_type": crop_type, "entries": 0, "patterns": None}
+            return {
+                "crop_type": crop_type,
+                "entries": totals["count"],
+                "average_water_per_irrigation": round(totals["water"] / totals["count"], 2),
+                "total_water_historical": round(totals["water"], 2)
+            }
+        
         crop_history = [
-            entry for entry in self.memory 
+            entry for entry in self._partition(farm_id, field_id).memory
             if entry.get("crop_type", "").lower() == crop_type.lower()
         ]
         
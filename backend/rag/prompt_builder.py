@@ -101,6 +101,48 @@ DISCLAIMER:
 [Any important warnings or limitations]
 
 Remember: Your response will help the farmer make a critical decision. Be clear, evidence-based, and actionable."""
+        
+        return prompt
+    
+    def build_irrigation_template_prompt(
+        self,
+        crop_type: str,
+        crop_stage: str,
+        conditions: str,
+        guideline_context: str,
+        decision: str,
+        placeholders: Dict[str, str]
+    ) -> str:
+        """
+        Build a prompt for an explanation shared by every field in a condition bucket
+        
+        Field figures are given as placeholders (filled in per field
+        afterwards) and no field's history is included.
+        """
+        
+        prompt = self.build_irrigation_prompt(
+            crop_type=crop_type,
+            crop_stage=crop_stage,
+            field_size=placeholders["field_size"],
+            soil_moisture=placeholders["soil_moisture"],
+            rainfall=placeholders["rainfall"],
+            guideline_context=guideline_context,
+            memory_context="Not included: this explanation is shared by all fields in the conditions below.",
+            calculated_recommendation={
+                "decision": decision,
+                "water_amount": placeholders["water_amount"],
+                "water_per_hectare": placeholders["water_per_hectare"],
+                "reasoning": conditions
+            }
+        )
+        
+        prompt += f"""
+
+IMPORTANT: This explanation will be reused for every field with these conditions:
+{conditions}
+Refer to field figures ONLY through these placeholders, written exactly as shown:
+{', '.join(placeholders.values())}
+They will be replaced with each field's own numbers."""
 
         return prompt
     
@@ -3,19 +3,45 @@ RAG Component: Information Retriever
 Retrieves relevant agricultural guidelines and data based on context
 """
 
-from typing import List, Dict, Optional
-import re
-from collections import defaultdict
+from typing import List, Dict, Iterable, Optional
+import copy
+from collections import Counter
 import logging
 
+from backend.rag.bm25 import BM25Index
+from backend.rag.chunker import chunk_document, passage_text
+from backend.rag.context_cache import ContextCache, corpus_version
+from backend.rag.facts import FactsTable, WATER_PATTERN
+from backend.rag.index import InvertedIndex, tokenize
+from backend.rag.vector_index import (
+    HashedTfidfIndex, MOISTURE_BAND_TERMS, RAIN_BAND_TERMS, hash_features, moisture_band,
+    passage_vector, rain_band
+)
+
 logger = logging.getLogger(__name__)
 
 
+# Ranking used by get_context_for_llm: whole documents by keyword counts
+# with stitched context windows, or BM25 / hashed TF-IDF over pre-chunked sections
+RETRIEVAL_MODES = ("keyword", "bm25", "tfidf")
+
+
+def document_key(doc: Dict) -> str:
+    """Identity of a guideline document across reloads"""
+    return doc.get("path") or doc["source"]
+
+
 class GuidelineRetriever:
     """Retrieves relevant agricultural information for RAG"""
     
-    def __init__(self, documents: List[Dict]):
-        self.documents = documents
+    def __init__(self, documents: List[Dict], cache: Optional[ContextCache] = None):
+        """
+        Args:
+            documents: Loaded guideline documents
+            cache: Shared context cache (entries are keyed by corpus version,
+                so it can outlive this retriever across guideline reloads)
+        """
+        self.cache = cache
         self.crop_keywords = {
             "rice": ["rice", "paddy", "oryza", "flooded"],
             "wheat": ["wheat", "triticum", "cereal", "grain"],
@@ -27,6 +53,193 @@ class GuidelineRetriever:
             "vegetative": ["vegetative", "tillering", "growth", "development"],
             "flowering": ["flowering", "reproductive", "heading", "anthesis"]
         }
+        
+        self.rain_keywords = ["rain", "rainfall", "precipitation", "skip irrigation", "reduce water"]
+        
+        known_keywords = (
+            [kw for keys in self.crop_keywords.values() for kw in keys] +
+            [kw for keys in self.stage_keywords.values() for kw in keys] +
+            self.rain_keywords
+        )
+        
+        # Everything below is keyed by doc id: the document's position in
+        # self.documents. Removed documents leave a None hole, so ids stay
+        # stable across reloads.
+        self.documents: List[Optional[Dict]] = list(documents)
+        self._doc_ids = {document_key(doc): doc_id for doc_id, doc in enumerate(self.documents)}
+        
+        # Keyword index; scoring becomes posting-list lookups
+        self.index = InvertedIndex()
+        
+        # Per-document lines (original and lowercased) and
+        # keyword -> {doc_id: [line numbers containing it]}
+        self._lines: Dict[int, List[str]] = {}
+        self._lines_lower: Dict[int, List[str]] = {}
+        self._keyword_lines: Dict[str, Dict[int, List[int]]] = {}
+        self._owned_keyword_lines = set()
+        
+        # Section chunks (made at load time, or here for ad-hoc documents),
+        # ranked by BM25 or TF-IDF; chunk id = position in self.chunks
+        self.chunks: List[Optional[Dict]] = []
+        self._doc_chunks: Dict[int, List[int]] = {}
+        self.bm25 = BM25Index()
+        self.vectors = HashedTfidfIndex()
+        
+        # Water requirement / moisture facts (extracted at load time)
+        self.facts = FactsTable([])
+        
+        self._index_documents(range(len(self.documents)))
+        self.index.warm(known_keywords)
+        for keyword in known_keywords:
+            self._lines_with(keyword)
+        
+        self.corpus_version = corpus_version(self.documents)
+    
+    @classmethod
+    def from_batches(cls, batches: Iterable[List[Dict]],
+                     cache: Optional[ContextCache] = None) -> "GuidelineRetriever":
+        """
+        Build a retriever from documents streamed in batches
+        
+        Each batch is indexed as it arrives (BM25 and TF-IDF get one segment
+        per batch, merged as they grow), so loading and indexing overlap and
+        the loader never has to hold the whole corpus in flight.
+        
+        Args:
+            batches: Lists of loaded guideline documents
+            cache: Shared context cache
+        """
+        retriever = cls([], cache=cache)
+        for batch in batches:
+            start = len(retriever.documents)
+            for doc in batch:
+                retriever._doc_ids[document_key(doc)] = len(retriever.documents)
+                retriever.documents.append(doc)
+            retriever._index_documents(range(start, len(retriever.documents)))
+        
+        retriever.corpus_version = corpus_version(retriever.documents)
+        return retriever
+    
+    def _index_documents(self, doc_ids: Iterable[int]):
+        """Add documents already placed in self.documents to every index"""
+        chunk_terms, chunk_vectors = [], []
+        
+        for doc_id in doc_ids:
+            doc = self.documents[doc_id]
+            self.index.add(doc_id, doc["content"])
+            
+            self._lines[doc_id] = doc["content"].split('\n')
+            self._lines_lower[doc_id] = [line.lower() for line in self._lines[doc_id]]
+            for keyword in list(self._keyword_lines):
+                if doc_id in self.index.keyword_counts(keyword):
+                    self._writable_keyword_lines(keyword)[doc_id] = [
+                        i for i, line in enumerate(self._lines_lower[doc_id]) if keyword in line
+                    ]
+            
+            chunks = doc.get("chunks") or chunk_document(doc["content"])
+            chunk_ids = []
+            for chunk in chunks:
+                chunk_ids.append(len(self.chunks))
+                self.chunks.append(dict(chunk, source=doc["source"], doc_id=doc_id))
+            self._doc_chunks[doc_id] = chunk_ids
+            
+            # Term counts and TF-IDF vectors precomputed by the corpus loader
+            # are used once and dropped; other documents are tokenized here
+            features = doc.pop("index_features", None)
+            if features and features["hash_space"] == (self.vectors.n_features, self.vectors.ngrams):
+                chunk_terms.extend(features["terms"])
+                chunk_vectors.extend(features["vectors"])
+            else:
+                texts = [passage_text(chunk) for chunk in chunks]
+                chunk_terms.extend(Counter(tokenize(text)) for text in texts)
+                chunk_vectors.extend(
+                    passage_vector(hash_features(text, self.vectors.n_features, self.vectors.ngrams))
+                    for text in texts
+                )
+            
+            self.facts.add_document(doc_id, doc)
+        
+        self.bm25.add_counts(chunk_terms)
+        self.vectors.add_vectors(chunk_vectors)
+    
+    def _remove_document(self, doc_id: int):
+        """Drop a document from every index, leaving a hole at its doc id"""
+        self.index.remove(doc_id)
+        
+        self._lines.pop(doc_id, None)
+        self._lines_lower.pop(doc_id, None)
+        for keyword, hits in list(self._keyword_lines.items()):
+            if doc_id in hits:
+                del self._writable_keyword_lines(keyword)[doc_id]
+        
+        for chunk_id in self._doc_chunks.pop(doc_id, []):
+            self.bm25.remove(chunk_id)
+            self.vectors.remove(chunk_id)
+            self.chunks[chunk_id] = None
+        
+        self.facts.remove_document(doc_id)
+        self.documents[doc_id] = None
+    
+    def _writable_keyword_lines(self, keyword: str) -> Dict[int, List[int]]:
+        if keyword not in self._owned_keyword_lines:
+            self._keyword_lines[keyword] = dict(self._keyword_lines.get(keyword, {}))
+            self._owned_keyword_lines.add(keyword)
+        return self._keyword_lines[keyword]
+    
+    def apply_changes(self, upserts: List[Dict], removed: List[str]) -> "GuidelineRetriever":
+        """
+        Retriever over the corpus with some documents added, replaced or removed
+        
+        This retriever is left untouched, so requests already using it finish
+        against a consistent corpus; the caller swaps the returned retriever
+        in. Indexes are copied on write, so the cost is proportional to the
+        changed documents, not the corpus.
+        
+        Args:
+            upserts: New or edited documents (matched by document_key)
+            removed: document_key of deleted documents
+        
+        Returns:
+            GuidelineRetriever: Updated retriever sharing unchanged index data
+        """
+        new = copy.copy(self)
+        new.documents = list(self.documents)
+        new._doc_ids = dict(self._doc_ids)
+        new.index = self.index.clone()
+        new._lines = dict(self._lines)
+        new._lines_lower = dict(self._lines_lower)
+        new._keyword_lines = dict(self._keyword_lines)
+        new._owned_keyword_lines = set()
+        self._owned_keyword_lines = set()
+        new.chunks = list(self.chunks)
+        new._doc_chunks = dict(self._doc_chunks)
+        new.bm25 = self.bm25.clone()
+        new.vectors = self.vectors.clone()
+        new.facts = self.facts.clone()
+        
+        for key in removed:
+            doc_id = new._doc_ids.pop(key, None)
+            if doc_id is not None:
+                new._remove_document(doc_id)
+        
+        changed = []
+        for doc in upserts:
+            key = document_key(doc)
+            doc_id = new._doc_ids.get(key)
+            if doc_id is None:
+                doc_id = len(new.documents)
+                new.documents.append(None)
+                new._doc_ids[key] = doc_id
+            else:
+                new._remove_document(doc_id)
+            new.documents[doc_id] = doc
+            changed.append(doc_id)
+        
+        new._index_documents(changed)
+        new.corpus_version = corpus_version(new.documents)
+        
+        logger.info(f"Re-indexed {len(changed)} changed and {len(removed)} removed guideline documents")
+        return new
     
     def retrieve_for_crop(self, crop_type: str, crop_stage: str, top_k: int = 3) -> List[Dict]:
         """Retrieve relevant guidelines for specific crop and stage"""
@@ -37,29 +250,29 @@ class GuidelineRetriever:
         
         all_keywords = crop_keys + stage_keys
         
+        # Relevance score = total keyword occurrences (from the index)
+        keyword_counts = [self.index.keyword_counts(keyword) for keyword in all_keywords]
+        scores = self.index.score(all_keywords)
+        
+        # Highest score first; ties keep document order (as a stable sort would)
+        ranked = sorted(scores, key=lambda doc_id: (-scores[doc_id], doc_id))[:top_k]
+        
         results = []
         
-        for doc in self.documents:
-            content_lower = doc["content"].lower()
-            
-            # Calculate relevance score
-            score = 0
-            matches = []
-            
-            for keyword in all_keywords:
-                count = content_lower.count(keyword)
-                score += count
-                if count > 0:
-                    matches.append(keyword)
+        for doc_id in ranked:
+            doc = self.documents[doc_id]
+            score = scores[doc_id]
+            matches = [
+                keyword for keyword, counts in zip(all_keywords, keyword_counts)
+                if counts.get(doc_id, 0) > 0
+            ]
             
             if score > 0:
                 # Extract relevant sections
-                sections = self._extract_relevant_sections(
-                    doc["content"], 
-                    all_keywords
-                )
+                sections = self._extract_relevant_sections(doc_id, all_keywords)
                 
                 results.append({
+                    "doc_id": doc_id,
                     "source": doc["source"],
                     "score": score,
                     "matches": matches,
@@ -67,34 +280,113 @@ class GuidelineRetriever:
                     "full_content": doc["content"]
                 })
         
-        # Sort by relevance score
-        results.sort(key=lambda x: x["score"], reverse=True)
+        return results
+    
+    def retrieve_chunks(self, crop_type: str, crop_stage: str, top_k: int = 4) -> List[Dict]:
+        """
+        Retrieve the best-matching guideline sections with BM25
+        
+        Args:
+            crop_type: Crop name
+            crop_stage: Growth stage
+            top_k: Number of chunks to return
         
-        return results[:top_k]
+        Returns:
+            List of dicts with 'source', 'section', 'text' and 'score', best first
+        """
+        crop_keys = self.crop_keywords.get(crop_type.lower(), [crop_type.lower()])
+        stage_keys = self.stage_keywords.get(crop_stage.lower(), [crop_stage.lower()])
+        query_terms = tokenize(' '.join(crop_keys + stage_keys))
+        
+        return self._chunk_results(self.bm25.search(query_terms, top_k, self._chunk_order))
+    
+    def retrieve_vector_chunks(self, crop_type: str, crop_stage: str, soil_moisture: float,
+                               rainfall: float, moisture_threshold: float, top_k: int = 4) -> List[Dict]:
+        """
+        Retrieve guideline sections by TF-IDF similarity to the field situation
+        
+        The query combines crop and stage keywords with terms for the current
+        soil moisture band and rainfall band.
+        
+        Args:
+            crop_type: Crop name
+            crop_stage: Growth stage
+            soil_moisture: Current soil moisture (%)
+            rainfall: Predicted rainfall (mm)
+            moisture_threshold: Irrigation threshold of the crop stage (%),
+                which the moisture band is measured from
+            top_k: Number of chunks to return
+        
+        Returns:
+            List of dicts with 'source', 'section', 'text' and 'score', best first
+        """
+        crop_keys = self.crop_keywords.get(crop_type.lower(), [crop_type.lower()])
+        stage_keys = self.stage_keywords.get(crop_stage.lower(), [crop_stage.lower()])
+        # Crop and stage terms are repeated so conditions only break ties
+        # between sections about the right crop
+        query = ' '.join(crop_keys * 3 + stage_keys * 2 + [
+            MOISTURE_BAND_TERMS[moisture_band(soil_moisture, moisture_threshold)],
+            RAIN_BAND_TERMS[rain_band(rainfall)]
+        ])
+        
+        return self._chunk_results(self.vectors.search(query, top_k, self._chunk_order))
+    
+    def _chunk_order(self, chunk_id: int) -> tuple:
+        """Ties rank in document order, however often documents were reloaded"""
+        chunk = self.chunks[chunk_id]
+        return (chunk["doc_id"], chunk["line"])
+    
+    def _chunk_results(self, ranked) -> List[Dict]:
+        results = []
+        for chunk_id, score in ranked:
+            chunk = self.chunks[chunk_id]
+            results.append({
+                "source": chunk["source"],
+                "section": chunk["section"],
+                "text": chunk["text"],
+                "score": round(score, 3)
+            })
+        return results
+    
+    def _lines_with(self, keyword: str) -> Dict[int, List[int]]:
+        """Line numbers containing keyword, per document (memoized)"""
+        hits = self._keyword_lines.get(keyword)
+        if hits is None:
+            hits = {
+                doc_id: [i for i, line in enumerate(self._lines_lower[doc_id]) if keyword in line]
+                for doc_id in self.index.keyword_counts(keyword)
+            }
+            self._keyword_lines[keyword] = hits
+            self._owned_keyword_lines.add(keyword)
+        return hits
     
-    def _extract_relevant_sections(self, content: str, keywords: List[str], 
-                                   context_lines: int = 3) -> List[str]:
+    def _extract_relevant_sections(self, doc_id: int, keywords: List[str], 
+                                   context_lines: int = 3, max_sections: int = 5) -> List[str]:
         """Extract relevant sections around keywords"""
-        lines = content.split('\n')
+        lines = self._lines[doc_id]
+        
+        # Lines containing any keyword, in document order
+        matching = set()
+        for keyword in keywords:
+            matching.update(self._lines_with(keyword).get(doc_id, ()))
+        
         relevant_sections = []
         seen_indices = set()
         
-        for i, line in enumerate(lines):
-            line_lower = line.lower()
-            
-            # Check if any keyword is in this line
-            if any(keyword in line_lower for keyword in keywords):
+        for i in sorted(matching):
+            # Avoid duplicates
+            if i not in seen_indices:
                 # Get context around this line
                 start_idx = max(0, i - context_lines)
                 end_idx = min(len(lines), i + context_lines + 1)
                 
-                # Avoid duplicates
-                if i not in seen_indices:
-                    section = '\n'.join(lines[start_idx:end_idx])
-                    relevant_sections.append(section)
-                    seen_indices.update(range(start_idx, end_idx))
+                relevant_sections.append('\n'.join(lines[start_idx:end_idx]))
+                seen_indices.update(range(start_idx, end_idx))
+                
+                if len(relevant_sections) == max_sections:
+                    break
         
-        return relevant_sections[:5]  # Top 5 sections
+        return relevant_sections
     
     def retrieve_water_requirements(self, crop_type: str, crop_stage: str) -> Dict:
         """Retrieve specific water requirement information"""
@@ -108,23 +400,18 @@ class GuidelineRetriever:
             "sources": []
         }
         
-        # Pattern to find water requirements (mm/day, liters/ha, etc.)
-        water_pattern = r'(\d+(?:\.\d+)?)\s*(mm|l|liters?|m3)(?:/|\s*per\s*)(day|hectare|ha)'
-        
         for result in results:
-            content = result["full_content"]
-            
-            # Find water requirement numbers
-            matches = re.findall(water_pattern, content, re.IGNORECASE)
+            # Water requirement numbers extracted at load time
+            facts = self.facts.for_document(result["doc_id"], "water_requirement")
             
-            if matches:
+            if facts:
                 water_info["requirements"].extend([
                     {
-                        "value": float(m[0]),
-                        "unit": f"{m[1]}/{m[2]}",
+                        "value": fact["value"],
+                        "unit": fact["unit"],
                         "source": result["source"]
                     }
-                    for m in matches
+                    for fact in facts
                 ])
             
             water_info["sources"].append({
@@ -143,47 +430,35 @@ class GuidelineRetriever:
             "sources": []
         }
         
-        # Pattern for moisture percentages
-        moisture_pattern = r'(\d+(?:\.\d+)?)\s*%?\s*(moisture|water\s*content)'
-        
-        for doc in self.documents:
-            content_lower = doc["content"].lower()
+        # Soil moisture facts attributed to this crop, by source
+        for fact in self.facts.query("moisture_threshold", crop=crop_type):
+            threshold_info["thresholds"].append({
+                "value": fact["value"],
+                "value_min": fact["value_min"],
+                "type": "moisture",
+                "stage": fact["stage"],
+                "source": fact["source"]
+            })
             
-            # Check if document discusses this crop
-            if any(keyword in content_lower for keyword in self.crop_keywords.get(crop_type.lower(), [])):
-                matches = re.findall(moisture_pattern, doc["content"], re.IGNORECASE)
-                
-                if matches:
-                    threshold_info["thresholds"].extend([
-                        {
-                            "value": float(m[0]),
-                            "type": m[1],
-                            "source": doc["source"]
-                        }
-                        for m in matches
-                    ])
-                    
-                    threshold_info["sources"].append(doc["source"])
+            if fact["source"] not in threshold_info["sources"]:
+                threshold_info["sources"].append(fact["source"])
         
         return threshold_info
     
     def retrieve_rain_guidelines(self) -> List[Dict]:
         """Retrieve guidelines about rainfall and irrigation"""
         
-        rain_keywords = ["rain", "rainfall", "precipitation", "skip irrigation", "reduce water"]
+        rain_keywords = self.rain_keywords
+        scores = self.index.score(rain_keywords)
         
         results = []
         
-        for doc in self.documents:
-            content_lower = doc["content"].lower()
-            
-            score = sum(content_lower.count(kw) for kw in rain_keywords)
+        for doc_id in sorted(scores):
+            doc = self.documents[doc_id]
+            score = scores[doc_id]
             
             if score > 0:
-                sections = self._extract_relevant_sections(
-                    doc["content"],
-                    rain_keywords
-                )
+                sections = self._extract_relevant_sections(doc_id, rain_keywords)
                 
                 results.append({
                     "source": doc["source"],
@@ -193,8 +468,57 @@ class GuidelineRetriever:
         return results
     
     def get_context_for_llm(self, crop_type: str, crop_stage: str, 
-                           soil_moisture: float, rainfall: float) -> str:
-        """Build comprehensive context for LLM prompt"""
+                           soil_moisture: float, rainfall: float,
+                           mode: str = "keyword", moisture_threshold: Optional[float] = None) -> str:
+        """
+        Build comprehensive context for LLM prompt
+        
+        The guideline part depends only on the corpus, mode, crop and stage
+        (plus the moisture/rain bands in tfidf mode), so it is served from
+        the context cache when one is attached; the current conditions are
+        appended per request.
+        
+        Args:
+            crop_type: Crop name
+            crop_stage: Growth stage
+            soil_moisture: Current soil moisture (%)
+            rainfall: Predicted rainfall (mm)
+            mode: One of RETRIEVAL_MODES
+            moisture_threshold: Irrigation threshold of the crop stage (%);
+                required in tfidf mode
+        """
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {mode}")
+        if mode == "tfidf" and moisture_threshold is None:
+            raise ValueError("tfidf retrieval needs the crop stage's moisture threshold")
+        
+        bands = (moisture_band(soil_moisture, moisture_threshold), rain_band(rainfall)) if mode == "tfidf" else None
+        key = (self.corpus_version, mode, crop_type, crop_stage, bands)
+        
+        guideline_block = self.cache.get(key) if self.cache is not None else None
+        if guideline_block is None:
+            guideline_block = self._build_guideline_block(crop_type, crop_stage, soil_moisture, rainfall,
+                                                          mode, moisture_threshold)
+            if self.cache is not None:
+                self.cache.put(key, guideline_block)
+        
+        # Add current conditions
+        context_parts = [guideline_block]
+        context_parts.append(f"\n=== Current Field Conditions ===")
+        context_parts.append(f"  - Soil Moisture: {soil_moisture}%")
+        context_parts.append(f"  - Predicted Rainfall: {rainfall} mm")
+        
+        return '\n'.join(context_parts)
+    
+    def _build_guideline_block(self, crop_type: str, crop_stage: str, soil_moisture: float,
+                               rainfall: float, mode: str, moisture_threshold: Optional[float]) -> str:
+        """Guidelines and water requirements part of the LLM context"""
+        if mode == "bm25":
+            chunks = self.retrieve_chunks(crop_type, crop_stage)
+            return self._build_chunk_block(crop_type, crop_stage, chunks)
+        if mode == "tfidf":
+            chunks = self.retrieve_vector_chunks(crop_type, crop_stage, soil_moisture, rainfall, moisture_threshold)
+            return self._build_chunk_block(crop_type, crop_stage, chunks)
         
         # Retrieve relevant information
         crop_guidelines = self.retrieve_for_crop(crop_type, crop_stage, top_k=2)
@@ -220,9 +544,27 @@ class GuidelineRetriever:
                     f"  - {req['value']} {req['unit']} (Source: {req['source']})"
                 )
         
-        # Add current conditions
-        context_parts.append(f"\n=== Current Field Conditions ===")
-        context_parts.append(f"  - Soil Moisture: {soil_moisture}%")
-        context_parts.append(f"  - Predicted Rainfall: {rainfall} mm")
+        return '\n'.join(context_parts)
+    
+    def _build_chunk_block(self, crop_type: str, crop_stage: str, chunks: List[Dict]) -> str:
+        """Guidelines part of the LLM context from retrieved chunks only"""
+        context_parts = []
+        context_parts.append(f"=== Agricultural Guidelines for {crop_type.title()} ({crop_stage} stage) ===\n")
+        
+        for chunk in chunks:
+            heading = f" - {chunk['section']}" if chunk['section'] else ""
+            context_parts.append(f"\nSource: {chunk['source']}{heading} (relevance {chunk['score']})")
+            context_parts.append(f"  {chunk['text']}\n")
+        
+        # Water requirements quoted in the retrieved chunks
+        requirements = [
+            (m, chunk["source"])
+            for chunk in chunks
+            for m in WATER_PATTERN.findall(chunk["text"])
+        ]
+        if requirements:
+            context_parts.append("\n=== Water Requirements Found ===")
+            for m, source in requirements[:3]:
+                context_parts.append(f"  - {float(m[0])} {m[1]}/{m[2]} (Source: {source})")
         
         return '\n'.join(context_parts)
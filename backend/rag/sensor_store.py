@@ -0,0 +1,420 @@
+"""
+RAG Component: Columnar Sensor Store
+Append-only, memory-mapped storage for soil sensor readings
+"""
+
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from backend.rag.csv_tail import complete_prefix_size, open_prefix
+
+logger = logging.getLogger(__name__)
+
+
+# Column name -> on-disk dtype (little endian, fixed width)
+COLUMNS = {
+    "timestamp": "<i8",      # epoch seconds
+    "temperature": "<f4",
+    "pressure": "<f8",
+    "altitude": "<f4",
+    "soilmiosture": "<f4",
+    "class_code": "<i4",     # index into meta["class_labels"], -1 if unknown
+    "field_code": "<i4",     # index into meta["field_labels"], -1 if untagged
+    "sensor_code": "<i4",    # index into meta["sensor_labels"], -1 if untagged
+}
+
+# Code column -> meta key holding its label dictionary
+LABEL_KEYS = {
+    "class_code": "class_labels",
+    "field_code": "field_labels",
+    "sensor_code": "sensor_labels",
+}
+
+META_FILE = "meta.json"
+STORE_VERSION = 1
+
+
+class SensorStore:
+    """
+    Append-only columnar store for soil sensor readings
+    
+    Each column lives in its own flat binary file and is read through a
+    read-only memory map, so queries only fault in the pages they touch.
+    Appends write every column first and then commit the new row count to
+    meta.json, so a torn append is discarded on the next open. Labels new to
+    a dictionary column are committed in the same meta.json write, so a
+    failed append never registers them.
+    """
+    
+    def __init__(self, store_dir: Path):
+        self.store_dir = Path(store_dir)
+        self.meta = self._load_meta()
+        self._recover()
+        self._label_index = {
+            column: {label: code for code, label in enumerate(self.meta[key])}
+            for column, key in LABEL_KEYS.items()
+        }
+        self._maps: Dict[str, Tuple[int, np.ndarray]] = {}
+        self._write_lock = threading.Lock()
+        self._listeners: List[Callable[["SensorStore", Dict[str, np.ndarray]], None]] = []
+    
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+    
+    @classmethod
+    def create(cls, store_dir: Path) -> "SensorStore":
+        """Create an empty store (or open it if it already exists)"""
+        store_dir = Path(store_dir)
+        store_dir.mkdir(parents=True, exist_ok=True)
+        
+        if not (store_dir / META_FILE).exists():
+            for name in COLUMNS:
+                (store_dir / f"{name}.bin").touch()
+            cls._write_meta(store_dir, {
+                "version": STORE_VERSION,
+                "rows": 0,
+                "columns": COLUMNS,
+                "class_labels": [],
+                "field_labels": [],
+                "sensor_labels": [],
+                "sorted": True,
+                "source": None,
+            })
+        
+        return cls(store_dir)
+    
+    @staticmethod
+    def exists(store_dir: Path) -> bool:
+        return (Path(store_dir) / META_FILE).exists()
+    
+    @staticmethod
+    def _write_meta(store_dir: Path, meta: Dict):
+        tmp_path = store_dir / f"{META_FILE}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, store_dir / META_FILE)
+    
+    def _load_meta(self) -> Dict:
+        with open(self.store_dir / META_FILE, 'r') as f:
+            return json.load(f)
+    
+    def _column_path(self, name: str) -> Path:
+        return self.store_dir / f"{name}.bin"
+    
+    def _recover(self):
+        """Trim column files back to the committed row count"""
+        rows = self.meta["rows"]
+        for name, dtype in COLUMNS.items():
+            path = self._column_path(name)
+            expected = rows * np.dtype(dtype).itemsize
+            size = path.stat().st_size
+            
+            if size < expected:
+                raise IOError(f"Sensor store column {name} is shorter than committed rows")
+            if size > expected:
+                logger.warning(f"Discarding torn append in sensor store column {name}")
+                with open(path, 'r+b') as f:
+                    f.truncate(expected)
+    
+    def __len__(self) -> int:
+        return self.meta["rows"]
+    
+    @property
+    def class_labels(self) -> List[str]:
+        return self.meta["class_labels"]
+    
+    @property
+    def field_labels(self) -> List[str]:
+        return self.meta["field_labels"]
+    
+    def _encode(self, column: str, labels: Iterable, count: int) -> Tuple[np.ndarray, List[str]]:
+        """Codes for a label per row, and the labels that are new (numbered after the registered ones)"""
+        labels = list(labels)
+        if len(labels) != count:
+            raise ValueError(f"Column {column} has {len(labels)} labels, expected {count}")
+        
+        index = self._label_index[column]
+        added = []
+        codes = {}
+        for label in dict.fromkeys(labels):
+            if label is None or label == "":
+                codes[label] = -1
+            elif label in index:
+                codes[label] = index[label]
+            else:
+                codes[label] = len(index) + len(added)
+                added.append(label)
+        
+        dtype = COLUMNS[column]
+        if len(index) + len(added) > np.iinfo(dtype).max + 1:
+            raise ValueError(f"Too many distinct labels for sensor store column {column}")
+        return np.fromiter((codes[label] for label in labels), dtype=dtype, count=count), added
+    
+    def field_label(self, code: int) -> Optional[str]:
+        return self._label("field_code", code)
+    
+    def _label(self, column: str, code: int) -> Optional[str]:
+        labels = self.meta[LABEL_KEYS[column]]
+        return labels[code] if 0 <= code < len(labels) else None
+    
+    @staticmethod
+    def _default_values(name: str, count: int) -> np.ndarray:
+        dtype = COLUMNS[name]
+        if np.dtype(dtype).kind == 'f':
+            return np.full(count, np.nan, dtype=dtype)
+        return np.full(count, -1, dtype=dtype)
+    
+    def append(self, columns: Dict[str, Iterable], meta_updates: Optional[Dict] = None,
+               labels: Optional[Dict[str, Iterable]] = None) -> int:
+        """
+        Append a batch of readings
+        
+        Args:
+            columns: Column name -> values. Missing columns are filled with
+                NaN (floats) or -1 (codes). Timestamps are required.
+            meta_updates: Extra meta.json keys committed atomically with the rows
+            labels: Code column -> label per row (None for none), encoded
+                under the write lock; new labels are committed with the rows
+        
+        Returns:
+            int: Number of rows appended
+        """
+        timestamps = np.asarray(columns["timestamp"], dtype=COLUMNS["timestamp"])
+        count = len(timestamps)
+        if count == 0:
+            return 0
+        
+        batch = {}
+        for name, dtype in COLUMNS.items():
+            if name in columns:
+                values = np.asarray(columns[name], dtype=dtype)
+            else:
+                values = self._default_values(name, count)
+            
+            if len(values) != count:
+                raise ValueError(f"Column {name} has {len(values)} values, expected {count}")
+            batch[name] = values
+        
+        with self._write_lock:
+            added = {}
+            for name, values in (labels or {}).items():
+                batch[name], added[name] = self._encode(name, values, count)
+            
+            # Range queries binary-search the timestamp column while it stays ordered
+            last_ts = self._column("timestamp")[-1] if len(self) else None
+            if self.meta["sorted"]:
+                in_order = bool(np.all(timestamps[1:] >= timestamps[:-1]))
+                if not in_order or (last_ts is not None and timestamps[0] < last_ts):
+                    logger.warning("Out-of-order readings appended; range queries will scan")
+                    self.meta["sorted"] = False
+            
+            for name, values in batch.items():
+                with open(self._column_path(name), 'ab') as f:
+                    f.write(values.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+            
+            meta = dict(self.meta, **(meta_updates or {}))
+            meta["rows"] = self.meta["rows"] + count
+            for name, new_labels in added.items():
+                meta[LABEL_KEYS[name]] = self.meta[LABEL_KEYS[name]] + new_labels
+            self._write_meta(self.store_dir, meta)
+            self.meta = meta
+            for name, new_labels in added.items():
+                index = self._label_index[name]
+                for label in new_labels:
+                    index[label] = len(index)
+            
+            for listener in self._listeners:
+                try:
+                    listener(self, batch)
+                except Exception as e:
+                    logger.error(f"Sensor store listener failed: {e}")
+            
+            return count
+    
+    def add_listener(self, listener: Callable[["SensorStore", Dict[str, np.ndarray]], None]):
+        """Call listener(store, batch_columns) after every committed append"""
+        self._listeners.append(listener)
+    
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    
+    def _column(self, name: str) -> np.ndarray:
+        """Read-only memory map of a column, reopened when the store grows"""
+        rows = len(self)
+        cached = self._maps.get(name)
+        if cached is not None and cached[0] == rows:
+            return cached[1]
+        
+        if rows == 0:
+            array = np.empty(0, dtype=COLUMNS[name])
+        else:
+            array = np.memmap(self._column_path(name), dtype=COLUMNS[name], mode='r', shape=(rows,))
+        self._maps[name] = (rows, array)
+        return array
+    
+    def row(self, index: int) -> Dict:
+        """Decode a single row (touches one page per column)"""
+        row = {}
+        for name in COLUMNS:
+            value = self._column(name)[index].item()
+            if isinstance(value, float):
+                value = None if np.isnan(value) else round(value, 4)
+            row[name] = value
+        
+        row["class"] = self._label("class_code", row["class_code"]) or "Unknown"
+        row["field_id"] = self._label("field_code", row["field_code"])
+        row["sensor_id"] = self._label("sensor_code", row["sensor_code"])
+        return row
+    
+    def latest(self) -> Optional[Dict]:
+        """Most recent reading (touches only the last page of each column)"""
+        if len(self) == 0:
+            return None
+        return self.row(-1)
+    
+    def latest_by_field(self, block_rows: int = 65_536) -> Dict[str, Dict]:
+        """
+        Most recent reading for every tagged field
+        
+        Scans the field column backwards one block at a time and stops as
+        soon as every known field has been seen, so a store whose fields
+        all reported recently only touches its tail.
+        """
+        fields = self._column("field_code")
+        wanted = set(range(len(self.field_labels)))
+        latest = {}
+        
+        end = len(fields)
+        while wanted and end > 0:
+            start = max(0, end - block_rows)
+            block = fields[start:end]
+            codes, first_from_end = np.unique(block[::-1], return_index=True)
+            for code, offset in zip(codes.tolist(), first_from_end.tolist()):
+                if code in wanted:
+                    wanted.discard(code)
+                    latest[self.field_labels[code]] = self.row(end - 1 - offset)
+            end = start
+        
+        return latest
+    
+    def range_slice(self, start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> slice:
+        """Row slice covering readings with start_ts <= timestamp < end_ts"""
+        timestamps = self._column("timestamp")
+        lo = 0 if start_ts is None else int(np.searchsorted(timestamps, start_ts, side='left'))
+        hi = len(timestamps) if end_ts is None else int(np.searchsorted(timestamps, end_ts, side='left'))
+        return slice(lo, max(lo, hi))
+    
+    def read_range(self, start_ts: Optional[int] = None, end_ts: Optional[int] = None,
+                   columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """Read columns for a time window"""
+        columns = columns or list(COLUMNS)
+        
+        if self.meta["sorted"]:
+            window = self.range_slice(start_ts, end_ts)
+            return {name: self._column(name)[window] for name in columns}
+        
+        timestamps = self._column("timestamp")
+        mask = np.ones(len(timestamps), dtype=bool)
+        if start_ts is not None:
+            mask &= timestamps >= start_ts
+        if end_ts is not None:
+            mask &= timestamps < end_ts
+        return {name: self._column(name)[mask] for name in columns}
+    
+    def aggregate(self, column: str = "soilmiosture", start_ts: Optional[int] = None,
+                  end_ts: Optional[int] = None) -> Dict:
+        """Count/min/max/mean of a column over a time window"""
+        values = self.read_range(start_ts, end_ts, [column])[column]
+        if np.dtype(COLUMNS[column]).kind == 'f':
+            values = values[~np.isnan(values)]
+        
+        if len(values) == 0:
+            return {"column": column, "count": 0, "min": None, "max": None, "mean": None}
+        
+        return {
+            "column": column,
+            "count": int(len(values)),
+            "min": float(values.min()),
+            "max": float(values.max()),
+            "mean": float(values.mean(dtype=np.float64)),
+        }
+
+
+def convert_csv_to_store(csv_path: Path, store_dir: Path, chunksize: int = 100_000) -> SensorStore:
+    """
+    One-time conversion of a soil moisture CSV into a columnar store
+    
+    The CSV is streamed in chunks, so memory stays bounded by chunksize
+    regardless of the size of the log. The store is built in a scratch
+    directory and renamed into place, so an interrupted conversion is
+    simply redone on the next start.
+    """
+    import pandas as pd
+    
+    csv_path = Path(csv_path)
+    store_dir = Path(store_dir)
+    if SensorStore.exists(store_dir):
+        raise FileExistsError(f"Sensor store already exists: {store_dir}")
+    
+    build_dir = store_dir.with_name(store_dir.name + ".building")
+    if build_dir.exists():
+        shutil.rmtree(build_dir)
+    store = SensorStore.create(build_dir)
+    
+    # Only convert complete lines; anything after is picked up by tail-follow
+    source_offset = complete_prefix_size(csv_path)
+    
+    with open_prefix(csv_path, source_offset) as source:
+        chunks = pd.read_csv(source, chunksize=chunksize, dtype={"date": str, "time": str})
+        for chunk in chunks:
+            append_csv_rows(store, chunk)
+    
+    store.meta["source"] = {"path": str(csv_path), "offset": source_offset}
+    SensorStore._write_meta(build_dir, store.meta)
+    os.replace(build_dir, store_dir)
+    
+    store = SensorStore(store_dir)
+    logger.info(f"Converted {csv_path.name} into sensor store: {len(store)} rows")
+    return store
+
+
+def append_csv_rows(store: SensorStore, frame, meta_updates: Optional[Dict] = None) -> int:
+    """Append a DataFrame of soil_moisture.csv rows to the store"""
+    import pandas as pd
+    
+    stamps = pd.to_datetime(
+        frame["date"] + " " + frame["time"],
+        format="%d-%m-%Y %H:%M:%S",
+        errors="coerce",
+        utc=True,
+    )
+    valid = stamps.notna().to_numpy()
+    if not valid.all():
+        logger.warning(f"Skipping {int((~valid).sum())} rows with unparseable timestamps")
+    frame = frame[valid]
+    stamps = stamps[valid]
+    
+    # Stringify labels once per distinct value instead of once per row
+    label_idx, labels = pd.factorize(frame["class"])
+    names = np.array([str(label) for label in labels] + [None], dtype=object)
+    
+    return store.append({
+        "timestamp": stamps.to_numpy(dtype="datetime64[s]").astype(np.int64),
+        "temperature": pd.to_numeric(frame["temperature"], errors="coerce").to_numpy(),
+        "pressure": pd.to_numeric(frame["pressure"], errors="coerce").to_numpy(),
+        "altitude": pd.to_numeric(frame["altitude"], errors="coerce").to_numpy(),
+        "soilmiosture": pd.to_numeric(frame["soilmiosture"], errors="coerce").to_numpy(),
+    }, meta_updates, labels={"class_code": names[label_idx]})
@@ -0,0 +1,272 @@
+"""
+RAG Component: Hashed TF-IDF Vector Index
+Offline sparse vector retrieval over guideline chunks (no embedding service)
+"""
+
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+import math
+import zlib
+import logging
+
+from backend.rag.index import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+# Query terms describing the current field conditions, per band
+# (moisture bands are relative to the crop stage's irrigation threshold)
+MOISTURE_BAND_TERMS = {
+    "dry": "low soil moisture below threshold irrigate water stress",
+    "moderate": "soil moisture threshold maintain monitor",
+    "wet": "high soil moisture waterlogging drainage avoid over irrigation",
+}
+
+# Bands follow the rainfall tiers in the guidelines (light 2-5, moderate 5-15, heavy >15 mm)
+RAIN_BAND_TERMS = {
+    "none": "",
+    "light": "light rain continue planned irrigation",
+    "moderate": "moderate rain delay irrigation reduce",
+    "heavy": "heavy rain skip irrigation drainage",
+}
+
+
+# Points above the irrigation threshold where soil counts as wet
+WET_MARGIN = 15
+
+# Default hash space; the corpus loader precomputes features with it
+N_FEATURES = 2 ** 18
+NGRAMS = 2
+
+
+def moisture_band(soil_moisture: float, threshold: float) -> str:
+    """
+    Coarse soil moisture band (%) against the crop stage's irrigation threshold
+    
+    "dry" is exactly where the rule engine irrigates (below threshold), so
+    the query never asks for drainage terms on a field it would water.
+    """
+    if soil_moisture < threshold:
+        return "dry"
+    if soil_moisture < threshold + WET_MARGIN:
+        return "moderate"
+    return "wet"
+
+
+def rain_band(rainfall_mm: float) -> str:
+    """Coarse rainfall band (mm)"""
+    if rainfall_mm < 2:
+        return "none"
+    if rainfall_mm <= 5:
+        return "light"
+    if rainfall_mm <= 15:
+        return "moderate"
+    return "heavy"
+
+
+def hash_features(text: str, n_features: int = N_FEATURES, ngrams: int = NGRAMS) -> Counter:
+    """
+    Hashed word n-gram counts
+    
+    crc32 is used rather than hash() so feature ids are stable across
+    processes (PYTHONHASHSEED).
+    """
+    tokens = tokenize(text)
+    features = Counter()
+    for n in range(1, ngrams + 1):
+        for i in range(len(tokens) - n + 1):
+            gram = ' '.join(tokens[i:i + n])
+            features[zlib.crc32(gram.encode('utf-8')) % n_features] += 1
+    return features
+
+
+def passage_vector(features: Counter) -> Tuple:
+    """
+    Sparse passage vector from hash_features: sublinear tf, L2-normalized
+    
+    Returns:
+        (feature ids as int64 array, weights as float32 array)
+    """
+    import numpy as np
+    
+    weights = [1.0 + math.log(tf) for tf in features.values()]
+    norm = math.sqrt(sum(w * w for w in weights)) or 1.0
+    return (
+        np.fromiter(features, dtype=np.int64, count=len(features)),
+        np.array([w / norm for w in weights], dtype=np.float32)
+    )
+
+
+class HashedTfidfIndex:
+    """
+    TF-IDF over hashed unigrams and bigrams, stored term-major
+    
+    Passage vectors are sublinear tf, L2-normalized. The matrix is kept in
+    compressed sparse column form (per feature: passage ids and weights), so
+    scoring a query reads only the postings of its few features and
+    accumulates them with one bincount. IDF is applied on the query side
+    (squared, which equals tf-idf weighting on both sides), leaving the
+    stored passage weights independent of corpus statistics.
+    
+    Added passages go into a new immutable segment and removed passages are
+    masked out, so updates cost time proportional to the passages changed.
+    Segments are merged log-structured style (a segment is merged into its
+    predecessor once it reaches half its size), which also drops removed
+    passages and keeps the segment count logarithmic.
+    """
+    
+    def __init__(self, n_features: int = N_FEATURES, ngrams: int = NGRAMS):
+        """
+        Args:
+            n_features: Hash space size
+            ngrams: Longest word n-gram hashed
+        """
+        import numpy as np
+        
+        self.n_features = n_features
+        self.ngrams = ngrams
+        self.n_passages = 0   # passage ids issued (removed ones included)
+        self.n_alive = 0
+        # (indptr, indices, data): feature -> slice of passage ids / weights
+        self.segments: List[Tuple] = []
+        self.df = np.zeros(n_features, dtype=np.int32)
+        self.alive = np.zeros(0, dtype=bool)
+        self._passage_features: List = []  # feature ids per passage (for removal)
+    
+    def clone(self) -> "HashedTfidfIndex":
+        """Copy for incremental updates; segments are immutable and shared"""
+        other = HashedTfidfIndex.__new__(HashedTfidfIndex)
+        other.__dict__.update(self.__dict__)
+        other.segments = list(self.segments)
+        other.df = self.df.copy()
+        other.alive = self.alive.copy()
+        other._passage_features = list(self._passage_features)
+        return other
+    
+    def build(self, texts: List[str]):
+        """Build the matrix from passages, using their position as passage id"""
+        self.__init__(self.n_features, self.ngrams)
+        self.add_all(texts)
+        logger.info(f"TF-IDF index built: {self.n_alive} passages, "
+                    f"{sum(len(seg[1]) for seg in self.segments)} nonzeros")
+    
+    def add_all(self, texts: List[str]):
+        """Index passages as a new segment, numbering them after the existing ones"""
+        self.add_vectors([
+            passage_vector(hash_features(text, self.n_features, self.ngrams)) for text in texts
+        ])
+    
+    def add_vectors(self, passages: List[Tuple]):
+        """Like add_all, from passage_vector already computed per passage"""
+        import numpy as np
+        
+        if not passages:
+            return
+        
+        first_id = self.n_passages
+        lengths = [len(features) for features, _ in passages]
+        rows = np.repeat(np.arange(first_id, first_id + len(passages), dtype=np.int32), lengths)
+        cols = np.concatenate([features for features, _ in passages])
+        vals = np.concatenate([weights for _, weights in passages])
+        self._passage_features.extend(features for features, _ in passages)
+        
+        self.n_passages += len(passages)
+        self.n_alive += len(passages)
+        self.alive = np.concatenate((self.alive, np.ones(len(passages), dtype=bool)))
+        
+        self.df += np.bincount(cols, minlength=self.n_features).astype(np.int32)
+        self.segments.append(self._make_segment(cols, rows, vals))
+        
+        while len(self.segments) > 1 and len(self.segments[-1][1]) * 2 >= len(self.segments[-2][1]):
+            self._merge_last_two()
+    
+    def remove(self, passage_id: int):
+        """Mask out a passage; its id is not reused"""
+        if not self.alive[passage_id]:
+            return
+        self.alive[passage_id] = False
+        self.n_alive -= 1
+        self.df[self._passage_features[passage_id]] -= 1
+        self._passage_features[passage_id] = None
+    
+    def _make_segment(self, cols, rows, vals) -> Tuple:
+        import numpy as np
+        
+        order = np.argsort(cols, kind="stable")
+        counts = np.bincount(cols, minlength=self.n_features)
+        indptr = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return indptr, rows[order], vals[order]
+    
+    def _merge_last_two(self):
+        """Merge the newest segment into its predecessor, dropping removed passages"""
+        import numpy as np
+        
+        parts = [self.segments.pop(), self.segments.pop()]
+        cols = np.concatenate([
+            np.repeat(np.arange(self.n_features), np.diff(indptr)) for indptr, _, _ in parts
+        ])
+        rows = np.concatenate([indices for _, indices, _ in parts])
+        vals = np.concatenate([data for _, _, data in parts])
+        
+        keep = self.alive[rows]
+        self.segments.append(self._make_segment(cols[keep], rows[keep], vals[keep]))
+    
+    def __len__(self) -> int:
+        return self.n_alive
+    
+    def search(self, query: str, top_k: int = 5,
+               tiebreak: Optional[Callable[[int], tuple]] = None) -> List[Tuple[int, float]]:
+        """
+        Rank passages by sparse dot product with the query
+        
+        Args:
+            query: Free-text query
+            top_k: Number of passages to return
+            tiebreak: Sort key among equal scores (defaults to passage id)
+        
+        Returns:
+            (passage_id, score) pairs, best first; passages scoring 0 are omitted
+        """
+        import numpy as np
+        
+        if not self.n_alive:
+            return []
+        
+        features = hash_features(query, self.n_features, self.ngrams)
+        ids, weights = [], []
+        for feature, tf in features.items():
+            df = self.df[feature]
+            if df == 0:
+                continue
+            idf = math.log((1 + self.n_alive) / (1 + df)) + 1.0
+            for indptr, indices, data in self.segments:
+                start, end = indptr[feature], indptr[feature + 1]
+                if start == end:
+                    continue
+                ids.append(indices[start:end])
+                weights.append(data[start:end] * (tf * idf ** 2))
+        
+        if not ids:
+            return []
+        
+        scores = np.bincount(
+            np.concatenate(ids),
+            weights=np.concatenate(weights),
+            minlength=self.n_passages
+        )
+        if self.n_alive < self.n_passages:
+            scores[~self.alive] = 0.0
+        
+        # Unordered top-k in O(n); then sort only passages scoring at least
+        # the k-th best, so ties at the cut are broken by tiebreak as well
+        k = min(top_k, self.n_passages)
+        if k < self.n_passages:
+            kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+            candidates = np.flatnonzero(scores >= max(kth, np.finfo(scores.dtype).tiny))
+        else:
+            candidates = np.flatnonzero(scores > 0)
+        
+        tiebreak = tiebreak or (lambda passage_id: passage_id)
+        ranked = sorted(candidates.tolist(), key=lambda i: (-scores[i], tiebreak(i)))[:k]
+        
+        return [(i, float(scores[i])) for i in ranked]
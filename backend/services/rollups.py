@@ -0,0 +1,202 @@
+"""
+Service: Soil Reading Rollups
+Incrementally maintained min/max/mean/last aggregates per field over
+1-minute, 1-hour and 1-day windows
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+# Window name -> width in seconds
+RESOLUTIONS = {
+    "1m": 60,
+    "1h": 3600,
+    "1d": 86400,
+}
+
+# Window name -> number of buckets kept per field
+DEFAULT_RETENTION = {
+    "1m": 24 * 60,      # 1 day of minutes
+    "1h": 30 * 24,      # 30 days of hours
+    "1d": 365,          # 1 year of days
+}
+
+# Readings from the untagged CSV log are rolled up under this field
+DEFAULT_FIELD = "default"
+
+
+class RollupEngine:
+    """
+    Time-bucketed soil moisture aggregates
+    
+    Every committed append to the sensor store is folded into the buckets
+    it touches (vectorized per batch), so history queries read a few
+    hundred pre-aggregated points instead of scanning raw readings.
+    """
+    
+    def __init__(self, retention: Optional[Dict[str, int]] = None):
+        self.retention = dict(DEFAULT_RETENTION, **(retention or {}))
+        
+        # (field_id, resolution) -> bucket start -> [min, max, sum, count, last, last_ts]
+        self._series: Dict[Tuple[str, str], Dict[int, List[float]]] = {}
+        self._newest: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+    
+    def attach(self, store, bootstrap: bool = True):
+        """
+        Subscribe to a sensor store's appends
+        
+        Args:
+            store: SensorStore to follow
+            bootstrap: Seed buckets from readings already in the store
+        """
+        if bootstrap:
+            self.bootstrap_from_store(store)
+        store.add_listener(self._on_append)
+    
+    def bootstrap_from_store(self, store, block_rows: int = 1_000_000):
+        """Fold in stored readings that fall inside the retention windows"""
+        if len(store) == 0:
+            return
+        
+        newest_ts = int(store.latest()["timestamp"])
+        oldest_needed = min(
+            newest_ts - RESOLUTIONS[res] * self.retention[res] for res in RESOLUTIONS
+        )
+        
+        columns = ["timestamp", "soilmiosture", "field_code"]
+        window = store.read_range(oldest_needed, None, columns)
+        total = len(window["timestamp"])
+        
+        for start in range(0, total, block_rows):
+            block = {name: values[start:start + block_rows] for name, values in window.items()}
+            self._on_append(store, block)
+        
+        logger.info(f"Rollups seeded from {total} stored readings")
+    
+    def _on_append(self, store, batch: Dict):
+        import numpy as np
+        
+        codes = np.asarray(batch["field_code"], dtype=np.int64)
+        labels = {code: store.field_label(code) or DEFAULT_FIELD for code in np.unique(codes).tolist()}
+        self.observe(codes, batch["timestamp"], batch["soilmiosture"], labels)
+    
+    def observe(self, field_codes, timestamps, values, labels: Dict[int, str]):
+        """
+        Fold a batch of readings into every window
+        
+        Args:
+            field_codes: Integer field key per reading
+            timestamps: Epoch seconds per reading
+            values: Soil moisture per reading (NaN readings are ignored)
+            labels: Field key -> field_id
+        """
+        import numpy as np
+        
+        values = np.asarray(values, dtype=np.float64)
+        keep = ~np.isnan(values)
+        if not keep.any():
+            return
+        
+        field_codes = np.asarray(field_codes, dtype=np.int64)[keep]
+        timestamps = np.asarray(timestamps, dtype=np.int64)[keep]
+        values = values[keep]
+        
+        for resolution, width in RESOLUTIONS.items():
+            buckets = timestamps // width * width
+            order = np.lexsort((timestamps, buckets, field_codes))
+            f, b, t, v = field_codes[order], buckets[order], timestamps[order], values[order]
+            
+            # One group per (field, bucket); reduce each group in one pass
+            breaks = np.flatnonzero((np.diff(f) != 0) | (np.diff(b) != 0)) + 1
+            starts = np.concatenate(([0], breaks))
+            ends = np.concatenate((breaks, [len(v)]))
+            
+            groups = zip(
+                f[starts].tolist(), b[starts].tolist(),
+                np.minimum.reduceat(v, starts).tolist(),
+                np.maximum.reduceat(v, starts).tolist(),
+                np.add.reduceat(v, starts).tolist(),
+                (ends - starts).tolist(),
+                v[ends - 1].tolist(),
+                t[ends - 1].tolist(),
+            )
+            
+            with self._lock:
+                for code, bucket, lo, hi, total, count, last, last_ts in groups:
+                    self._merge((labels[code], resolution), bucket, lo, hi, total, count, last, last_ts)
+    
+    def _merge(self, key: Tuple[str, str], bucket: int, lo: float, hi: float,
+               total: float, count: int, last: float, last_ts: int):
+        series = self._series.setdefault(key, {})
+        stats = series.get(bucket)
+        
+        if stats is None:
+            series[bucket] = [lo, hi, total, count, last, last_ts]
+        else:
+            stats[0] = min(stats[0], lo)
+            stats[1] = max(stats[1], hi)
+            stats[2] += total
+            stats[3] += count
+            if last_ts >= stats[5]:
+                stats[4] = last
+                stats[5] = last_ts
+        
+        newest = max(self._newest.get(key, bucket), bucket)
+        self._newest[key] = newest
+        
+        # Expire buckets that fell out of the retention window, in amortized
+        # sweeps once the series overshoots its retention by 10%
+        retention = self.retention[key[1]]
+        if len(series) > retention + max(1, retention // 10):
+            cutoff = newest - RESOLUTIONS[key[1]] * retention
+            for old in [start for start in series if start <= cutoff]:
+                del series[old]
+    
+    def query(self, field_id: str, resolution: str = "1h", start_ts: Optional[int] = None,
+              end_ts: Optional[int] = None, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Aggregated points for a field, oldest first
+        
+        Args:
+            field_id: Field to query (DEFAULT_FIELD for the untagged CSV log)
+            resolution: One of RESOLUTIONS
+            start_ts: Inclusive lower bound on bucket start (epoch seconds)
+            end_ts: Exclusive upper bound on bucket start (epoch seconds)
+            limit: Return only the most recent N points
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        
+        with self._lock:
+            series = self._series.get((field_id, resolution), {})
+            points = [
+                (bucket, list(stats)) for bucket, stats in series.items()
+                if (start_ts is None or bucket >= start_ts) and (end_ts is None or bucket < end_ts)
+            ]
+        
+        points.sort(key=lambda point: point[0])
+        if limit is not None:
+            points = points[-limit:]
+        
+        return [
+            {
+                "start": datetime.fromtimestamp(bucket, tz=timezone.utc).isoformat(),
+                "min": round(lo, 2),
+                "max": round(hi, 2),
+                "mean": round(total / count, 2),
+                "last": round(last, 2),
+                "count": count
+            }
+            for bucket, (lo, hi, total, count, last, _) in points
+        ]
+    
+    def fields(self) -> List[str]:
+        """Field ids that have rollups"""
+        with self._lock:
+            return sorted({field_id for field_id, _ in self._series})
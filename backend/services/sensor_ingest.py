@@ -0,0 +1,207 @@
+"""
+Service: Sensor Reading Ingest
+Group-commits gateway readings to the sensor store and tracks the latest
+reading per field
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SensorIngestService:
+    """
+    Batched ingest of field sensor readings
+    
+    Concurrent ingest calls are queued and written to the sensor store by a
+    single background flusher, so many requests share one append + fsync
+    (group commit). Each call returns once its readings are durable.
+    """
+    
+    def __init__(self, store, commit_window: float = 0.02, max_batch_rows: int = 100_000):
+        """
+        Initialize ingest service
+        
+        Args:
+            store: SensorStore to append readings to
+            commit_window: Seconds to wait for more readings before committing
+            max_batch_rows: Commit immediately once this many rows are queued
+        """
+        self.store = store
+        self.commit_window = commit_window
+        self.max_batch_rows = max_batch_rows
+        
+        # field_id -> latest reading (same shape as DocumentLoader.get_latest_soil_moisture)
+        self.latest_by_field: Dict[str, Dict] = {}
+        
+        self._pending: List[Tuple[List[Dict], asyncio.Future]] = []
+        self._pending_rows = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        
+        self.stats = {"requests": 0, "readings": 0, "commits": 0}
+    
+    def seed_from_store(self):
+        """Rebuild the per-field latest index from the store's tail"""
+        for field_id, row in self.store.latest_by_field().items():
+            if row["soilmiosture"] is None:
+                continue
+            self.latest_by_field[field_id] = self._format_row(row, "sensor_store")
+        logger.info(f"Seeded latest readings for {len(self.latest_by_field)} fields")
+    
+    async def start(self):
+        """Start the background commit loop"""
+        if self._flusher is None:
+            self._wakeup = asyncio.Event()
+            self._flusher = asyncio.create_task(self._flush_loop())
+    
+    async def stop(self):
+        """Commit anything still queued and stop the commit loop"""
+        if self._flusher is None:
+            return
+        
+        self._flusher.cancel()
+        try:
+            await self._flusher
+        except asyncio.CancelledError:
+            pass
+        self._flusher = None
+        
+        if self._pending:
+            await self._commit(self._take_pending())
+    
+    async def ingest(self, readings: List[Dict]) -> Dict:
+        """
+        Queue readings for the next group commit and wait until durable
+        
+        Args:
+            readings: Dicts with field_id, sensor_id, soil_moisture and
+                optional temperature, pressure, altitude, class_label, timestamp
+        
+        Returns:
+            Dict with number of readings accepted and fields updated
+        """
+        if self._flusher is None:
+            await self.start()
+        
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((readings, future))
+        self._pending_rows += len(readings)
+        self._wakeup.set()
+        
+        return await future
+    
+    def get_latest(self, field_id: str) -> Optional[Dict]:
+        """Latest reading for a field, or None if it has never reported"""
+        return self.latest_by_field.get(field_id)
+    
+    async def _flush_loop(self):
+        while True:
+            await self._wakeup.wait()
+            
+            # Give concurrent callers a short window to join this commit
+            if self._pending_rows < self.max_batch_rows:
+                await asyncio.sleep(self.commit_window)
+            
+            self._wakeup.clear()
+            batch = self._take_pending()
+            if batch:
+                await self._commit(batch)
+    
+    def _take_pending(self) -> List[Tuple[List[Dict], asyncio.Future]]:
+        batch = self._pending
+        self._pending = []
+        self._pending_rows = 0
+        return batch
+    
+    async def _commit(self, batch: List[Tuple[List[Dict], asyncio.Future]]):
+        readings = [reading for group, _ in batch for reading in group]
+        
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._append, readings)
+        except Exception as e:
+            logger.error(f"Sensor ingest commit failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        self.stats["commits"] += 1
+        self.stats["requests"] += len(batch)
+        self.stats["readings"] += len(readings)
+        
+        for group, future in batch:
+            if not future.done():
+                future.set_result({
+                    "accepted": len(group),
+                    "fields": sorted({reading["field_id"] for reading in group})
+                })
+    
+    def _append(self, readings: List[Dict]):
+        """Write one commit's readings to the store and update the latest index"""
+        now = int(datetime.now(timezone.utc).timestamp())
+        columns = {
+            "timestamp": [],
+            "temperature": [],
+            "pressure": [],
+            "altitude": [],
+            "soilmiosture": [],
+        }
+        labels = {
+            "class_code": [],
+            "field_code": [],
+            "sensor_code": [],
+        }
+        newest: Dict[str, Tuple[int, Dict]] = {}
+        
+        for reading in readings:
+            ts = reading.get("timestamp")
+            ts = now if ts is None else int(ts)
+            
+            columns["timestamp"].append(ts)
+            columns["temperature"].append(self._float_or_nan(reading.get("temperature")))
+            columns["pressure"].append(self._float_or_nan(reading.get("pressure")))
+            columns["altitude"].append(self._float_or_nan(reading.get("altitude")))
+            columns["soilmiosture"].append(float(reading["soil_moisture"]))
+            labels["class_code"].append(reading.get("class_label"))
+            labels["field_code"].append(reading["field_id"])
+            labels["sensor_code"].append(reading["sensor_id"])
+            
+            field_id = reading["field_id"]
+            if field_id not in newest or ts >= newest[field_id][0]:
+                newest[field_id] = (ts, reading)
+        
+        self.store.append(columns, labels=labels)
+        
+        for field_id, (ts, reading) in newest.items():
+            current = self.latest_by_field.get(field_id)
+            if current is not None and current["epoch"] > ts:
+                continue
+            self.latest_by_field[field_id] = self._format_row({
+                "timestamp": ts,
+                "soilmiosture": reading["soil_moisture"],
+                "temperature": reading.get("temperature"),
+                "class": reading.get("class_label") or "Unknown",
+                "field_id": field_id,
+                "sensor_id": reading["sensor_id"],
+            }, "sensor_ingest")
+    
+    @staticmethod
+    def _float_or_nan(value) -> float:
+        return float("nan") if value is None else float(value)
+    
+    @staticmethod
+    def _format_row(row: Dict, source: str) -> Dict:
+        return {
+            "value": float(row["soilmiosture"]),
+            "source": source,
+            "timestamp": datetime.fromtimestamp(row["timestamp"], tz=timezone.utc).isoformat(),
+            "epoch": row["timestamp"],
+            "temperature": row.get("temperature"),
+            "class": row.get("class", "Unknown"),
+            "field_id": row.get("field_id"),
+            "sensor_id": row.get("sensor_id")
+        }
@@ -0,0 +1,119 @@
+"""
+Service: Single-Flight Request Coalescing
+Lets concurrent identical upstream calls share one call and its result
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that have the same key
+    
+    The first caller for a key (the leader) makes the upstream call; callers
+    arriving with the same key while it is in flight wait for it and get
+    the same result, or the same exception. Once the call returns the key is
+    free again, so later calls go upstream as usual (results are not
+    cached here).
+    
+    Threads use do() and coroutines use do_async(); both share one table
+    of in-flight calls, so a coroutine can wait on a call a thread leads
+    and the other way round. The result object is shared, so callers must
+    not modify it.
+    """
+    
+    def __init__(self, name: str = "calls"):
+        """
+        Args:
+            name: Label for log lines (e.g. "gemini", "weather")
+        """
+        self.name = name
+        self._flights: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+    
+    def _join(self, key: Hashable) -> Tuple[Future, bool]:
+        """The key's in-flight call, and whether this caller leads it"""
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return flight, False
+            
+            flight = Future()
+            # A running future cannot be cancelled, so a follower giving up
+            # never cancels the call for the others
+            flight.set_running_or_notify_cancel()
+            self._flights[key] = flight
+            self.executed += 1
+            return flight, True
+    
+    def _land(self, key: Hashable, flight: Future, result: Any = None, error: BaseException = None):
+        with self._lock:
+            del self._flights[key]
+        if error is not None:
+            flight.set_exception(error)
+        else:
+            flight.set_result(result)
+    
+    def do(self, key: Hashable, fn: Callable[..., Any], *args) -> Any:
+        """
+        fn(*args), or the result of the same key's call already in flight (blocking)
+        
+        Args:
+            key: Identifies calls that would return the same result
+            fn: The upstream call
+        """
+        flight, leader = self._join(key)
+        if not leader:
+            logger.debug(f"Coalesced {self.name} call onto one in flight")
+            return flight.result()
+        
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, result)
+        return result
+    
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        await fn(), or the result of the same key's call already in flight
+        
+        Args:
+            key: Identifies calls that would return the same result
+            fn: Returns the awaitable making the upstream call
+        """
+        flight, leader = self._join(key)
+        if not leader:
+            logger.debug(f"Coalesced {self.name} call onto one in flight")
+            return await asyncio.wrap_future(flight)
+        
+        try:
+            result = await fn()
+        except BaseException as e:
+            self._land(key, flight, error=e)
+            raise
+        self._land(key, flight, result)
+        return result
+    
+    def stats(self) -> Dict:
+        """Calls made, upstream calls executed and calls coalesced since start-up"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._flights),
+                "coalesced_rate": round(self.coalesced / self.calls, 3) if self.calls else 0.0
+            }
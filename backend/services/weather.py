@@ -5,19 +5,23 @@ Handles weather data retrieval (mock for demonstration or real API)
 
 from typing import Dict, Optional
 from datetime import datetime, timedelta
+import asyncio
 import random
 import logging
 import os
-import requests
-from dotenv import load_dotenv
 
-load_dotenv()
+from backend.services.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
 
 class WeatherService:
-    """Provides weather data for irrigation decisions"""
+    """
+    Provides weather data for irrigation decisions
+    
+    Identical forecast requests made while one is in flight share that
+    request's forecast (see SingleFlight) instead of each calling the API.
+    """
     
     def __init__(self, use_mock: bool = False, api_provider: str = "openweathermap"):
         """
@@ -27,9 +31,13 @@ class WeatherService:
             use_mock: DEPRECATED - Always False. API key is required.
             api_provider: "openweathermap" or "weatherapi"
         """
+        from dotenv import load_dotenv
+        load_dotenv()
+        
         self.use_mock = False  # Always require real API
         self.api_provider = api_provider.lower()
         self.api_key = os.getenv("WEATHER_API_KEY") or os.getenv("OPENWEATHER_API_KEY")
+        self.flights = SingleFlight("weather")
         
         if not self.api_key:
             logger.warning(
@@ -59,10 +67,24 @@ class WeatherService:
             ValueError: If API key is missing and fallback fails
             requests.RequestException: If API request fails
         """
+        return self.flights.do((self.api_provider, location, days), self._fetch_forecast, location, days)
+    
+    async def get_forecast_async(self, location: Optional[str] = None, days: int = 1) -> Dict:
+        """get_forecast() without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await self.flights.do_async(
+            (self.api_provider, location, days),
+            lambda: loop.run_in_executor(None, self._fetch_forecast, location, days)
+        )
+    
+    def _fetch_forecast(self, location: Optional[str], days: int) -> Dict:
+        """Call the weather API (blocking), falling back to generated data"""
         if not self.api_key:
             logger.warning("Weather API key not configured. Using fallback forecast data.")
             return self._get_fallback_forecast(location, days)
         
+        import requests
+        
         try:
             if self.api_provider == "weatherapi":
                 return self._get_weatherapi_forecast(location, days)
@@ -143,7 +165,15 @@ class WeatherService:
             float: Expected rainfall in mm
         """
         forecast = self.get_forecast(location, days=1)
-        
+        return self._first_day_rainfall(forecast)
+    
+    async def get_rainfall_prediction_async(self, location: Optional[str] = None) -> float:
+        """get_rainfall_prediction() without blocking the event loop"""
+        forecast = await self.get_forecast_async(location, days=1)
+        return self._first_day_rainfall(forecast)
+    
+    @staticmethod
+    def _first_day_rainfall(forecast: Dict) -> float:
         if forecast and forecast["forecasts"]:
             return forecast["forecasts"][0]["rainfall_mm"]
         
@@ -202,6 +232,8 @@ class WeatherService:
         if not location:
             location = "London,uk"  # Default fallback
         
+        import requests
+        
         url = "https://api.openweathermap.org/data/2.5/forecast"
         params = {
             "q": location,
@@ -300,6 +332,8 @@ class WeatherService:
         if not location:
             location = "London"  # Default fallback
         
+        import requests
+        
         url = "https://api.weatherapi.com/v1/forecast.json"
         params = {
             "key": self.api_key,
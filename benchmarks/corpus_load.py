@@ -0,0 +1,72 @@
+"""
+Benchmark: Guideline Corpus Loading
+Wall time and per-stage throughput of loading and indexing a guideline corpus
+from disk, with chunking inline on the reader threads or in worker processes
+
+The corpus is written to a temporary directory as crop-swapped copies of the
+guideline files (see retrieval_modes.py).
+
+Usage:
+    python benchmarks/corpus_load.py [--docs 3000] [--workers 0,2,4] [--batch-size 64]
+"""
+
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from backend.rag import loader as loader_module  # noqa: E402
+from backend.rag.loader import DocumentLoader  # noqa: E402
+from backend.rag.retriever import GuidelineRetriever  # noqa: E402
+from benchmarks.retrieval_modes import build_corpus  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=3000, help="Corpus size in documents")
+    parser.add_argument("--workers", default="0,2,4",
+                        help="Worker process counts to compare (0 = chunk on the reader threads)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Documents per indexing batch")
+    args = parser.parse_args()
+    
+    base = DocumentLoader(BASE_DIR / "data").load_agricultural_guidelines()
+    corpus = build_corpus(base, args.docs, random.Random(7))
+    
+    data_dir = Path(tempfile.mkdtemp(prefix="guideline-corpus-"))
+    try:
+        guidelines_dir = data_dir / "guidelines"
+        guidelines_dir.mkdir()
+        for i, doc in enumerate(corpus):
+            (guidelines_dir / f"{doc['source'].lower()}_{i}.txt").write_text(doc["content"], encoding="utf-8")
+        
+        # Every run goes through the worker pool path, whatever the corpus size
+        loader_module.PARALLEL_LOAD_MIN_FILES = 0
+        
+        print(f"{'docs':>6} {'workers':>8} {'wall s':>7} {'docs/s':>8} "
+              f"{'read MB/s':>10} {'prep docs/s':>12} {'index docs/s':>13}")
+        for workers in [int(w) for w in args.workers.split(",")]:
+            loader = DocumentLoader(data_dir)
+            start = time.perf_counter()
+            retriever = GuidelineRetriever.from_batches(
+                loader.iter_guideline_batches(cpu_workers=workers, batch_size=args.batch_size)
+            )
+            wall = time.perf_counter() - start
+            
+            stages = loader.guideline_load_stats["stages"]
+            print(f"{len(retriever.documents):>6} {workers:>8} {wall:>7.2f} "
+                  f"{len(retriever.documents) / wall:>8.0f} {stages['read']['mb_per_s']:>10.1f} "
+                  f"{stages['prepare']['docs_per_s']:>12.0f} {stages['index']['docs_per_s']:>13.0f}")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Benchmark: Server Import-Time Budget
+Fails when importing the FastAPI app gets slow or pulls heavy modules back in
+
+Usage:
+    python benchmarks/import_budget.py [--budget 1.5] [--runs 5]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+
+# Modules that must only be imported on first use, never by `import backend.main`
+HEAVY_MODULES = [
+    "pandas",
+    "numpy",
+    "google.generativeai",
+    "requests",
+    "dotenv",
+]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import backend.main
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "heavy": [m for m in %r if m in sys.modules]
+}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_import() -> dict:
+    """Import backend.main in a fresh interpreter and report time and heavy modules"""
+    output = subprocess.check_output([sys.executable, "-c", PROBE], cwd=BASE_DIR)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget", type=float, default=1.5, help="Max import time in seconds")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to sample")
+    args = parser.parse_args()
+    
+    samples = [measure_import() for _ in range(args.runs)]
+    best = min(sample["seconds"] for sample in samples)
+    heavy = sorted({module for sample in samples for module in sample["heavy"]})
+    
+    print(f"import backend.main: best {best * 1000:.0f} ms over {args.runs} runs "
+          f"(budget {args.budget * 1000:.0f} ms)")
+    
+    failed = False
+    if best > args.budget:
+        print("FAIL: import time over budget")
+        failed = True
+    if heavy:
+        print(f"FAIL: heavy modules imported eagerly: {', '.join(heavy)}")
+        failed = True
+    
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Benchmark: Guideline Retrieval Modes
+Latency and answer recall of keyword, BM25 and TF-IDF retrieval as the corpus grows
+
+The corpus is grown with crop-swapped copies of the guideline files (other
+crop names, shifted figures), so added documents are realistic distractors
+that never contain the labeled answers.
+
+Usage:
+    python benchmarks/retrieval_modes.py [--sizes 3,30,300] [--repeat 20]
+"""
+
+import argparse
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from backend.rag.loader import DocumentLoader  # noqa: E402
+from backend.rag.retriever import GuidelineRetriever, RETRIEVAL_MODES  # noqa: E402
+from backend.services.irrigation import IrrigationService  # noqa: E402
+
+# (crop, stage, soil moisture %, rainfall mm) -> text the context must contain
+LABELED_QUERIES = [
+    (("rice", "early", 80, 0), "70-90 liters/hectare/day"),
+    (("rice", "vegetative", 65, 3), "90-110 liters/hectare/day"),
+    (("rice", "flowering", 85, 0), "110-130 liters/hectare/day"),
+    (("wheat", "early", 45, 0), "35-45 liters/hectare/day"),
+    (("wheat", "vegetative", 50, 10), "55-65 liters/hectare/day"),
+    (("wheat", "flowering", 30, 20), "75-85 liters/hectare/day"),
+    (("maize", "early", 50, 0), "45-55 liters/hectare/day"),
+    (("maize", "vegetative", 50, 8), "65-75 liters/hectare/day"),
+    (("maize", "flowering", 35, 1), "85-95 liters/hectare/day"),
+]
+
+CROP_SWAPS = [
+    {"rice": "sugarcane", "oryza": "saccharum", "paddy": "cane", "wheat": "barley",
+     "triticum": "hordeum", "maize": "sorghum", "corn": "jowar", "zea mays": "sorghum bicolor"},
+    {"rice": "cotton", "oryza": "gossypium", "paddy": "boll", "wheat": "oats",
+     "triticum": "avena", "maize": "millet", "corn": "bajra", "zea mays": "pennisetum glaucum"},
+    {"rice": "soybean", "oryza": "glycine", "paddy": "bean", "wheat": "mustard",
+     "triticum": "brassica", "maize": "groundnut", "corn": "peanut", "zea mays": "arachis hypogaea"},
+]
+
+
+def distractor(doc: dict, copy: int, rng: random.Random) -> dict:
+    """Crop-swapped copy of a guideline document with shifted figures"""
+    swaps = CROP_SWAPS[copy % len(CROP_SWAPS)]
+    pattern = re.compile("|".join(re.escape(k) for k in sorted(swaps, key=len, reverse=True)), re.IGNORECASE)
+    content = pattern.sub(lambda m: swaps[m.group(0).lower()], doc["content"])
+    content = re.sub(r"\d+", lambda m: str(int(m.group(0)) + rng.randint(1, 9)), content)
+    return {"source": f"{doc['source']}_{copy}", "content": content}
+
+
+def build_corpus(base: list, size: int, rng: random.Random) -> list:
+    corpus = list(base)
+    copy = 0
+    while len(corpus) < size:
+        corpus.append(distractor(base[copy % len(base)], copy // len(base), rng))
+        copy += 1
+    return corpus[:max(size, len(base))]
+
+
+def percentile(samples: list, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="3,30,300", help="Corpus sizes in documents")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per query")
+    args = parser.parse_args()
+    
+    rng = random.Random(7)
+    base = DocumentLoader(BASE_DIR / "data").load_agricultural_guidelines()
+    
+    print(f"{'docs':>6} {'chunks':>7} {'build ms':>9} {'mode':>8} {'p50 ms':>8} {'p95 ms':>8} {'recall':>7}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        corpus = build_corpus(base, size, rng)
+        
+        start = time.perf_counter()
+        retriever = GuidelineRetriever(corpus)
+        build_ms = (time.perf_counter() - start) * 1000
+        
+        for mode in RETRIEVAL_MODES:
+            latencies, hits = [], 0
+            for query, answer in LABELED_QUERIES:
+                threshold = IrrigationService.MOISTURE_THRESHOLDS[query[0]][query[1]]
+                context = retriever.get_context_for_llm(*query, mode=mode, moisture_threshold=threshold)
+                hits += answer in context
+                for _ in range(args.repeat):
+                    t0 = time.perf_counter()
+                    retriever.get_context_for_llm(*query, mode=mode, moisture_threshold=threshold)
+                    latencies.append((time.perf_counter() - t0) * 1000)
+            
+            print(f"{len(corpus):>6} {len(retriever.chunks):>7} {build_ms:>9.0f} {mode:>8} "
+                  f"{statistics.median(latencies):>8.3f} {percentile(latencies, 0.95):>8.3f} "
+                  f"{hits / len(LABELED_QUERIES):>7.2f}")
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
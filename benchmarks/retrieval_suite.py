@@ -0,0 +1,245 @@
+"""
+Benchmark: Retrieval Latency and Relevance Regression Suite
+Latency percentiles and recall@k of GuidelineRetriever over a labeled query set,
+checked against a recorded relevance baseline
+
+Every crop x stage x soil moisture x rainfall combination is a labeled query.
+Its relevant sections are the crop's section in each guideline, plus the
+rainfall sections when rain is expected and the soil moisture sections when
+the field is dry or wet; its answer is the FAO water requirement for the
+crop and stage. A context contains the answer if it quotes the FAO range
+or lists the FAO figure among its water requirements (keyword mode only
+lists figures).
+
+The corpus is grown with short synthetic bulletins: single sections of
+crop-swapped guideline copies (see retrieval_modes.py), which are never
+relevant to a labeled query.
+
+Recall is deterministic for a given corpus size, so any drop against the
+baseline fails the run (exit status 1); latency is reported, not gated.
+
+Usage:
+    python benchmarks/retrieval_suite.py [--sizes 3,300,30000] [--repeat 3] [--k 5]
+                                         [--update-baseline]
+"""
+
+import argparse
+import itertools
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from backend.rag.corpus_loader import prepare_guideline_document  # noqa: E402
+from backend.rag.loader import DocumentLoader  # noqa: E402
+from backend.rag.retriever import GuidelineRetriever, RETRIEVAL_MODES  # noqa: E402
+from backend.rag.vector_index import moisture_band, rain_band  # noqa: E402
+from backend.services.irrigation import IrrigationService  # noqa: E402
+from benchmarks.retrieval_modes import LABELED_QUERIES, distractor, percentile  # noqa: E402
+
+BASELINE_FILE = Path(__file__).parent / "retrieval_baseline.json"
+
+CROPS = ("rice", "wheat", "maize")
+STAGES = ("early", "vegetative", "flowering")
+SOIL_MOISTURE = (30, 55, 85)   # banded against each crop stage's threshold
+THRESHOLDS = IrrigationService.MOISTURE_THRESHOLDS
+RAINFALL = (0, 3, 10, 25)      # none, light, moderate, heavy (mm)
+
+# (source, section title) relevant to every query about the crop
+CROP_SECTIONS = {
+    "rice": [("FAO", "RICE (Oryza sativa)"),
+             ("ICAR", "WATER MANAGEMENT FOR INDIAN CONDITIONS"),
+             ("CIMMYT", "RICE - WATER SAVING TECHNOLOGIES")],
+    "wheat": [("FAO", "WHEAT (Triticum aestivum)"),
+              ("ICAR", "WHEAT - NORTH INDIA CONDITIONS"),
+              ("CIMMYT", "WHEAT IRRIGATION - PRECISION APPROACH")],
+    "maize": [("FAO", "MAIZE/CORN (Zea mays)"),
+              ("ICAR", "MAIZE - KHARIF AND RABI SEASONS"),
+              ("CIMMYT", "MAIZE IRRIGATION - CIMMYT RECOMMENDATIONS")],
+}
+RAIN_SECTIONS = [("ICAR", "MONSOON AND RAINFALL MANAGEMENT"), ("CIMMYT", "RAINFALL INTEGRATION")]
+MOISTURE_SECTIONS = [("ICAR", "SOIL MOISTURE MONITORING"), ("CIMMYT", "SOIL MOISTURE DECISION RULES")]
+
+# FAO water requirement per (crop, stage), e.g. "70-90 liters/hectare/day"
+ANSWERS = {query[:2]: answer for query, answer in LABELED_QUERIES}
+
+# A banner-framed section title starts each section
+SECTION_START = re.compile(r'\n(?=\s*={3,}\s*\n[^\n]+\n\s*={3,}\s*\n)')
+
+
+def labeled_queries() -> list:
+    """Every crop x stage x moisture x rainfall query with its relevance labels"""
+    queries = []
+    for crop, stage, moisture, rain in itertools.product(CROPS, STAGES, SOIL_MOISTURE, RAINFALL):
+        sections = list(CROP_SECTIONS[crop])
+        if rain_band(rain) != "none":
+            sections += RAIN_SECTIONS
+        if moisture_band(moisture, THRESHOLDS[crop][stage]) != "moderate":
+            sections += MOISTURE_SECTIONS
+        answer = ANSWERS[(crop, stage)]
+        queries.append({
+            "query": (crop, stage, moisture, rain),
+            "sources": {source for source, _ in CROP_SECTIONS[crop]},
+            "sections": set(sections),
+            "answer": answer,
+            # Upper bound of the FAO range, as stored in the facts table
+            "fao_value": float(answer.split()[0].split("-")[1])
+        })
+    return queries
+
+
+def build_bulletin_corpus(base: list, size: int, seed: int) -> list:
+    """The guideline documents plus single-section distractor bulletins, prepared as the loader would"""
+    rng = random.Random(seed)
+    corpus = [prepare_guideline_document(doc["path"], doc["content"]) for doc in base]
+    copy = 0
+    while len(corpus) < size:
+        swapped = distractor(base[copy % len(base)], copy // len(base), rng)
+        for i, section in enumerate(SECTION_START.split(swapped["content"])[1:]):
+            if len(corpus) >= size:
+                break
+            path = f"bulletins/{swapped['source'].lower()}_{i}.txt"
+            corpus.append(prepare_guideline_document(path, section.strip("\n") + "\n"))
+        copy += 1
+    return corpus
+
+
+def answer_in_context(labeled: dict, context: str) -> bool:
+    """Whether the context quotes the query's FAO range or lists its FAO figure"""
+    figure = f"- {labeled['fao_value']} {labeled['answer'].split()[1].rsplit('/', 1)[0]} (Source: FAO)"
+    return labeled["answer"] in context or figure in context
+
+
+def threshold(query: tuple) -> float:
+    """Irrigation threshold of a query's crop stage"""
+    return THRESHOLDS[query[0]][query[1]]
+
+
+def timed(fn, queries: list, repeat: int) -> list:
+    """Latencies (ms) of fn(query) over all queries, repeat times each"""
+    latencies = []
+    for _ in range(repeat):
+        for labeled in queries:
+            start = time.perf_counter()
+            fn(labeled["query"])
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def mean(values) -> float:
+    values = list(values)
+    return round(sum(values) / len(values), 3) if values else 0.0
+
+
+def run_size(base: list, size: int, queries: list, k: int, repeat: int) -> list:
+    """Rows of (operation, latencies, metrics) for one corpus size"""
+    corpus = build_bulletin_corpus(base, size, seed=size)
+    start = time.perf_counter()
+    retriever = GuidelineRetriever(corpus)
+    build_seconds = time.perf_counter() - start
+    print(f"\n{len(corpus)} documents, {len(retriever.chunks)} chunks, built in {build_seconds:.2f}s")
+    
+    rows = []
+    
+    def source_recall(labeled):
+        crop, stage, _, _ = labeled["query"]
+        found = {result["source"] for result in retriever.retrieve_for_crop(crop, stage, top_k=k)}
+        return len(found & labeled["sources"]) / len(labeled["sources"])
+    
+    rows.append(("retrieve_for_crop",
+                 timed(lambda q: retriever.retrieve_for_crop(q[0], q[1]), queries, repeat),
+                 {f"source_recall@{k}": mean(source_recall(labeled) for labeled in queries)}))
+    
+    def fao_fact_found(labeled):
+        crop, stage, _, _ = labeled["query"]
+        requirements = retriever.retrieve_water_requirements(crop, stage)["requirements"]
+        return any(req["source"] == "FAO" and req["value"] == labeled["fao_value"] for req in requirements)
+    
+    rows.append(("retrieve_water_requirements",
+                 timed(lambda q: retriever.retrieve_water_requirements(q[0], q[1]), queries, repeat),
+                 {"fao_fact_found": mean(fao_fact_found(labeled) for labeled in queries)}))
+    
+    rankers = {
+        "bm25": lambda q: retriever.retrieve_chunks(q[0], q[1], top_k=k),
+        "tfidf": lambda q: retriever.retrieve_vector_chunks(*q, threshold(q), top_k=k),
+    }
+    for mode in RETRIEVAL_MODES:
+        metrics = {"answer_in_context": mean(
+            answer_in_context(labeled, retriever.get_context_for_llm(*labeled["query"], mode=mode,
+                                                                     moisture_threshold=threshold(labeled["query"])))
+            for labeled in queries
+        )}
+        if mode in rankers:
+            metrics[f"section_recall@{k}"] = mean(
+                len({(c["source"], c["section"]) for c in rankers[mode](labeled["query"])} & labeled["sections"])
+                / len(labeled["sections"])
+                for labeled in queries
+            )
+        rows.append((f"get_context_for_llm[{mode}]",
+                     timed(lambda q: retriever.get_context_for_llm(*q, mode=mode, moisture_threshold=threshold(q)),
+                           queries, repeat),
+                     metrics))
+    
+    print(f"{'operation':<32} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  metrics")
+    for operation, latencies, metrics in rows:
+        print(f"{operation:<32} {percentile(latencies, 0.5):>8.3f} {percentile(latencies, 0.95):>8.3f} "
+              f"{percentile(latencies, 0.99):>8.3f}  "
+              + ", ".join(f"{name}={value:.3f}" for name, value in metrics.items()))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="3,300,30000", help="Corpus sizes in documents")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per query")
+    parser.add_argument("--k", type=int, default=5, help="Cut-off for recall@k")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE, help="Recorded relevance metrics")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Record this run's relevance metrics instead of checking them")
+    args = parser.parse_args()
+    
+    base = DocumentLoader(BASE_DIR / "data").load_agricultural_guidelines()
+    queries = labeled_queries()
+    print(f"{len(queries)} labeled queries, recall@{args.k}")
+    
+    results = {}
+    for size in [int(s) for s in args.sizes.split(",")]:
+        rows = run_size(base, size, queries, args.k, args.repeat)
+        results[str(size)] = {
+            f"{operation}.{name}": value for operation, _, metrics in rows for name, value in metrics.items()
+        }
+    
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    
+    if args.update_baseline:
+        for size, metrics in results.items():
+            baseline.setdefault(size, {}).update(metrics)
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+    
+    regressions = [
+        (size, name, expected, metrics[name])
+        for size, metrics in results.items()
+        for name, expected in baseline.get(size, {}).items()
+        if name in metrics and metrics[name] < expected
+    ]
+    unchecked = [size for size in results if size not in baseline]
+    
+    print()
+    for size, name, expected, actual in regressions:
+        print(f"FAIL: {name} at {size} documents dropped from {expected:.3f} to {actual:.3f}")
+    if unchecked:
+        print(f"No baseline for {', '.join(unchecked)} documents (run with --update-baseline)")
+    if not regressions:
+        print("OK")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
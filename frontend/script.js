@@ -43,6 +43,9 @@ document.addEventListener('DOMContentLoaded', () => {
     
     // Track server status
     let serverConnected = false;
+    
+    // The AI explanation streams in after the decision; Gemini may queue behind other calls
+    const EXPLANATION_TIMEOUT_MS = 120000;
 
     // Initialize: Load settings and language
     loadSettings();
@@ -254,9 +257,10 @@ document.addEventListener('DOMContentLoaded', () => {
 
         try {
             const controller = new AbortController();
-            const timeoutId = setTimeout(() => controller.abort(), 30000);
+            let timeoutId = setTimeout(() => controller.abort(), 30000);
             
-            const response = await fetch(`${API_BASE}/irrigation-plan`, {
+            // Streamed plan: the rule-based decision arrives first, then the AI explanation
+            const response = await fetch(`${API_BASE}/irrigation-plan/stream`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -270,19 +274,47 @@ document.addEventListener('DOMContentLoaded', () => {
                 signal: controller.signal
             });
             
-            clearTimeout(timeoutId);
-
             if (!response.ok) {
                 throw new Error('Failed to connect to backend. Is FastAPI running?');
             }
 
-            const data = await response.json();
-            serverConnected = true;
-            displayResult(data, cropType);
-            
-            // Show rain alert if present
-            if (data.rain_alert && data.rain_alert.has_upcoming_rain) {
-                showRainAlert(data.rain_alert);
+            let data = null;
+            try {
+                await readPlanEvents(response, (event, payload) => {
+                    if (event === 'decision') {
+                        // The decision is in; the explanation gets its own, longer timeout
+                        clearTimeout(timeoutId);
+                        timeoutId = setTimeout(() => controller.abort(), EXPLANATION_TIMEOUT_MS);
+                        
+                        // Show the decision now; the explanation is still being written
+                        data = { ...payload, llm_explanation: '', rag_context_used: false };
+                        serverConnected = true;
+                        displayResult(data, cropType);
+                        loading.style.display = 'none';
+                    } else if (event === 'token') {
+                        data.llm_explanation += payload.text;
+                        displayExplanation(data.llm_explanation);
+                    } else if (event === 'done') {
+                        Object.assign(data, payload);
+                        displayExplanation(data.llm_explanation);
+                        displaySources(data.sources_cited);
+                        const dataSourceEl = document.getElementById('data-source');
+                        if (dataSourceEl) dataSourceEl.textContent = 'Source: RAG-Enhanced AI Analysis';
+                        
+                        // Show rain alert if present
+                        if (data.rain_alert && data.rain_alert.has_upcoming_rain) {
+                            showRainAlert(data.rain_alert);
+                        }
+                    } else if (event === 'error') {
+                        throw new Error(payload.detail);
+                    }
+                });
+            } catch (error) {
+                // Once the decision is shown, a stalled explanation is not a backend failure
+                if (!(data && error.name === 'AbortError')) throw error;
+                displayExplanation(data.llm_explanation + (data.llm_explanation ? '\n\n' : '') + '(AI explanation timed out)');
+            } finally {
+                clearTimeout(timeoutId);
             }
             
             updateWeeklyReport();
@@ -308,6 +340,33 @@ document.addEventListener('DOMContentLoaded', () => {
             loading.style.display = 'none';
         }
     }
+    
+    // Read a Server-Sent Events response, calling onEvent(event, data) for each message
+    async function readPlanEvents(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            
+            let end;
+            while ((end = buffer.indexOf('\n\n')) !== -1) {
+                const message = buffer.slice(0, end);
+                buffer = buffer.slice(end + 2);
+                
+                let event = 'message';
+                let payload = '';
+                message.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) payload += line.slice(6);
+                });
+                onEvent(event, JSON.parse(payload));
+            }
+        }
+    }
 
     // Function to update water savings from irrigation plan data
     function updateWaterSavingsFromIrrigationData(data) {
@@ -351,6 +410,7 @@ document.addEventListener('DOMContentLoaded', () => {
         const confidenceCard = document.getElementById('confidence-card');
         const safetyCard = document.getElementById('safety-warning-card');
         const soilCard = document.getElementById('soil-card');
+        const explanationCard = document.getElementById('explanation-card');
         const sourcesCard = document.getElementById('sources-card');
         const verificationCard = document.getElementById('verification-card');
         
@@ -358,6 +418,7 @@ document.addEventListener('DOMContentLoaded', () => {
         decisionCard.style.display = 'block';
         confidenceCard.style.display = 'block';
         soilCard.style.display = 'block';
+        if (explanationCard) explanationCard.style.display = 'block';
         sourcesCard.style.display = 'block';
         verificationCard.style.display = 'block';
 
@@ -432,18 +493,11 @@ document.addEventListener('DOMContentLoaded', () => {
             safetyCard.style.display = 'none';
         }
 
+        // Display the AI explanation (empty while it is still streaming)
+        displayExplanation(data.llm_explanation || '');
+
         // Display sources as badges
-        if (data.sources_cited && data.sources_cited.length > 0) {
-            const sourcesBadges = document.getElementById('sources-badges');
-            sourcesBadges.innerHTML = '';
-            
-            data.sources_cited.forEach(source => {
-                const badge = document.createElement('span');
-                badge.className = 'source-badge';
-                badge.textContent = source;
-                sourcesBadges.appendChild(badge);
-            });
-        }
+        displaySources(data.sources_cited);
 
         // Display verification status with translated labels
         if (data.verification_status) {
@@ -456,6 +510,25 @@ document.addEventListener('DOMContentLoaded', () => {
         // Scroll to results
         decisionCard.scrollIntoView({ behavior: 'smooth', block: 'start' });
     }
+    
+    function displayExplanation(text) {
+        const explanationEl = document.getElementById('llm-explanation');
+        if (explanationEl) explanationEl.textContent = text;
+    }
+    
+    function displaySources(sources) {
+        if (sources && sources.length > 0) {
+            const sourcesBadges = document.getElementById('sources-badges');
+            sourcesBadges.innerHTML = '';
+            
+            sources.forEach(source => {
+                const badge = document.createElement('span');
+                badge.className = 'source-badge';
+                badge.textContent = source;
+                sourcesBadges.appendChild(badge);
+            });
+        }
+    }
 
     async function updateWeeklyReport() {
         if (!serverConnected) {